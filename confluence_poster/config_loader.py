@@ -1,8 +1,18 @@
+import json
+import os
+import sys
+from hashlib import sha256
+from typing import List, Union
+
+from confluence_poster import poster_config
 from confluence_poster.poster_config import Config, PartialConfig
 from collections import UserDict
 from collections.abc import Mapping
 from pathlib import Path
 
+# Bump when the structure of the cached config changes in a way the module mtime of poster_config does not reflect
+config_cache_format = 2
+
 
 def merge_configs(first_config: Mapping, other_config: Mapping):
     """Merges two configs together, like so:
@@ -30,23 +40,129 @@ def merge_configs(first_config: Mapping, other_config: Mapping):
             yield key, other_config[key]
 
 
-def load_config(local_config: Path) -> Config:
+def _xdg_path(variable: str, default: Path) -> Path:
+    """Reads the XDG base directory from the environment. Unlike xdg.BaseDirectory, which reads the environment when it
+    is imported, reads it on every call"""
+    return Path(os.environ.get(variable) or default)
+
+
+def _config_paths(local_config: Path) -> List[Path]:
+    """Returns the paths the config is merged from, in order: XDG_CONFIG_DIRS, XDG_CONFIG_HOME, the local config.
+    The XDG paths are returned whether the files exist or not."""
+    config_dirs = [
+        _xdg_path("XDG_CONFIG_HOME", Path.home() / ".config"),
+        *map(Path, (os.environ.get("XDG_CONFIG_DIRS") or "/etc/xdg").split(":")),
+    ]
+    return [
+        path / "confluence_poster" / "config.toml"
+        for path in config_dirs[::-1]
+        if (path / "confluence_poster").is_dir()
+    ] + [Path(local_config)]
+
+
+def _cache_key(config_paths: List[Path]) -> list:
+    """Identifies the state of the files the config is built from, and of the code that builds it
+
+    :raises FileNotFoundError: if the local config does not exist
+    """
+    key = [config_cache_format, list(sys.version_info[:2])]
+    *xdg_paths, local_config = config_paths
+    for path in [Path(poster_config.__file__), *xdg_paths]:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            key.append([str(path), None, None])
+        else:
+            key.append([str(path.resolve()), stat.st_mtime_ns, stat.st_size])
+    stat = local_config.stat()
+    key.append([str(local_config.resolve()), stat.st_mtime_ns, stat.st_size])
+    return key
+
+
+def _cache_file(local_config: Path) -> Path:
+    """Returns the file in $XDG_CACHE_HOME that caches the config built with the local config"""
+    name = sha256(str(local_config.resolve()).encode()).hexdigest()
+    return (
+        _xdg_path("XDG_CACHE_HOME", Path.home() / ".cache")
+        / "confluence_poster"
+        / "config_cache"
+        / f"{name}.json"
+    )
+
+
+def _read_cached_config(cache_file: Path, key: list) -> Union[Config, None]:
+    """Builds the config from the cached data. The password is not cached, it is read from the file it came from"""
+    try:
+        cached = json.loads(cache_file.read_text())
+        if cached["key"] != key:
+            return None
+        data = cached["config"]
+        if (password_file := cached["password_file"]) is not None:
+            data["auth"]["password"] = PartialConfig(file=password_file)["auth"][
+                "password"
+            ]
+        return Config(data=data)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _write_cached_config(
+    cache_file: Path, key: list, data: dict, password_file: Union[Path, None]
+) -> None:
+    """Saves the merged data of the config, without the password
+
+    :param password_file: the file the password comes from, if there is one
+    """
+    if "password" in data.get("auth", {}):
+        data = {
+            **data,
+            "auth": {_: data["auth"][_] for _ in data["auth"] if _ != "password"},
+        }
+    try:
+        cached = json.dumps(
+            {
+                "key": key,
+                "config": data,
+                "password_file": None if password_file is None else str(password_file),
+            }
+        )
+    except TypeError:
+        # Values like dates have no JSON form, such configs are not cached
+        return
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        temp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        temp_file.write_text(cached)
+        os.replace(temp_file, cache_file)
+    except OSError:
+        # The cache is an optimization, the config is just built again next time
+        pass
+
+
+def load_config(local_config: Path, use_cache: bool = True) -> Config:
     """Function that goes through the config directories trying to load the config.
     Reads configs from XDG_CONFIG_DIRS, then from XDG_CONFIG_HOME, then the local one - either the default one, or
-    supplied through command line."""
-    import xdg.BaseDirectory
-    from importlib import reload
+    supplied through command line.
 
-    reload(xdg.BaseDirectory)
+    If use_cache is set - the merged config is cached in $XDG_CACHE_HOME, the cache is used until any of the files
+    the config is built from changes. The password is not cached."""
+    config_paths = _config_paths(local_config)
+    if use_cache:
+        key = _cache_key(config_paths)
+        cache_file = _cache_file(Path(local_config))
+        if (config := _read_cached_config(cache_file, key)) is not None:
+            return config
 
     final_config = UserDict()
-    for path in list(xdg.BaseDirectory.load_config_paths("confluence_poster"))[::-1]:
-        config_path = Path(path) / "config.toml"
-        if config_path.exists():
-            final_config = dict(
-                merge_configs(final_config, PartialConfig(file=config_path))
-            )
-
-    final_config = dict(merge_configs(final_config, PartialConfig(file=local_config)))
+    password_file = None
+    *xdg_paths, local_config = config_paths
+    for config_path in [*(_ for _ in xdg_paths if _.exists()), local_config]:
+        partial_config = PartialConfig(file=config_path)
+        if "password" in partial_config.get("auth", {}):
+            password_file = config_path
+        final_config = dict(merge_configs(final_config, partial_config))
 
-    return Config(data=final_config)
+    config = Config(data=final_config)
+    if use_cache:
+        _write_cached_config(cache_file, key, final_config, password_file)
+    return config
@@ -1,13 +1,14 @@
+import csv
+import json
 import typer
 from click import Choice
 from pathlib import Path
 from functools import reduce
-from typing import Union, Any, Tuple, FrozenSet, Iterable, Callable
+from typing import Union, Any, Tuple, FrozenSet, Iterable, Callable, List, Dict, Set
 from tomlkit import document, parse, table, dumps
 from tomlkit.parser import TOMLDocument
 from tomlkit.items import Table
 from dataclasses import dataclass
-from copy import deepcopy
 
 from confluence_poster.poster_config import AllowedFileFormat
 
@@ -126,18 +127,18 @@ def _get_filled_attributes(config: TOMLDocument) -> Tuple[str]:
 
 
 def _create_or_update_attribute(
-    attribute: str, config: TOMLDocument, value: str
+    attribute: str, config: TOMLDocument, value: Any
 ) -> TOMLDocument:
     """Given attribute path path1.path2.attribute, do the following:
 
     1. Traverse the document, creating tables for path1 and path2 if they do not exist. 'path2' would be nested in path1
     2. Set the attribute attribute to the value
 
-    Returns a copy of config with updated value
+    The config is updated in place, so that the wizard works on a single document however large the config is.
+    Returns the config
     """
     *attribute_path, attribute_name = attribute.split(".")
-    _config = deepcopy(config)
-    caret = _config
+    caret = config
     for path_node in attribute_path:  # more clear than a reduce() call
         next_node = caret.get(path_node)
         if next_node is None:
@@ -145,22 +146,27 @@ def _create_or_update_attribute(
         caret = caret.get(path_node)
 
     caret[attribute_name] = value
-    return parse(dumps(_config))
+    return config
 
 
 def print_config_with_hidden_attrs(
     config: TOMLDocument, hidden_attributes: Iterable[Union[str, DialogParameter]]
 ) -> str:
-    """Given a path on the filesystem and a list of hidden attributes, returns content of that file,
-    redacting the sensitive fields"""
-    _config = deepcopy(config)
-    for attribute in hidden_attributes:
-        if _get_attribute_by_path(str(attribute), _config) is not None:
-            _config = _create_or_update_attribute(
-                str(attribute), _config, value="[REDACTED]"
-            )
-
-    return dumps(_config)
+    """Given a config and a list of hidden attributes, returns the text of the config, redacting the sensitive fields.
+
+    The values are redacted in the config while it is serialized and put back afterwards"""
+    hidden_values = {}
+    for attribute in map(str, hidden_attributes):
+        if attribute in hidden_values:
+            continue
+        if (value := _get_attribute_by_path(attribute, config)) is not None:
+            hidden_values[attribute] = value
+            _create_or_update_attribute(attribute, config, value="[REDACTED]")
+    try:
+        return dumps(config)
+    finally:
+        for attribute, value in hidden_values.items():
+            _create_or_update_attribute(attribute, config, value=value)
 
 
 def config_dialog(
@@ -168,21 +174,25 @@ def config_dialog(
     attributes: Iterable[Union[str, DialogParameter]],
     config_print_function: Callable = lambda _: print(_),
     incremental: bool = False,
+    config: Union[TOMLDocument, None] = None,
 ) -> Union[None, bool]:
-    """Checks if filename exists and goes through the list of attributes asking the user for the values
+    """Checks if filename exists and goes through the list of attributes asking the user for the values.
+    The values are set in a single document, which is serialized once when it is saved
 
     :param filename: filename (path or string) containing the config to be output
     :param attributes: list of parameter paths or DialogParameters to be displayed
     :param config_print_function: function that prints the config file.
     Can be overridden using print_config_file function to preserve list of redacted attributes.
     :param incremental: if set to True - suppresses the prompt to overwrite the file
+    :param config: the content of the file, if it was already parsed. It is updated in place
     """
     if type(filename) is str:
         filename = Path(filename)
-    new_config = document()
+    new_config = document() if config is None else config
     if filename.exists():
         typer.echo(f"File {filename} already exists.")
-        new_config = parse(filename.read_text())
+        if config is None:
+            new_config = parse(filename.read_text())
         if not incremental:
             typer.echo("Current content:")
             typer.echo(config_print_function(new_config))
@@ -205,7 +215,7 @@ def config_dialog(
         new_value = _dialog_prompt(parameter=attr, default_value=current_value)
 
         if new_value is not None:
-            new_config = _create_or_update_attribute(
+            _create_or_update_attribute(
                 attribute=attr, config=new_config, value=new_value
             )
 
@@ -239,24 +249,20 @@ def get_filled_attributes_from_file(filename: Union[Path, str]) -> FrozenSet[str
     return frozenset(_get_filled_attributes(parse(filename.read_text())))
 
 
-def _generate_next_page(filename: Union[Path, str]) -> int:
-    existing_pages = set(
-        map(
-            lambda a: a.split(".")[1],
-            filter(
-                lambda _: _.startswith("pages")
-                and not _.startswith("pages.default")
-                and not _ == "pages",
-                get_filled_attributes_from_file(filename),
-            ),
-        )
-    )
+def _next_page_number(config: TOMLDocument) -> int:
+    pages = config.get("pages", None) or {}
     page_number = 1
-    while True:
-        if f"page{page_number}" not in existing_pages:
-            return page_number
-        else:
-            page_number = page_number + 1
+    while f"page{page_number}" in pages:
+        page_number = page_number + 1
+    return page_number
+
+
+def _generate_next_page(filename: Union[Path, str]) -> int:
+    if type(filename) is str:
+        filename = Path(filename)
+    if not filename.exists():
+        return 1
+    return _next_page_number(parse(filename.read_text()))
 
 
 def generate_page_dialog_params(
@@ -290,11 +296,162 @@ def page_add_dialog(
     filename: Union[Path, str], config_print_function=lambda _: print(_)
 ) -> bool:
     """Wrapper around config_dialog that generates a new page section"""
-    # processes list of pages.page1, pages.page2 to "page1", "page2"
-    page_number = _generate_next_page(filename)
+    if type(filename) is str:
+        filename = Path(filename)
+    # The file is parsed once, for both the page number and the dialog
+    config = parse(filename.read_text()) if filename.exists() else document()
     return config_dialog(
         filename,
-        attributes=generate_page_dialog_params(page_number),
+        attributes=generate_page_dialog_params(_next_page_number(config)),
         config_print_function=config_print_function,
         incremental=True,
+        config=config,
+    )
+
+
+# Page settings that can be imported, in the order they are written to the config
+imported_page_keys = (
+    "page_title",
+    "page_file",
+    "page_space",
+    "page_parent_title",
+    "page_file_format",
+)
+
+
+def _pages_from_directory(directory: Path) -> Iterable[Dict[str, str]]:
+    """Finds the pages like [pages.tree] does, in all files whose format can be guessed"""
+    from confluence_poster.page_tree import PageTree
+
+    for page in PageTree(directory, pattern=None):
+        yield {
+            "page_title": page.page_title,
+            "page_file": page.page_file,
+            "page_parent_title": page.parent_page_title,
+        }
+
+
+def _pages_from_csv(csv_file: Path) -> Iterable[Dict[str, str]]:
+    """Reads the pages from a CSV file with a header, see imported_page_keys for the columns"""
+    with open(csv_file, newline="") as f:
+        yield from csv.DictReader(f)
+
+
+def _pages_from_jsonl(jsonl_file: Path) -> Iterable[Dict[str, str]]:
+    """Reads the pages from a file with a JSON object per line, see imported_page_keys for the keys"""
+    with open(jsonl_file) as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                page = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"Line {line_number} is not valid JSON: {e}")
+            if not isinstance(page, dict):
+                raise ValueError(f"Line {line_number} is not a JSON object")
+            yield page
+
+
+def read_imported_pages(source: Path) -> Iterable[Dict[str, str]]:
+    """Reads the pages to import from a directory, a CSV file or a JSON lines file. Every page has at least page_file
+
+    :raises ValueError: if the type of the source is not known
+    """
+    if source.is_dir():
+        return _pages_from_directory(source)
+    elif source.suffix == ".csv":
+        return _pages_from_csv(source)
+    elif source.suffix in {".jsonl", ".ndjson"}:
+        return _pages_from_jsonl(source)
+    raise ValueError(
+        f"Cannot import pages from {source}: expected a directory, a .csv or a .jsonl file"
     )
+
+
+class _ConfigPagesIndex:
+    """Files and titles of the pages in the config, to find out whether an imported page is there already"""
+
+    def __init__(self, config: TOMLDocument):
+        pages = config.get("pages", None) or {}
+        self.default_space = (pages.get("default", None) or {}).get("page_space", None)
+        self.page_names: Set[str] = set(pages)
+        self._files: Set[Path] = set()
+        self._titles: Set[Tuple[Any, str]] = set()
+        for name, page in pages.items():
+            if name not in {"default", "tree"} and isinstance(page, dict):
+                self.add(page)
+
+    def _title_key(self, page: dict) -> Tuple[Any, str]:
+        return page.get("page_space", None) or self.default_space, page.get(
+            "page_title", None
+        )
+
+    def __contains__(self, page: dict) -> bool:
+        return (
+            Path(page["page_file"]).resolve() in self._files
+            or self._title_key(page) in self._titles
+        )
+
+    def add(self, page: dict) -> None:
+        if "page_file" in page:
+            self._files.add(Path(page["page_file"]).resolve())
+        self._titles.add(self._title_key(page))
+
+
+def import_pages(
+    config: TOMLDocument, pages: Iterable[Dict[str, str]]
+) -> Tuple[str, int, List[str]]:
+    """Turns the pages into [pages.pageN] sections to be appended to the config. The pages whose file or title is in
+    the config already are skipped. Missing titles are read from the files, missing formats are guessed from
+    the extensions.
+
+    The sections are returned as text: tomlkit scans the whole document for every table added to it, which would make
+    importing thousands of pages quadratic
+
+    :return text of the sections, amount of the added pages, the reasons the other pages were skipped
+    """
+    from tomlkit import item
+    from confluence_poster.convert_utils import guess_file_format
+    from confluence_poster.page_tree import read_page_title
+
+    index = _ConfigPagesIndex(config)
+    page_number = 1
+    sections, skipped = [], []
+    for page in pages:
+        page = {
+            key: str(value)
+            for key, value in page.items()
+            if key in imported_page_keys and value not in {None, ""}
+        }
+        if "page_file" not in page:
+            skipped.append(f"A page without page_file: {page}")
+            continue
+        try:
+            if "page_title" not in page:
+                page["page_title"] = read_page_title(Path(page["page_file"]))
+            if "page_file_format" in page:
+                AllowedFileFormat(page["page_file_format"])
+            else:
+                page["page_file_format"] = guess_file_format(page["page_file"]).value
+        except (OSError, ValueError) as e:
+            skipped.append(f"Page file {page['page_file']}: {e}")
+            continue
+        if page in index:
+            skipped.append(
+                f"Page '{page['page_title']}' from {page['page_file']} is in the config already"
+            )
+            continue
+        index.add(page)
+
+        while f"page{page_number}" in index.page_names:
+            page_number += 1
+        index.page_names.add(f"page{page_number}")
+        sections.append(
+            f"\n[pages.page{page_number}]\n"
+            + "".join(
+                f"{key} = {item(page[key]).as_string()}\n"
+                for key in imported_page_keys
+                if key in page
+            )
+        )
+    return "".join(sections), len(sections), skipped
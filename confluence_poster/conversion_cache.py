@@ -0,0 +1,146 @@
+import sqlite3
+import time
+from hashlib import sha256
+from pathlib import Path
+from threading import Lock
+from typing import Union, Callable
+
+"""Persistent cache of the converted page texts. The entries are addressed by the hash of the text and the converter,
+so the pages that did not change cost only a hash to convert."""
+
+# Total size of the converted texts kept in the cache. Least recently used entries above it are evicted
+default_max_size = 256 * 1024 * 1024
+
+
+def default_cache_path() -> Path:
+    """Returns the path to the cache in $XDG_CACHE_HOME, creating the directory if needed"""
+    import xdg.BaseDirectory
+
+    return (
+        Path(xdg.BaseDirectory.save_cache_path("confluence_poster"))
+        / "conversion_cache.sqlite3"
+    )
+
+
+def conversion_key(text: str, converter: str) -> str:
+    """Addresses the converted text
+
+    :param text: text before the conversion
+    :param converter: identifies the converter together with its settings and version, see
+    convert_utils.markdown_converter_id
+    """
+    return sha256(f"{converter}\0{text}".encode("utf-8", "surrogatepass")).hexdigest()
+
+
+class ConversionCache:
+    """Maps the conversion keys to the converted texts. Can be used from several threads and processes at once.
+
+    The cache is an optimization: if the database cannot be read or written, the texts are just converted again."""
+
+    def __init__(
+        self, path: Union[Path, str, None] = None, max_size: int = default_max_size
+    ):
+        if path is None:
+            path = default_cache_path()
+        self.path = Path(path)
+        self.max_size = max_size
+        self._lock = Lock()
+        # Every statement is committed right away, so that other processes see the entries
+        self._connection = sqlite3.connect(
+            str(path), timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS conversions ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS conversions_last_used ON conversions (last_used)"
+        )
+        # Size of the texts in the cache, kept up to date by put() so that it does not sum the table on every write. The
+        # other processes writing to the cache are not counted, it is summed again before evicting
+        self._total_size: Union[int, None] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def get(self, key: str) -> Union[str, None]:
+        try:
+            with self._lock:
+                row = self._connection.execute(
+                    "SELECT value FROM conversions WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    self._connection.execute(
+                        "UPDATE conversions SET last_used = ? WHERE key = ?",
+                        (time.time(), key),
+                    )
+        except sqlite3.Error:
+            return None
+        return None if row is None else row[0]
+
+    def put(self, key: str, value: str) -> None:
+        """Saves the converted text, evicting the least recently used texts if the cache grows over max_size"""
+        size = len(value.encode("utf-8", "surrogatepass"))
+        if size > self.max_size:
+            return
+        try:
+            with self._lock:
+                if self._total_size is None:
+                    self._total_size = self._sum_size()
+                replaced = self._connection.execute(
+                    "SELECT size FROM conversions WHERE key = ?", (key,)
+                ).fetchone()
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO conversions (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                    (key, value, size, time.time()),
+                )
+                self._total_size += size - (replaced[0] if replaced else 0)
+                if self._total_size > self.max_size:
+                    self._evict()
+        except sqlite3.Error:
+            # The running total may be off now, it is summed again on next put
+            self._total_size = None
+
+    def _sum_size(self) -> int:
+        (total_size,) = self._connection.execute(
+            "SELECT coalesce(sum(size), 0) FROM conversions"
+        ).fetchone()
+        return total_size
+
+    def _evict(self):
+        self._total_size = total_size = self._sum_size()
+        if total_size <= self.max_size:
+            return
+        evicted_keys = []
+        for key, size in self._connection.execute(
+            "SELECT key, size FROM conversions ORDER BY last_used"
+        ):
+            evicted_keys.append((key,))
+            total_size -= size
+            if total_size <= self.max_size:
+                break
+        self._connection.executemany(
+            "DELETE FROM conversions WHERE key = ?", evicted_keys
+        )
+        self._total_size = total_size
+
+    def convert(self, text: str, converter: str, convert: Callable[[str], str]) -> str:
+        """Returns the cached conversion of the text, converting and caching it on a miss
+
+        :param text: text to convert
+        :param converter: see conversion_key
+        :param convert: function that converts the text
+        """
+        key = conversion_key(text, converter)
+        if (converted_text := self.get(key)) is not None:
+            return converted_text
+        converted_text = convert(text)
+        self.put(key, converted_text)
+        return converted_text
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,192 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext
+from functools import partial
+from pathlib import Path
+from threading import Lock
+from typing import (
+    Iterable,
+    List,
+    Dict,
+    Union,
+    Iterator,
+    Tuple,
+    ContextManager,
+    TYPE_CHECKING,
+)
+
+from confluence_poster.poster_config import Page, AllowedFileFormat, read_page_file
+from confluence_poster.convert_utils import (
+    convert_using_markdown_lib,
+    markdown_converter_id,
+)
+from confluence_poster.main_helpers import StateConfig, PostedPage, prepare_page_text
+
+if TYPE_CHECKING:
+    from confluence_poster.conversion_cache import ConversionCache
+
+"""Conversion of the markdown pages in a pool of processes, ahead of posting them"""
+
+# Smaller batches are converted in process: starting the processes would take longer than the conversion
+min_pages_for_process_pool = 8
+
+
+# Cache of the worker process, opened by _init_worker. The connection is closed when the process exits, every entry is
+# committed right away
+_worker_cache: Union["ConversionCache", None] = None
+
+
+def _init_worker(cache_path: Union[Path, None]) -> None:
+    """Runs once in every worker process. Opens the conversion cache if it is enabled"""
+    global _worker_cache
+    if cache_path is not None:
+        from confluence_poster.conversion_cache import ConversionCache
+
+        _worker_cache = ConversionCache(cache_path)
+
+
+def _convert_file(page_file: str, strip_front_matter: bool) -> str:
+    """Runs in the worker process. The file is read there, so that only the converted text is sent back"""
+    text = read_page_file(Path(page_file), strip_front_matter)
+    if _worker_cache is None:
+        return convert_using_markdown_lib(text)
+    return _worker_cache.convert(
+        text, converter=markdown_converter_id(), convert=convert_using_markdown_lib
+    )
+
+
+def markdown_pages(pages: Iterable[Page]) -> List[Page]:
+    """Returns the pages the conversion stage can convert: markdown pages with the text still in the page file"""
+    return [
+        page
+        for page in pages
+        if page.page_file_format is AllowedFileFormat.markdown
+        and not page.text_is_set
+        and Path(page.page_file).exists()
+    ]
+
+
+class ConversionStage:
+    """Converts the markdown pages in a pool of processes while the pages are being posted. The pages are submitted in
+    the given order, at most `window` pages ahead of the ones taken, so that the converted texts waiting to be posted
+    do not pile up in memory. Use as a context manager:
+
+    with ConversionStage(pages) as stage:
+        ...
+        text = stage.take(page)
+
+    :param pages: markdown pages, see markdown_pages
+    :param max_workers: amount of processes, CPU count by default
+    :param window: amount of pages converted ahead of posting, twice the amount of processes by default
+    :param cache_path: path to the conversion cache the processes use, if it is enabled
+    """
+
+    def __init__(
+        self,
+        pages: List[Page],
+        max_workers: Union[int, None] = None,
+        window: Union[int, None] = None,
+        cache_path: Union[Path, None] = None,
+    ):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.window = window or 2 * self.max_workers
+        self.cache_path = cache_path
+        self._pending = list(reversed(pages))
+        self._futures: Dict[int, Future] = {}
+        self._lock = Lock()
+        self._executor: Union[ProcessPoolExecutor, None] = None
+
+    def __enter__(self):
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=_init_worker,
+            initargs=(self.cache_path,),
+        )
+        with self._lock:
+            self._fill_window()
+        return self
+
+    def __exit__(self, *_):
+        with self._lock:
+            self._pending.clear()
+            for future in self._futures.values():
+                future.cancel()
+        self._executor.shutdown(wait=True)
+
+    def _fill_window(self):
+        while self._pending and len(self._futures) < self.window:
+            page = self._pending.pop()
+            try:
+                self._futures[id(page)] = self._executor.submit(
+                    _convert_file,
+                    page.page_file,
+                    page.strip_front_matter,
+                )
+            except BrokenProcessPool:
+                self._pending.clear()
+                return
+
+    def take(self, page: Page) -> Union[str, None]:
+        """Waits for the conversion of the page and hands the converted text over. The next page is submitted in
+        its place.
+
+        :return converted text or None if the stage does not convert the page (anymore), then the page is to be
+        converted in process
+        """
+        with self._lock:
+            future = self._futures.pop(id(page), None)
+            if future is None:
+                # Taken before it was submitted, the caller converts it
+                self._pending = [_ for _ in self._pending if _ is not page]
+            self._fill_window()
+        if future is None:
+            return None
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            return None
+
+
+def conversion_stage(pages: Iterable[Page], state: StateConfig) -> ContextManager:
+    """Returns the conversion stage for the markdown pages, or a context that does nothing if there are too few of them
+    to start the processes for"""
+    conversion_pages = markdown_pages(pages)
+    if len(conversion_pages) < min_pages_for_process_pool:
+        return nullcontext()
+    return ConversionStage(
+        conversion_pages,
+        cache_path=state.conversion_cache and state.conversion_cache.path,
+    )
+
+
+def convert_pages(
+    pages: List[PostedPage], state: StateConfig, use_confluence_converter: bool = False
+) -> Iterator[Tuple[PostedPage, str]]:
+    """Converts the pages at the same time: in a pool of processes with the markdown library, or sending as many
+    requests as the session to Confluence has connections with the Confluence converter.
+
+    :return pages with their converted texts, in the given order. The caller releases the texts
+    """
+    if use_confluence_converter:
+        with ThreadPoolExecutor(max_workers=state.config.http.pool_size) as executor:
+            yield from zip(
+                pages,
+                executor.map(
+                    partial(
+                        prepare_page_text,
+                        state=state,
+                        use_confluence_converter=True,
+                    ),
+                    pages,
+                ),
+            )
+        return
+
+    with conversion_stage(pages, state=state) as stage:
+        state.conversion_stage = stage
+        try:
+            for page in pages:
+                yield page, prepare_page_text(page, state=state)
+        finally:
+            state.conversion_stage = None
@@ -1,32 +1,77 @@
+import re
 from enum import Enum
 from pathlib import Path
-from atlassian import Confluence
-from requests import Response
-from markdown import markdown
+from typing import TYPE_CHECKING, Dict, Tuple
 
 from confluence_poster.poster_config import AllowedFileFormat
 
+if TYPE_CHECKING:
+    from atlassian import Confluence
+    from requests import Response
 
-def post_to_convert_api(confluence: Confluence, text: str) -> str:
+
+# YAML-style front matter, as used by static site generators: a block between "---" lines at the start of the file,
+# starting with a "key: value" line
+_front_matter = re.compile(
+    r"\A---[ \t]*\n(?P<block>[A-Za-z0-9_-]+[ \t]*:.*?\n)?(?:---|\.\.\.)[ \t]*(?:\n|\Z)",
+    re.DOTALL,
+)
+_front_matter_value = re.compile(
+    r"^(?P<key>[A-Za-z0-9_-]+)[ \t]*:[ \t]*(?P<value>.*?)[ \t]*$", re.MULTILINE
+)
+
+
+def split_front_matter(text: str) -> Tuple[Dict[str, str], str]:
+    """Separates the front matter from the text of the page. Only the top level keys with plain values are read
+
+    :return values of the front matter, text without the front matter
+    """
+    if (match := _front_matter.match(text)) is None:
+        return {}, text
+    values = {}
+    for value_match in _front_matter_value.finditer(match.group("block") or ""):
+        value = value_match.group("value")
+        if len(value) > 1 and value[0] == value[-1] and value[0] in "'\"":
+            value = value[1:-1]
+        values[value_match.group("key")] = value
+    return values, text[match.end() :]
+
+
+def post_to_convert_api(confluence: "Confluence", text: str) -> str:
     url = "rest/tinymce/1/markdownxhtmlconverter"
     # the endpoint returns plain text, need to redefine the default header
     headers = {"Content-Type": "application/json"}
-    # Keep until https://github.com/atlassian-api/atlassian-python-api/pull/684 is released
-    original_advanced_mode = confluence.advanced_mode
-    if confluence.advanced_mode is False or confluence.advanced_mode is None:
-        confluence.advanced_mode = True
-
-    response: Response = confluence.post(url, data={"wiki": text}, headers=headers)
+    # request() returns the response as is, unlike post(). Toggling confluence.advanced_mode instead would not be safe
+    # when the pages are converted from several threads
+    response: "Response" = confluence.request(
+        "POST", path=url, data={"wiki": text}, headers=headers
+    )
     # No way to trigger failure for this during tests
     response.raise_for_status()  # pragma: no cover
 
-    confluence.advanced_mode = original_advanced_mode
-
     return response.text
 
 
+markdown_extensions = ("tables", "fenced_code")
+
+
 def convert_using_markdown_lib(text: str) -> str:
-    return markdown(text, extensions=("tables", "fenced_code"))
+    from markdown import markdown
+
+    return markdown(text, extensions=markdown_extensions)
+
+
+def markdown_converter_id() -> str:
+    """Identifies the conversion done by convert_using_markdown_lib, for the conversion cache"""
+    import markdown
+
+    return f"markdown {markdown.__version__} {','.join(markdown_extensions)}"
+
+
+def confluence_converter_id(confluence: "Confluence") -> str:
+    """Identifies the conversion done by post_to_convert_api, for the conversion cache. The converter may change with
+    the version of the instance, so the cached texts are kept per instance"""
+    return f"confluence {confluence.url}"
 
 
 def guess_file_format(page_file: str) -> AllowedFileFormat:
@@ -1,21 +1,232 @@
-from typing import Iterable
+import os
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256
+from typing import Iterable, Dict, Union
 from pathlib import Path
+from uuid import uuid4
+
+from urllib3.fields import RequestField
 
 from confluence_poster.main_helpers import StateConfig, PostedPage
 
+# Files are read in blocks of this size while they are hashed and uploaded, they are never held in memory whole
+chunk_size = 1024 * 1024
+# Marks the hash of the uploaded file in the attachment comment, Confluence does not store the hashes itself
+digest_prefix = "sha256:"
+
+
+def file_digest(path: Path) -> str:
+    file_hash = sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+class MultipartFileBody:
+    """multipart/form-data body of the attachment upload, which reads the file while the request is sent.
+    requests streams the objects that can be iterated over and have the length, the body can be rewound with seek(0)
+    to retry the request.
+
+    :param path: the uploaded file
+    :param name: name of the attachment
+    :param content_type: content type of the file
+    :param fields: other form fields, e.g. the comment
+    """
+
+    def __init__(
+        self, path: Path, name: str, content_type: str, fields: Dict[str, str]
+    ):
+        self.path = path
+        self.boundary = uuid4().hex
+        head = b""
+        for field_name, value in fields.items():
+            field = RequestField(name=field_name, data=value)
+            field.make_multipart()
+            head += self._part_head(field) + value.encode() + b"\r\n"
+        file_field = RequestField(name="file", data=b"", filename=name)
+        file_field.make_multipart(content_type=content_type)
+        self._head = head + self._part_head(file_field)
+        self._tail = f"\r\n--{self.boundary}--\r\n".encode()
+        self._file_size = os.stat(path).st_size
+        self._file = None
+        self._position = 0
+
+    def _part_head(self, field: RequestField) -> bytes:
+        return f"--{self.boundary}\r\n{field.render_headers()}".encode()
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self):
+        return len(self._head) + self._file_size + len(self._tail)
+
+    def __iter__(self):
+        while chunk := self.read(chunk_size):
+            yield chunk
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = len(self) - self._position
+        file_start = len(self._head)
+        file_end = file_start + self._file_size
+        chunks = []
+        while size > 0 and self._position < len(self):
+            if self._position < file_start:
+                chunk = self._head[self._position : self._position + size]
+            elif self._position < file_end:
+                if self._file is None:
+                    self._file = open(self.path, "rb")
+                self._file.seek(self._position - file_start)
+                chunk = self._file.read(min(size, file_end - self._position))
+                if not chunk:
+                    raise IOError(f"File {self.path} changed while it was uploaded")
+            else:
+                chunk = self._tail[
+                    self._position - file_end : self._position - file_end + size
+                ]
+            chunks.append(chunk)
+            self._position += len(chunk)
+            size -= len(chunk)
+        if self._position >= file_end:
+            self.close()
+        return b"".join(chunks)
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        elif whence == os.SEEK_END:
+            offset += len(self)
+        self._position = offset
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _attachments_path(page_id: Union[str, int]) -> str:
+    return f"rest/api/content/{page_id}/child/attachment"
+
+
+def get_page_attachments(page: PostedPage, state: StateConfig) -> Dict[str, dict]:
+    """Fetches the metadata of all attachments of the page
+
+    :return mapping of attachment names to the attachments as returned by the API
+    """
+    attachments = {}
+    start = 0
+    while True:
+        response = state.confluence_instance.get(
+            _attachments_path(page.page_id),
+            params={"start": start, "limit": 100, "expand": "version,metadata"},
+        )
+        for attachment in response["results"]:
+            attachments[attachment["title"]] = attachment
+        if "next" not in response.get("_links", {}) or not response["size"]:
+            break
+        start += response["size"]
+    return attachments
+
+
+def attachment_unchanged(attachment: dict, size: int, digest: str) -> bool:
+    """Checks whether the attachment holds the file with the given size and hash"""
+    comment = attachment.get("metadata", {}).get("comment") or attachment.get(
+        "extensions", {}
+    ).get("comment", "")
+    return (
+        attachment.get("extensions", {}).get("fileSize") == size
+        and f"{digest_prefix}{digest}" in comment
+    )
+
+
+def upload_file(
+    path: Path,
+    page: PostedPage,
+    attachment: Union[dict, None],
+    state: StateConfig,
+) -> bool:
+    """Uploads the file as a new attachment or a new version of the existing one, unless the attachment holds
+    the same file already
+
+    :return True if the file was uploaded, False if it is unchanged
+    """
+    confluence = state.confluence_instance
+    size = os.stat(path).st_size
+    digest = file_digest(path)
+    if attachment is not None and attachment_unchanged(attachment, size, digest):
+        return False
+
+    body = MultipartFileBody(
+        path,
+        name=path.name,
+        content_type=confluence.content_types.get(path.suffix, "application/binary"),
+        fields={
+            "comment": f"Uploaded {path.name}. {digest_prefix}{digest}",
+            "minorEdit": "true",
+        },
+    )
+    upload_path = _attachments_path(page.page_id)
+    if attachment is not None:
+        upload_path += f"/{attachment['id']}/data"
+    try:
+        # Confluence.request() serializes the data as JSON unless files are passed. The empty files leave the streamed
+        # body as it is: requests builds the multipart body itself only if there are files
+        confluence.post(
+            upload_path,
+            data=body,
+            files={},
+            headers={
+                "X-Atlassian-Token": "nocheck",
+                "Accept": "application/json",
+                "Content-Type": body.content_type,
+            },
+        )
+    finally:
+        body.close()
+    return True
+
 
 def attach_files_to_page(
-    page: PostedPage, files: Iterable[Path], state: StateConfig
+    page: PostedPage, files: Iterable[Path], state: StateConfig, jobs: int = 1
 ) -> None:
+    """Uploads the files to the page, up to `jobs` files at a time. The existing attachments are fetched once,
+    the files that are already attached are skipped"""
     echo = state.print_function
     always_echo = state.always_print_function
 
     always_echo("Uploading the files")
+    uploaded_files: Dict[str, Path] = {}
     for path in files:
-        if path.is_file():
-            echo(f"\tUploading file {path.name}...")
-            state.confluence_instance.attach_file(
-                str(path), name=path.name, page_id=str(page.page_id)
+        if not path.is_file():
+            continue
+        if path.name in uploaded_files:
+            echo(
+                f"\tSkipping file {path}: file {uploaded_files[path.name]} is uploaded with the same name."
             )
-            echo(f"\tUploaded file {path.name}.")
+            continue
+        uploaded_files[path.name] = path
+
+    with state.profiler.span("attachment_lookup", page=page.page_title):
+        attachments = get_page_attachments(page, state=state)
+
+    def _upload(path: Path) -> bool:
+        with state.profiler.span("upload", page=page.page_title):
+            return upload_file(
+                path, page=page, attachment=attachments.get(path.name), state=state
+            )
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for path, uploaded in zip(
+            uploaded_files.values(), executor.map(_upload, uploaded_files.values())
+        ):
+            if uploaded:
+                echo(f"\tUploaded file {path.name}.")
+            else:
+                echo(f"\tFile {path.name} is already attached. Skipping.")
     always_echo("Done uploading files")
@@ -0,0 +1,67 @@
+from hashlib import sha256
+from typing import Union
+
+from confluence_poster.main_helpers import StateConfig
+from confluence_poster.convert_utils import Representation
+
+"""Helpers that allow skipping the updates of pages that did not change since they were last posted.
+
+The fingerprint of the posted body is stored on the page itself as a content property, together with the version of
+the page it was posted as. If somebody edits the page afterwards, the version changes and the page is posted again."""
+
+fingerprint_property_key = "confluence-poster-fingerprint"
+fingerprint_expand = f"metadata.properties.{fingerprint_property_key}"
+
+
+def page_fingerprint(body: str, representation: Representation) -> str:
+    """Returns hash of the page body together with the representation it is posted in"""
+    return sha256(f"{representation.value}\n{body}".encode()).hexdigest()
+
+
+def get_stored_fingerprint(page: dict) -> Union[dict, None]:
+    """Retrieves the fingerprint property from the page fetched with `fingerprint_expand`
+
+    :return the property (key, value and version) or None if the page does not have it
+    """
+    return page.get("metadata", {}).get("properties", {}).get(fingerprint_property_key)
+
+
+def fingerprint_matches(page: dict, fingerprint: str) -> bool:
+    """Checks that the page was last posted with the same fingerprint and was not edited since then
+
+    :param page: page fetched with "version" and `fingerprint_expand`
+    :param fingerprint: fingerprint of the body to be posted
+    """
+    if (stored_property := get_stored_fingerprint(page)) is None:
+        return False
+    stored_value = stored_property["value"]
+    return (
+        stored_value.get("fingerprint") == fingerprint
+        and stored_value.get("page_version") == page["version"]["number"]
+    )
+
+
+def store_fingerprint(
+    page_id: int,
+    fingerprint: str,
+    page_version: int,
+    state: StateConfig,
+    stored_property: Union[dict, None] = None,
+) -> None:
+    """Saves the fingerprint of the posted body on the page
+
+    :param page_id: ID of the page
+    :param fingerprint: fingerprint of the posted body
+    :param page_version: version of the page the body was posted as
+    :param state: state with the Confluence instance
+    :param stored_property: the property as it was retrieved by get_stored_fingerprint, if the page has it
+    """
+    data = {
+        "key": fingerprint_property_key,
+        "value": {"fingerprint": fingerprint, "page_version": page_version},
+    }
+    if stored_property is None:
+        state.confluence_instance.set_page_property(page_id, data)
+    else:
+        data["version"] = {"number": stored_property["version"]["number"] + 1}
+        state.confluence_instance.update_page_property(page_id, data)
@@ -0,0 +1,192 @@
+import gzip
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Union
+
+from atlassian import Confluence
+from requests import Session, PreparedRequest, Response
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError
+
+from confluence_poster.poster_config import Http
+from confluence_poster.rate_limit_helpers import RequestStats, RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Statuses Confluence returns when it throttles the client or is temporarily overloaded
+retry_statuses = {429, 503}
+# Methods that are safe to repeat if the connection broke before the response arrived. PUT is not among them: page
+# updates carry the next version number, if the first attempt reached the server the repeated one is rejected with 409
+idempotent_methods = {"GET", "HEAD", "OPTIONS", "DELETE"}
+
+
+def get_retry_after(response: Response) -> Union[float, None]:
+    """Parses the Retry-After header, which is either the amount of seconds or an HTTP date
+
+    :return seconds to wait or None if the header is missing or invalid
+    """
+    if (value := response.headers.get("Retry-After")) is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_date.tzinfo is None:
+        retry_date = retry_date.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_date - datetime.now(timezone.utc)).total_seconds())
+
+
+def _rewind_body(request: PreparedRequest) -> bool:
+    """Prepares the request body to be sent again
+
+    :return False if the body is a stream that cannot be sent again
+    """
+    body = request.body
+    if body is None or isinstance(body, (str, bytes)):
+        return True
+    if hasattr(body, "seek"):
+        body.seek(0)
+        return True
+    return False
+
+
+class PosterHTTPAdapter(HTTPAdapter):
+    """Adapter that retries throttled requests and can compress large request bodies, e.g. storage format payloads
+    of big pages"""
+
+    def __init__(
+        self,
+        gzip_requests: bool = False,
+        gzip_min_size: int = 0,
+        max_retries_on_throttling: int = 0,
+        backoff_factor: float = 0.5,
+        max_backoff: float = 60.0,
+        rate_limiter: Union[RateLimiter, None] = None,
+        stats: Union[RequestStats, None] = None,
+        **kwargs,
+    ):
+        self.gzip_requests = gzip_requests
+        self.gzip_min_size = gzip_min_size
+        self.max_retries_on_throttling = max_retries_on_throttling
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.stats = stats or RequestStats()
+        super(PosterHTTPAdapter, self).__init__(**kwargs)
+
+    def backoff(self, attempt: int) -> float:
+        """Exponential backoff with full jitter, so that the threads do not retry all at once"""
+        return random.uniform(
+            0, min(self.max_backoff, self.backoff_factor * 2 ** attempt)
+        )
+
+    def send(self, request: PreparedRequest, **kwargs):
+        if self.gzip_requests and "Content-Encoding" not in request.headers:
+            body = request.body
+            if isinstance(body, str):
+                body = body.encode("utf-8")
+            # Streamed bodies (files, generators) are sent as is
+            if isinstance(body, bytes) and len(body) >= self.gzip_min_size:
+                request.body = gzip.compress(body)
+                request.headers["Content-Encoding"] = "gzip"
+                request.headers["Content-Length"] = str(len(request.body))
+
+        attempt = 0
+        while True:
+            self.stats.record(wait_time=self.rate_limiter.acquire())
+            can_retry = attempt < self.max_retries_on_throttling
+            try:
+                response = super(PosterHTTPAdapter, self).send(request, **kwargs)
+            except ConnectionError as e:
+                # The request might have reached the server, only the requests without side effects are repeated
+                if not (
+                    can_retry
+                    and request.method in idempotent_methods
+                    and _rewind_body(request)
+                ):
+                    raise e
+                delay = self.backoff(attempt)
+                logger.debug(f"{request.method} {request.url} failed: {e}")
+            else:
+                if response.status_code not in retry_statuses:
+                    self.rate_limiter.succeeded()
+                    return response
+                self.rate_limiter.throttled()
+                self.stats.record(throttled=1)
+                if not (can_retry and _rewind_body(request)):
+                    return response
+                retry_after = get_retry_after(response)
+                delay = (
+                    retry_after if retry_after is not None else self.backoff(attempt)
+                )
+                logger.debug(
+                    f"{request.method} {request.url} returned {response.status_code}"
+                )
+                response.close()
+
+            logger.debug(f"Retrying in {delay:.1f}s")
+            self.stats.record(retries=1, wait_time=delay)
+            time.sleep(delay)
+            attempt += 1
+
+
+class PosterConfluence(Confluence):
+    """Confluence that does not serialize the streamed request bodies, e.g. the attachment uploads, to log them: that
+    would read them whole"""
+
+    def log_curl_debug(self, method, url, data=None, headers=None, **kwargs):
+        if not isinstance(data, (str, bytes, dict, list, type(None))):
+            data = f"<{type(data).__name__}>"
+        super(PosterConfluence, self).log_curl_debug(
+            method, url, data=data, headers=headers, **kwargs
+        )
+
+
+def make_confluence(
+    url: str,
+    username: str,
+    password: str,
+    api_version: str,
+    http_config: Http,
+    stats: Union[RequestStats, None] = None,
+) -> PosterConfluence:
+    """Creates the instance of Confluence with the session configured according to the [http] section of the config"""
+    return PosterConfluence(
+        url=url,
+        username=username,
+        password=password,
+        api_version=api_version,
+        session=make_session(http_config, stats=stats),
+    )
+
+
+def make_session(http_config: Http, stats: Union[RequestStats, None] = None) -> Session:
+    """Creates the session for the Confluence instance, configured according to the [http] section of the config
+
+    :param http_config: the [http] section of the config
+    :param stats: object to collect the retry statistics in
+    """
+    session = Session()
+    adapter = PosterHTTPAdapter(
+        gzip_requests=http_config.gzip_requests,
+        gzip_min_size=http_config.gzip_min_size,
+        max_retries_on_throttling=http_config.max_retries,
+        backoff_factor=http_config.backoff_factor,
+        max_backoff=http_config.max_backoff,
+        rate_limiter=RateLimiter(max_rate=http_config.requests_per_second),
+        stats=stats,
+        pool_connections=http_config.pool_size,
+        pool_maxsize=http_config.pool_size,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if not http_config.keep_alive:
+        session.headers["Connection"] = "close"
+    return session
@@ -1,31 +1,29 @@
 import typer
 import sys
+import json
 from click import Choice
-from typing import Optional, List, Tuple
+from typing import Optional, List, Tuple, Union, Callable
 from pathlib import Path
 from logging import basicConfig, DEBUG
-from atlassian import Confluence
-from atlassian.errors import ApiError
 from dataclasses import dataclass, field, astuple
-from requests.exceptions import ConnectionError
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from collections import Counter
 
-from confluence_poster.poster_config import Page, AllowedFileFormat
+from confluence_poster.poster_config import AllowedFileFormat
 from confluence_poster.config_loader import load_config
-from confluence_poster.config_wizard import DialogParameter, generate_page_dialog_params
 from confluence_poster.main_helpers import (
-    check_last_updated_by,
     PostedPage,
     StateConfig,
-    get_page_url,
+    ReportFormat,
+    prepare_page_text,
 )
 from confluence_poster.convert_utils import (
     guess_file_format,
     get_representation_for_format,
-    post_to_convert_api,
-    convert_using_markdown_lib,
 )
-from confluence_poster.page_creation_helpers import create_page
-from confluence_poster.file_upload_helpers import attach_files_to_page
+from confluence_poster.rate_limit_helpers import RequestStats
+from confluence_poster.profiling_helpers import Profiler, ProfileFormat
 
 __version__ = "1.4.1"
 default_config_name = "config.toml"
@@ -39,10 +37,45 @@ def version_callback(value: bool):
 
 @dataclass
 class Report:
-    created_pages: List[Page] = field(default_factory=list)
-    updated_pages: List[Page] = field(default_factory=list)
-    unprocessed_pages: List[Tuple[Page, str]] = field(default_factory=list)
-    confluence_instance: Confluence = None
+    created_pages: List[PostedPage] = field(default_factory=list)
+    updated_pages: List[PostedPage] = field(default_factory=list)
+    unprocessed_pages: List[Tuple[PostedPage, str]] = field(default_factory=list)
+    unchanged_pages: List[PostedPage] = field(default_factory=list)
+    # If set - every page is passed to this function as a JSON line as soon as it is processed
+    json_lines_function: Union[Callable, None] = None
+    request_stats: Union[RequestStats, None] = None
+
+    def add_page(
+        self, page: PostedPage, status: str, reason: Union[str, None] = None
+    ) -> None:
+        """Records the processed page
+
+        :param status: one of "created", "updated", "unchanged" or "unprocessed"
+        :param reason: the reason the page was not processed
+        """
+        if status == "unprocessed":
+            self.unprocessed_pages += [(page, reason)]
+        else:
+            getattr(self, f"{status}_pages").append(page)
+
+        if self.json_lines_function is not None:
+            self.json_lines_function(
+                json.dumps(
+                    {
+                        "space": page.page_space,
+                        "title": page.page_title,
+                        "status": status,
+                        "page_id": page.page_id,
+                        "url": page.page_url,
+                        "reason": reason,
+                    }
+                )
+            )
+
+    @property
+    def posted_pages(self) -> List[PostedPage]:
+        """The pages that were created, updated or found unchanged"""
+        return self.created_pages + self.updated_pages + self.unchanged_pages
 
     def __str__(self) -> str:
         output = ""
@@ -53,23 +86,51 @@ class Report:
             output += header + "\n"
             if page_list:
                 for page in page_list:
-                    title = page.page_title
-                    space = page.page_space
-                    output += f"{space}::{title} {get_page_url(title, space, self.confluence_instance)}\n"
+                    output += f"{page.page_space}::{page.page_title} {page.page_url}\n"
             else:
                 output += "None\n"
+        if self.unchanged_pages:
+            output += "Unchanged pages:\n"
+            for page in self.unchanged_pages:
+                output += f"{page.page_space}::{page.page_title}\n"
         if self.unprocessed_pages:
             output += "Unprocessed pages:"
             for page, reason in self.unprocessed_pages:
                 output += f"{page.page_space}::{page.page_title} Reason: {reason}"
+        if self.request_stats is not None and (
+            self.request_stats.retries or self.request_stats.throttled
+        ):
+            output += f"{self.request_stats}\n"
 
         return output
 
+    def json_summary(self) -> str:
+        """Returns the retry statistics as a JSON line, printed after all pages"""
+        stats = self.request_stats or RequestStats()
+        return json.dumps(
+            {
+                "retries": stats.retries,
+                "throttled": stats.throttled,
+                "wait_time": round(stats.wait_time, 3),
+            }
+        )
+
 
 app = typer.Typer()
 state = StateConfig()
 
 
+def finish_profiling(
+    print_summary: bool, dump_file: Union[Path, None], profile_format: ProfileFormat
+) -> None:
+    """Prints and saves the collected timings at the end of the run"""
+    if print_summary:
+        state.print_stderr(state.profiler.summary())
+    if dump_file is not None:
+        with open(dump_file, "w") as f:
+            state.profiler.dump(f, profile_format)
+
+
 @app.command()
 def convert_markdown(
     use_confluence_converter: Optional[bool] = typer.Option(
@@ -77,33 +138,96 @@ def convert_markdown(
         "--use-confluence-converter",
         show_default=False,
         help="Use built-in Confluence converter. Note: uses Confluence private API.",
-    )
+    ),
+    output_dir: Optional[Path] = typer.Option(
+        None,
+        "--output-dir",
+        file_okay=False,
+        show_default=False,
+        help="Write every converted page to <file name>.html in the directory instead of printing it.",
+    ),
+    jsonl: Optional[bool] = typer.Option(
+        False,
+        "--jsonl",
+        show_default=False,
+        help="Print every converted page as a JSON line with the page title, the file and the converted text. "
+        "Implied if several pages are converted without --output-dir.",
+    ),
+    files: Optional[List[str]] = typer.Argument(
+        None,
+        help="Files or glob patterns of the files to convert instead of the pages from the config.",
+    ),
 ):
-    """Converts single page text to html. Prints the converted text.
+    """Converts the text of the pages to html. Prints the converted text.
     Implies running the utility with --quiet. Logs runtime info only to stderr.
 
     When the page is posted, "editor" representation should be used.
 
     By default uses python's markdown library with fenced code and tables extensions to render markdown to html.
+    Several pages are converted in parallel processes.
 
     If --use-confluence-converter flag is used - uses Confluence built-in converter."""
-    confluence = state.confluence_instance
+    from glob import glob
+    from confluence_poster.conversion_helpers import convert_pages
+
     always_echo = state.always_print_function
     echo_err = state.print_stderr
-    text = state.config.pages[0].page_text
 
-    if len(state.config.pages) > 1:
-        echo_err("This command supports converting only one page at a time.")
-        raise typer.Exit(1)
+    if files:
+        pages = []
+        for pattern in files:
+            if not (matched_files := sorted(glob(pattern, recursive=True))):
+                echo_err(f"No files match '{pattern}'.")
+                raise typer.Exit(1)
+            pages += [
+                PostedPage(page_title=Path(_).stem, page_file=_, page_space=None)
+                for _ in matched_files
+            ]
+    else:
+        pages = [PostedPage(*astuple(_)) for _ in state.config.pages]
+    for page in pages:
+        page.page_file_format = AllowedFileFormat.markdown
+
+    if output_dir is not None:
+        output_files = [output_dir / f"{Path(_.page_file).stem}.html" for _ in pages]
+        if duplicates := [
+            str(_) for _, count in Counter(output_files).items() if count > 1
+        ]:
+            echo_err(
+                f"Several pages would be written to the same file: {', '.join(duplicates)}."
+            )
+            raise typer.Exit(1)
+        output_dir.mkdir(parents=True, exist_ok=True)
+    else:
+        output_files = [None] * len(pages)
+        jsonl = jsonl or len(pages) > 1
 
     if use_confluence_converter:
         echo_err(
             "Using the converter built into Confluence which is labeled as private API. "
             "The results may be less than satisfactory."
         )
-        always_echo(post_to_convert_api(confluence, text))
-    else:
-        always_echo(convert_using_markdown_lib(text))
+    for (page, converted_text), output_file in zip(
+        convert_pages(
+            pages, state=state, use_confluence_converter=use_confluence_converter
+        ),
+        output_files,
+    ):
+        if output_file is not None:
+            output_file.write_text(converted_text)
+        elif jsonl:
+            always_echo(
+                json.dumps(
+                    {
+                        "page_title": page.page_title,
+                        "page_file": page.page_file,
+                        "text": converted_text,
+                    }
+                )
+            )
+        else:
+            always_echo(converted_text)
+        page.release_text()
 
     echo_err(
         "Submit the converted text using `confluence_poster post-page --file-format html`.",
@@ -113,7 +237,10 @@ def convert_markdown(
 @app.command()
 def post_page(
     upload_files: Optional[bool] = typer.Option(
-        False, "--upload-files", show_default=False, help="Upload list of files."
+        False,
+        "--upload-files",
+        show_default=False,
+        help="Upload list of files. Files that are already attached to the page are not uploaded again.",
     ),
     version_comment: Optional[str] = typer.Option(
         None,
@@ -135,17 +262,53 @@ def post_page(
         "If provided at runtime - can only be applied to a single page. "
         "If set to 'None'(default) - script will try to guess it during the run.",
     ),
+    skip_unchanged: Optional[bool] = typer.Option(
+        False,
+        "--skip-unchanged",
+        show_default=False,
+        help="Do not update the pages that did not change since they were last posted. "
+        "Stores the fingerprint of the posted text in a page property.",
+    ),
+    jobs: Optional[int] = typer.Option(
+        1,
+        "--jobs",
+        "-j",
+        min=1,
+        help="Number of pages to look up, update and create at the same time. "
+        "Pages are created at the same time only with --force-create, when there is nothing to prompt for.",
+    ),
+    upload_jobs: Optional[int] = typer.Option(
+        4,
+        "--upload-jobs",
+        min=1,
+        help="Number of files to upload at the same time.",
+    ),
     files: Optional[List[Path]] = typer.Argument(None, help="List of files to upload"),
 ):
     """Posts the content of the pages."""
+    from confluence_poster.page_creation_helpers import create_page, creation_levels
+    from confluence_poster.page_update_helpers import update_page, UpdateResult
+    from confluence_poster.fingerprint_helpers import (
+        page_fingerprint,
+        store_fingerprint,
+        fingerprint_expand,
+    )
+    from confluence_poster.page_lookup_helpers import resolve_pages
+    from confluence_poster.file_upload_helpers import attach_files_to_page
+    from confluence_poster.conversion_helpers import conversion_stage
+
     echo = state.print_function
     always_echo = state.always_print_function
     echo_err = state.print_stderr
     confirm = state.confirm_function
     prompt = state.prompt_function
 
-    report = Report(confluence_instance=state.confluence_instance)
-    confluence = state.confluence_instance
+    if state.print_report and state.report_format is ReportFormat.jsonl:
+        report = Report(
+            json_lines_function=always_echo, request_stats=state.request_stats
+        )
+    else:
+        report = Report(request_stats=state.request_stats)
     posted_pages = [PostedPage(*astuple(_)) for _ in state.config.pages]
     target_page = posted_pages[0]
 
@@ -192,6 +355,8 @@ def post_page(
                 echo_err("Aborting.")
                 raise typer.Exit(3)
 
+    # The formats are determined up front, so that the run fails before anything is posted. The texts are read and
+    # converted only when the pages are posted, see prepare_page_text
     for page in posted_pages:
         if page.page_file_format is AllowedFileFormat.none:
             echo(
@@ -208,74 +373,342 @@ def post_page(
             echo(f"Guessed file format as {guessed_format.value}")
             page.page_file_format = guessed_format
 
-        if page.page_file_format is AllowedFileFormat.markdown:
-            page.page_text = convert_using_markdown_lib(page.page_text)
-
-        echo(f"Looking for page '{page.page_title}'")
-        if page_id := confluence.get_page_id(
-            space=page.page_space, title=page.page_title
-        ):
-            # Page exists
-            echo(f"Found page id #{page_id}")
-            page.page_id = page_id
-
-            # If --force is supplied - we do not really care about who edited the page last
-            if not (state.force or page.force_overwrite):
-                updated_by_author, page_last_updated_by = check_last_updated_by(
-                    page_id=page_id,
-                    username_to_check=state.config.author,
-                    confluence_instance=confluence,
+    # Markdown is converted in other processes while the pages are looked up and posted
+    with conversion_stage(posted_pages, state=state) as stage:
+        state.conversion_stage = stage
+        if len(posted_pages) > 1:
+            # Find the existing pages and their parents with a few searches instead of looking them up one by one
+            with state.profiler.span("resolve"):
+                resolve_pages(
+                    [
+                        page
+                        for page in posted_pages
+                        if state.page_index is None
+                        or state.page_index.get(page.page_space, page.page_title)
+                        is None
+                    ],
+                    state=state,
+                    expand=f"version,{fingerprint_expand}"
+                    if skip_unchanged
+                    else "version",
                 )
-                if not updated_by_author:
-                    echo(
-                        f"Flag 'force' is not set and last author of page '{page.page_title}'"
-                        f" is {page_last_updated_by}, not {state.config.author}. Skipping page"
-                    )
-                    continue
-            else:
-                if state.force:
-                    echo("Flag 'force' set globally.")
-                elif page.force_overwrite:
-                    echo("Flag 'force overwrite' set on the page.")
-                echo("Author name check skipped.")
-
-            echo(f"Updating page #{page_id}")
-            confluence.update_existing_page(
-                page_id=page_id,
-                title=page.page_title,
-                body=page.page_text,
-                representation=get_representation_for_format(
-                    page.page_file_format
-                ).value,
-                minor_edit=state.minor_edit,
-                version_comment=page.version_comment,
-            )
-            report.updated_pages += [page]
-        else:
+
+        if jobs > state.config.http.pool_size:
             echo(
-                f"Could not find page '{page.page_title}' in space '{page.page_space}'"
+                f"Running {jobs} jobs with {state.config.http.pool_size} connections to Confluence. "
+                "Consider increasing pool_size in the [http] section of the config."
             )
+
+        def _update_page(page_to_update: PostedPage) -> UpdateResult:
+            update_result = update_page(
+                page_to_update, state=state, skip_unchanged=skip_unchanged
+            )
+            if update_result:
+                page_to_update.release_text()
+            # else the converted text of the page that was not found is kept until it is created
+            return update_result
+
+        def _create_page(
+            page_to_create: PostedPage,
+        ) -> Tuple[PostedPage, str, Union[str, None]]:
+            """Creates the page. Runs in the pool, so the page is reported by the caller
+
+            :return the page, its status and the reason for the report
+            """
+            prepare_page_text(page_to_create, state=state)
             if page_created := create_page(
-                page=page, state=state, create_in_root=create_in_space_root
+                page=page_to_create, state=state, create_in_root=create_in_space_root
             ):
-                report.created_pages += [page]
                 if version_comment:
                     echo(
                         "Page was created, but Confluence API does not support setting the version comment for"
                         " page creation. The comment was not saved in the page history."
                     )
-                page.page_id = page_created.page_id
+                page_to_create.page_id = page_created.page_id
+                page_to_create.page_url = page_created.page_url
+                if skip_unchanged:
+                    with state.profiler.span(
+                        "store_fingerprint", page=page_to_create.page_title
+                    ):
+                        store_fingerprint(
+                            page_id=page_to_create.page_id,
+                            fingerprint=page_fingerprint(
+                                page_to_create.page_text,
+                                get_representation_for_format(
+                                    page_to_create.page_file_format
+                                ),
+                            ),
+                            page_version=1,
+                            state=state,
+                        )
+                result = page_to_create, "created", None
             else:
-                always_echo(f"Not creating page '{page.page_title}'")
-                report.unprocessed_pages += [(page, page_created.comment)]
+                always_echo(f"Not creating page '{page_to_create.page_title}'")
+                result = page_to_create, "unprocessed", page_created.comment
+            page_to_create.release_text()
+            return result
+
+        # Lookups, author checks and updates do not need user input and run in the pool
+        pages_to_create = []
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            update_results = executor.map(_update_page, posted_pages)
+            for page, update_result in zip(posted_pages, update_results):
+                if update_result:
+                    if update_result.page_updated:
+                        report.add_page(page, "updated")
+                    elif update_result.page_unchanged:
+                        report.add_page(page, "unchanged")
+                    else:
+                        # The page was found but skipped, e.g. by the author check
+                        report.add_page(page, "unprocessed", update_result.comment)
+                else:
+                    pages_to_create.append(page)
 
-        if upload_files and target_page.page_id is not None:
-            attach_files_to_page(page=target_page, files=files, state=state)
+        # Parents are created before their children, whatever the order of the pages in the config
+        levels, cyclic_pages = creation_levels(pages_to_create)
+        for page in cyclic_pages:
+            always_echo(
+                f"Not creating page '{page.page_title}': its parent pages refer to each other in a cycle"
+            )
+            report.add_page(page, "unprocessed", "Parent pages form a cycle.")
+            page.release_text()
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            for level in levels:
+                if state.force_create and (
+                    create_in_space_root or all(_.parent_page_title for _ in level)
+                ):
+                    # Nothing to prompt for, the pages of the level are created at the same time
+                    create_results = executor.map(_create_page, level)
+                else:
+                    create_results = map(_create_page, level)
+                # Reported in the order of the config, whatever order the pages were created in
+                for create_result in create_results:
+                    report.add_page(*create_result)
+    state.conversion_stage = None
+
+    # The files are attached to the first page only, once all pages are posted. If the page was skipped, e.g. by the
+    # author check, it is left as it is
+    if upload_files and any(target_page is page for page in report.posted_pages):
+        attach_files_to_page(
+            page=target_page, files=files, state=state, jobs=upload_jobs
+        )
 
     always_echo("Finished processing pages")
 
     if state.print_report:
-        always_echo(report)
+        if state.report_format is ReportFormat.text:
+            always_echo(report)
+        else:
+            always_echo(report.json_summary())
+    return report
+
+
+@app.command()
+def watch(
+    debounce: Optional[float] = typer.Option(
+        0.2,
+        "--debounce",
+        min=0,
+        help="Seconds to wait after a file is written before the page is posted. Writes in the meantime are "
+        "posted together.",
+    ),
+    poll_interval: Optional[float] = typer.Option(
+        0.2,
+        "--poll-interval",
+        min=0.01,
+        help="Seconds between the checks of the files, if the system cannot notify about the changes.",
+    ),
+    create_in_space_root: Optional[bool] = typer.Option(
+        False,
+        "--create-in-space-root",
+        show_default=False,
+        help="Create the page in space root.",
+    ),
+):
+    """Watches the page files and posts a page as soon as its file changes. Runs until interrupted.
+
+    The connection to Confluence and the IDs of the posted pages are kept between the changes, so that a change is
+    usually posted with a single request."""
+    from confluence_poster.watch_helpers import watch_pages
+    from confluence_poster.page_index import PageIndex
+
+    echo = state.print_function
+    echo_err = state.print_stderr
+
+    posted_pages = [PostedPage(*astuple(_)) for _ in state.config.pages]
+    for page in posted_pages:
+        if page.page_file_format is AllowedFileFormat.none:
+            try:
+                page.page_file_format = guess_file_format(page.page_file)
+            except ValueError as e:
+                echo_err(
+                    "Could not guess the file format. Consider specifying it manually. "
+                    "See --help for information.",
+                )
+                raise e
+            echo(
+                f"Guessed file format of page {page.page_title} as {page.page_file_format.value}"
+            )
+
+    if state.page_index is None:
+        # The IDs and versions of the pages posted while watching are kept in memory
+        state.page_index = PageIndex(
+            confluence_url=state.confluence_instance.url, path=":memory:"
+        )
+
+    if len(posted_pages) > 1:
+        from confluence_poster.page_lookup_helpers import resolve_pages
+
+        resolve_pages(posted_pages, state=state)
+
+    watch_pages(
+        posted_pages,
+        state=state,
+        debounce=debounce,
+        poll_interval=poll_interval,
+        create_in_root=create_in_space_root,
+    )
+
+
+@app.command()
+def sync(
+    since: Optional[str] = typer.Option(
+        None,
+        "--since",
+        show_default=False,
+        help="Revision to post the changes since. By default - the revision synced by the previous run. "
+        "If there is none, all pages are posted.",
+    ),
+    until: Optional[str] = typer.Option(
+        None,
+        "--until",
+        show_default=False,
+        help="Revision to post the changes up to. By default - the working tree, including the uncommitted changes.",
+    ),
+    create_in_space_root: Optional[bool] = typer.Option(
+        False,
+        "--create-in-space-root",
+        show_default=False,
+        help="Create the page in space root.",
+    ),
+    jobs: Optional[int] = typer.Option(
+        1,
+        "--jobs",
+        "-j",
+        min=1,
+        help="Number of pages to look up, update and create at the same time.",
+    ),
+    files: Optional[List[Path]] = typer.Argument(
+        None, help="Files to attach to the first page, if they changed."
+    ),
+):
+    """Posts the pages whose files changed in the git repository since the last sync. Replaces running post-page from
+    a git hook: the pages that did not change are not posted.
+
+    The synced revision is recorded in $XDG_CACHE_HOME, so that the next run posts only the newer changes. If some of
+    the changed pages were not posted, e.g. were skipped by the author check, the revision is not recorded and the
+    pages are posted again by the next run. The pages posted with the uncommitted changes are posted again by the next
+    run as well."""
+    from confluence_poster.sync_helpers import (
+        GitError,
+        LastSync,
+        SyncIndex,
+        repository_root,
+        resolve_revision,
+        changed_files,
+        sync_key,
+        read_last_synced,
+        record_synced,
+    )
+    from confluence_poster.file_upload_helpers import attach_files_to_page
+
+    echo = state.print_function
+    always_echo = state.always_print_function
+    echo_err = state.print_stderr
+    config = state.config
+
+    try:
+        root = repository_root(Path.cwd())
+        key = sync_key(root, state.confluence_instance.url, config.pages)
+        synced_revision = resolve_revision(until or "HEAD", root)
+        if since is None:
+            last_sync = read_last_synced(key)
+        else:
+            last_sync = LastSync(resolve_revision(since, root))
+        index = SyncIndex(config.pages, attachments=files or [])
+        # The uncommitted changes posted with the working tree are not in the synced revision, the next run posts
+        # their files again
+        uncommitted_files = (
+            index.synced_files(changed_files(root, synced_revision))
+            if until is None
+            else set()
+        )
+        if last_sync is None:
+            echo("No previous sync found, posting all pages.")
+            pages, attachments = index.pages, [_ for _ in files or [] if _.is_file()]
+        else:
+            changes = changed_files(root, last_sync.revision, until) | {
+                root / _ for _ in last_sync.uncommitted_files
+            }
+            pages = index.changed_pages(changes)
+            attachments = index.changed_attachments(changes)
+    except GitError as e:
+        echo_err(f"Could not read the changes from git: {e}")
+        raise typer.Exit(1)
+
+    if not pages and not attachments:
+        always_echo("Nothing changed since the last sync.")
+    if pages:
+        always_echo(
+            f"Posting {len(pages)} changed pages: {', '.join(_.page_title for _ in pages)}"
+        )
+        # post-page posts the pages of the config, the config holds only the changed pages meanwhile
+        all_pages = list(config.pages)
+        config.pages[:] = pages
+        try:
+            report = post_page(
+                upload_files=False,
+                version_comment=None,
+                create_in_space_root=create_in_space_root,
+                file_format=AllowedFileFormat.none,
+                skip_unchanged=False,
+                jobs=jobs,
+                upload_jobs=4,
+                files=[],
+            )
+        finally:
+            config.pages[:] = all_pages
+    if attachments:
+        target_page = PostedPage(*astuple(config.pages[0]))
+        target_page.page_id = state.confluence_instance.get_page_id(
+            target_page.page_space, target_page.page_title
+        )
+        if target_page.page_id is None:
+            echo_err(
+                f"Page '{target_page.page_title}' to attach the files to does not exist."
+            )
+            raise typer.Exit(1)
+        attach_files_to_page(target_page, files=attachments, state=state)
+
+    if pages and len(report.posted_pages) < len(pages):
+        # The pages that were skipped or failed are posted again on the next run
+        always_echo(
+            "Not all changed pages were posted. The revision is not recorded as synced."
+        )
+        return
+    record_synced(
+        key,
+        LastSync(
+            synced_revision,
+            [str(_.relative_to(root)) for _ in uncommitted_files],
+        ),
+    )
+    if uncommitted_files:
+        echo(
+            f"Synced up to revision {synced_revision} and the uncommitted changes of {len(uncommitted_files)} files"
+        )
+    else:
+        echo(f"Synced up to revision {synced_revision}")
 
 
 @app.command()
@@ -294,6 +727,9 @@ def validate(
     echo_err = state.print_stderr
 
     if online:
+        from atlassian.errors import ApiError
+        from requests.exceptions import ConnectionError
+
         echo("Validating settings against the Confluence instance from config")
         try:
             space_key = state.config.pages[0].page_space
@@ -312,6 +748,36 @@ def validate(
     echo("Validation successful")
 
 
+def import_config_pages(source: Path) -> None:
+    """Adds the pages from the source to the end of the config, writing it once"""
+    import csv
+    from tomlkit import parse
+    from confluence_poster.config_wizard import read_imported_pages, import_pages
+
+    echo = state.print_function
+    always_echo = state.always_print_function
+    echo_err = state.print_stderr
+
+    config_file = state.config_file
+    config_text = config_file.read_text() if config_file.exists() else ""
+    try:
+        sections, added_count, skipped = import_pages(
+            parse(config_text), read_imported_pages(source)
+        )
+    except (OSError, ValueError, csv.Error) as e:
+        echo_err(f"Could not import the pages from {source}: {e}")
+        raise typer.Exit(1)
+    for reason in skipped:
+        echo(f"Skipped: {reason}")
+    if added_count:
+        if config_text and not config_text.endswith("\n"):
+            config_text += "\n"
+        config_file.write_text(config_text + sections)
+    always_echo(
+        f"Added {added_count} pages to {config_file}, skipped {len(skipped)} pages."
+    )
+
+
 @app.command()
 def create_config(
     local_only: Optional[bool] = typer.Option(
@@ -326,16 +792,29 @@ def create_config(
         show_default=False,
         help="Create config only in the $XDG_CONFIG_HOME.",
     ),
+    import_source: Optional[Path] = typer.Option(
+        None,
+        "--import",
+        exists=True,
+        show_default=False,
+        help="Add the pages from a directory, a CSV or a JSON lines file to the config set by --config without "
+        "prompts. The pages that are in the config already are skipped.",
+    ),
 ):
     """Runs configuration wizard. The wizard guides through setting up values for configuration file."""
+    if import_source is not None:
+        import_config_pages(import_source)
+        raise typer.Exit()
+
     import xdg.BaseDirectory
     from confluence_poster.config_wizard import (
+        DialogParameter,
+        generate_page_dialog_params,
         config_dialog,
         get_filled_attributes_from_file,
         print_config_with_hidden_attrs,
         page_add_dialog,
     )
-    from functools import partial
 
     echo = state.print_function
     confirm = state.confirm_function
@@ -517,6 +996,42 @@ def main(
         show_default=False,
         help="Print report at the end of the run. " "Not enabled by default.",
     ),
+    page_index: Optional[bool] = typer.Option(
+        False,
+        "--page-index",
+        show_default=False,
+        help="Remember page IDs and versions between the runs in $XDG_CACHE_HOME. "
+        "Known pages are updated without being looked up first.",
+    ),
+    conversion_cache: Optional[bool] = typer.Option(
+        True,
+        "--conversion-cache/--no-conversion-cache",
+        help="Keep the converted markdown in $XDG_CACHE_HOME, so that the pages that did not change are not converted "
+        "again.",
+    ),
+    report_format: Optional[ReportFormat] = typer.Option(
+        ReportFormat.text,
+        "--report-format",
+        help="Format of the report. 'jsonl' prints every page as a JSON line as soon as it is processed, followed by a line with the retry statistics.",
+    ),
+    profile: Optional[bool] = typer.Option(
+        False,
+        "--profile",
+        show_default=False,
+        help="Print the time spent in every phase of the run, per page and in total, to stderr.",
+    ),
+    profile_dump: Optional[Path] = typer.Option(
+        None,
+        "--profile-dump",
+        show_default=False,
+        help="Save the timings of the phases of the run to the file.",
+    ),
+    profile_format: Optional[ProfileFormat] = typer.Option(
+        ProfileFormat.chrome,
+        "--profile-format",
+        help="Format of the file saved with --profile-dump. "
+        "'chrome' is the trace event format, which can be viewed in chrome://tracing or Perfetto.",
+    ),
     debug: Optional[bool] = typer.Option(
         False,
         "--debug",
@@ -569,17 +1084,33 @@ def main(
     else:
         state.debug = False
 
+    state.config_file = config
     if (
         ctx.invoked_subcommand != "create-config"
     ):  # no need to validate or load the config if we're creating it
         state.force = force
         state.force_create = force_create
         state.print_report = report
+        state.report_format = report_format
         state.minor_edit = minor_edit
+        state.resolved_pages = {}
+        state.request_stats = RequestStats()
+        state.conversion_stage = None
+
+        state.profiler = Profiler(enabled=profile or profile_dump is not None)
+        ctx.call_on_close(
+            partial(
+                finish_profiling,
+                print_summary=profile,
+                dump_file=profile_dump,
+                profile_format=profile_format,
+            )
+        )
 
         echo("Reading config")
         try:
-            confluence_config = load_config(config)
+            with state.profiler.span("load_config"):
+                confluence_config = load_config(config)
         except FileNotFoundError as e:
             echo_err("Config file not found. Consider running `create-config`")
             raise e
@@ -604,7 +1135,7 @@ def main(
                 if state.filter_mode:
                     state.config.pages[0].page_text = sys.stdin.read()
                 else:
-                    state.config.pages[0].page_file = page_file
+                    state.config.pages[0].page_file = str(page_file)
 
         # Validate password
         try:
@@ -623,9 +1154,33 @@ def main(
         else:
             api_version = "latest"
 
-        state.confluence_instance = Confluence(
-            url=confluence_config.auth.url,
-            username=confluence_config.auth.username,
-            password=_password,
-            api_version=api_version,
-        )
+        def _make_confluence():
+            from confluence_poster.http_helpers import make_confluence
+
+            return make_confluence(
+                url=confluence_config.auth.url,
+                username=confluence_config.auth.username,
+                password=_password,
+                api_version=api_version,
+                http_config=confluence_config.http,
+                stats=state.request_stats,
+            )
+
+        state.confluence_instance = None
+        state.confluence_factory = _make_confluence
+
+        if page_index:
+            from confluence_poster.page_index import PageIndex
+
+            state.page_index = PageIndex(confluence_url=confluence_config.auth.url)
+            ctx.call_on_close(state.page_index.close)
+        else:
+            state.page_index = None
+
+        if conversion_cache:
+            from confluence_poster.conversion_cache import ConversionCache
+
+            state.conversion_cache = ConversionCache()
+            ctx.call_on_close(state.conversion_cache.close)
+        else:
+            state.conversion_cache = None
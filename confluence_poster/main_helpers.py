@@ -1,43 +1,86 @@
-from atlassian import Confluence
 from dataclasses import dataclass, field
-from typing import Union, Callable, List
+from typing import Union, Callable, List, Dict, Tuple, TYPE_CHECKING
 from typer import echo, prompt, confirm
 from functools import partial
-
-from confluence_poster.poster_config import Page, Config
+from enum import Enum
+from pathlib import Path
+from threading import Lock
+
+from confluence_poster.poster_config import Page, Config, AllowedFileFormat
+from confluence_poster.convert_utils import (
+    convert_using_markdown_lib,
+    markdown_converter_id,
+    post_to_convert_api,
+    confluence_converter_id,
+)
+from confluence_poster.rate_limit_helpers import RequestStats
+from confluence_poster.profiling_helpers import Profiler
+
+if TYPE_CHECKING:
+    # Importing atlassian takes a noticeable part of the startup time, it is imported only when the instance is created
+    from atlassian import Confluence
+    from confluence_poster.page_index import PageIndex
+    from confluence_poster.conversion_helpers import ConversionStage
+    from confluence_poster.conversion_cache import ConversionCache
 
 """File that contains procedures used inside main.py's functions"""
 
 
 def get_page_url(
-    page_title: str, space: str, confluence: Confluence
+    page_title: str, space: str, confluence: "Confluence"
 ) -> Union[str, None]:
     """Retrieves page URL"""
     if page := confluence.get_page_by_title(space=space, title=page_title, expand=""):
-        # according to Atlassian REST API reference, '_links' is a legitimate way to access links
-        page_link = confluence.url + page["_links"]["webui"]
-        return page_link
+        return get_page_url_from_response(page, confluence)
     else:
         return None
 
 
-def check_last_updated_by(
-    page_id: int, username_to_check: str, confluence_instance: Confluence
-) -> (bool, str):
-    """Checks which user last updated `page_id`. If it's not `username_to_check` — return False
-    :param page_id: ID of the page to check
-    :param username_to_check: compare this username against the one that last updated the page
-    :param confluence_instance: instance of Confluence to run the check
+def get_page_url_from_response(page: dict, confluence: "Confluence") -> str:
+    """Returns page URL from the page returned by the API. Any response with page content contains the links"""
+    # according to Atlassian REST API reference, '_links' is a legitimate way to access links
+    return confluence.url + page["_links"]["webui"]
+
+
+def get_last_updated_by(page: dict, confluence_instance: "Confluence") -> str:
+    """Returns the user that last updated the page
+    :param page: page as returned by the API with "version" expanded
+    :param confluence_instance: instance of Confluence the page was retrieved from
     """
-    page_last_updated_by = confluence_instance.get_page_by_id(
-        page_id, expand="version"
-    )["version"]["by"]
+    page_last_updated_by = page["version"]["by"]
     if confluence_instance.api_version == "cloud":
-        page_last_updated_by = page_last_updated_by["email"]  # pragma: no cover
+        return page_last_updated_by["email"]  # pragma: no cover
     else:
-        page_last_updated_by = page_last_updated_by["username"]
-
-    return page_last_updated_by == username_to_check, page_last_updated_by
+        return page_last_updated_by["username"]
+
+
+def update_page_version(
+    page_id: Union[int, str],
+    title: str,
+    body: str,
+    representation: str,
+    version: int,
+    confluence_instance: "Confluence",
+    minor_edit: bool = False,
+    version_comment: Union[str, None] = None,
+) -> dict:
+    """Updates the page, setting its version to the supplied one. Unlike Confluence.update_existing_page does not
+    retrieve the page before updating it.
+
+    If the page was updated by someone else in the meantime - Confluence responds with 409, if the page does not
+    exist - with 404. Both are raised as requests.HTTPError
+    :param version: the new version of the page, i.e. the last known version + 1
+    """
+    data = {
+        "id": page_id,
+        "type": "page",
+        "title": title,
+        "version": {"number": version, "minorEdit": minor_edit},
+        "body": {representation: {"value": body, "representation": representation}},
+    }
+    if version_comment:
+        data["version"]["message"] = version_comment
+    return confluence_instance.put(f"rest/api/content/{page_id}", data=data)
 
 
 @dataclass
@@ -46,6 +89,19 @@ class PostedPage(Page):
 
     version_comment: Union[str, None] = None
     page_id: Union[int, None] = None
+    page_url: Union[str, None] = None
+    # Whether page_text holds the text converted from markdown. Not a dataclass field
+    text_converted = False
+
+    def release_text(self) -> None:
+        super(PostedPage, self).release_text()
+        if self._page_text == "":
+            self.text_converted = False
+
+
+class ReportFormat(str, Enum):
+    text = "text"
+    jsonl = "jsonl"
 
 
 @dataclass
@@ -54,15 +110,48 @@ class StateConfig:
 
     force: bool = False
     debug: bool = False
-    confluence_instance: Union[None, Confluence] = None
+    # Creates the instance of Confluence on first access, see confluence_instance
+    confluence_factory: Union[None, Callable[[], "Confluence"]] = None
+    _confluence_instance: Union[None, "Confluence"] = None
+    _confluence_lock: Lock = field(default_factory=Lock, repr=False)
+    page_index: Union[None, "PageIndex"] = None
     config: Union[None, Config] = None
+    # The local config file, set by --config
+    config_file: Union[None, Path] = None
     minor_edit: bool = False
     print_report: bool = False
+    report_format: ReportFormat = ReportFormat.text
     force_create: bool = False
     created_pages: List[int] = field(default_factory=list)
+    # Pages found in bulk before posting, by (space, title)
+    resolved_pages: Dict[Tuple[str, str], dict] = field(default_factory=dict)
+    # Retries and waits of the requests to Confluence
+    request_stats: RequestStats = field(default_factory=RequestStats)
+    # Timings of the phases of the run, collected if --profile is set
+    profiler: Profiler = field(default_factory=Profiler)
+    # Converts the markdown pages in other processes while they are posted, if there are enough of them
+    conversion_stage: Union[None, "ConversionStage"] = None
+    # Converted texts from the previous runs, unless --no-conversion-cache is set
+    conversion_cache: Union[None, "ConversionCache"] = None
     _filter_mode: bool = False
     quiet: bool = False
 
+    @property
+    def confluence_instance(self) -> Union[None, "Confluence"]:
+        """The instance is created when it is first needed, so that the commands that do not talk to Confluence do not
+        import atlassian and requests"""
+        with self._confluence_lock:
+            if (
+                self._confluence_instance is None
+                and self.confluence_factory is not None
+            ):
+                self._confluence_instance = self.confluence_factory()
+        return self._confluence_instance
+
+    @confluence_instance.setter
+    def confluence_instance(self, value: Union[None, "Confluence"]):
+        self._confluence_instance = value
+
     @property
     def print_function(self) -> Callable:
         if self.quiet:
@@ -114,3 +203,52 @@ class StateConfig:
         self._filter_mode = value
         if value:
             self.quiet = True
+
+
+def convert_with_cache(
+    text: str, state: StateConfig, use_confluence_converter: bool = False
+) -> str:
+    """Converts the markdown text, through the conversion cache if it is enabled
+
+    :param use_confluence_converter: use the converter built into Confluence instead of the markdown library
+    """
+    if use_confluence_converter:
+        convert = partial(post_to_convert_api, state.confluence_instance)
+        converter = confluence_converter_id(state.confluence_instance)
+    else:
+        convert = convert_using_markdown_lib
+        converter = markdown_converter_id()
+    if state.conversion_cache is None:
+        return convert(text)
+    return state.conversion_cache.convert(text, converter=converter, convert=convert)
+
+
+def prepare_page_text(
+    page: PostedPage, state: StateConfig, use_confluence_converter: bool = False
+) -> str:
+    """Reads the text of the page just before it is posted, converting it if needed. The text is kept until
+    page.release_text() is called, so that only the pages being posted are held in memory. If the page was already
+    converted by state.conversion_stage, waits for the result
+
+    :param use_confluence_converter: use the converter built into Confluence instead of the markdown library
+
+    :return the text to be posted
+    """
+    if page.page_file_format is AllowedFileFormat.markdown and not page.text_converted:
+        with state.profiler.span("convert", page=page.page_title):
+            if (
+                not use_confluence_converter
+                and state.conversion_stage is not None
+                and (converted_text := state.conversion_stage.take(page))
+            ):
+                page.set_text_from_file(converted_text)
+            else:
+                page.replace_text(
+                    convert_with_cache(
+                        page.page_text,
+                        state=state,
+                        use_confluence_converter=use_confluence_converter,
+                    )
+                )
+        page.text_converted = True
+    return page.page_text
@@ -1,8 +1,11 @@
-from typing import Union
+from typing import Union, List, Dict, Tuple
+from functools import partial
+from atlassian.errors import ApiError
+from requests.exceptions import HTTPError
 
-from confluence_poster.main_helpers import StateConfig
+from confluence_poster.main_helpers import StateConfig, get_page_url_from_response
 from confluence_poster.convert_utils import get_representation_for_format
-from confluence_poster.page_location_helpers import determine_location
+from confluence_poster.page_location_helpers import determine_location, _find_parent
 from confluence_poster.poster_config import Page
 
 
@@ -12,10 +15,12 @@ class CreationResult:
         page_created: bool,
         page_id: Union[int, None] = None,
         comment: Union[str, None] = None,
+        page_url: Union[str, None] = None,
     ):
         self.page_created = page_created
         self.page_id = page_id
         self.comment = comment
+        self.page_url = page_url
 
     def __bool__(self):
         return self.page_created
@@ -34,15 +39,36 @@ def create_page(page: Page, state: StateConfig, create_in_root: bool) -> Creatio
             page=page, create_in_root=create_in_root, state=state
         ):
             echo("Creating page...")
-            page_id = state.confluence_instance.create_page(
+            _create_page = partial(
+                state.confluence_instance.create_page,
                 space=page.page_space,
                 title=page.page_title,
                 body=page.page_text,
-                parent_id=location.parent_page_id,
                 representation=get_representation_for_format(
                     page.page_file_format
                 ).value,
-            )["id"]
+            )
+            with state.profiler.span("create", page=page.page_title):
+                try:
+                    created_page = _create_page(parent_id=location.parent_page_id)
+                except (ApiError, HTTPError) as e:
+                    if state.page_index is None or location.parent_page_id is None:
+                        raise e
+                    # The parent could have been removed since it was indexed, look it up again
+                    state.page_index.remove(page.page_space, location.parent_page_name)
+                    if (
+                        parent_page_id := _find_parent(
+                            location.parent_page_name, page.page_space, state
+                        )
+                    ) is None or parent_page_id == location.parent_page_id:
+                        raise e
+                    location.parent_page_id = parent_page_id
+                    created_page = _create_page(parent_id=location.parent_page_id)
+            page_id = created_page["id"]
+            if state.page_index is not None:
+                state.page_index.set(page.page_space, page.page_title, page_id, 1)
+            # The children of the page find it without looking it up, see page_location_helpers._find_parent
+            state.resolved_pages[(page.page_space, page.page_title)] = created_page
             if location.parent_page_id is None:
                 page_location_msg = f"in root of the space '{page.page_space}'"
             else:
@@ -51,10 +77,45 @@ def create_page(page: Page, state: StateConfig, create_in_root: bool) -> Creatio
             echo(
                 f"Created page #{page_id} {page_location_msg} called '{page.page_title}'."
             )
-            return CreationResult(True, page_id)
+            return CreationResult(
+                True,
+                page_id,
+                page_url=get_page_url_from_response(
+                    created_page, state.confluence_instance
+                ),
+            )
         else:
             return CreationResult(
                 False, comment="Could not determine location for the page."
             )
     else:
         return CreationResult(False, comment="User cancelled creation when prompted.")
+
+
+def creation_levels(pages: List[Page]) -> Tuple[List[List[Page]], List[Page]]:
+    """Orders the creation of the pages so that the parents are created before their children. The pages of a level
+    depend only on the pages of the previous levels and can be created at the same time. The pages keep the given
+    order within a level.
+
+    :return levels and the pages that could not be ordered because their parents refer to each other in a cycle
+    """
+    pages_by_title: Dict[Tuple[str, str], Page] = {
+        (page.page_space, page.page_title): page for page in pages
+    }
+    # Every page has one parent at most, so the next level is made of the children of the pages of the current one
+    children: Dict[int, List[Page]] = {id(page): [] for page in pages}
+    level = []
+    for page in pages:
+        parent = pages_by_title.get((page.page_space, page.parent_page_title))
+        if parent is None or parent is page:
+            level.append(page)
+        else:
+            children[id(parent)].append(page)
+
+    levels = []
+    while level:
+        levels.append(level)
+        next_level_ids = {id(child) for page in level for child in children[id(page)]}
+        level = [page for page in pages if id(page) in next_level_ids]
+    ordered = {id(page) for level in levels for page in level}
+    return levels, [page for page in pages if id(page) not in ordered]
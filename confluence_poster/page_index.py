@@ -0,0 +1,93 @@
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Union
+
+"""Persistent index of the pages that the script has seen. Allows skipping the lookups of pages by their titles."""
+
+
+@dataclass
+class IndexEntry:
+    page_id: str
+    version: Union[int, None] = None
+
+
+def default_index_path() -> Path:
+    """Returns the path to the index in $XDG_CACHE_HOME, creating the directory if needed"""
+    import xdg.BaseDirectory
+
+    return (
+        Path(xdg.BaseDirectory.save_cache_path("confluence_poster"))
+        / "page_index.sqlite3"
+    )
+
+
+class PageIndex:
+    """Maps space and title of a page on a Confluence instance to the page ID and the last version of the page
+    posted by the script.
+
+    The version is only known for the pages that the script posted. It is used to update the page without looking it up
+    first: if somebody else updates the page in the meantime, Confluence rejects the update due to version mismatch."""
+
+    def __init__(self, confluence_url: str, path: Union[Path, str, None] = None):
+        if path is None:
+            path = default_index_path()
+        self.confluence_url = confluence_url
+        self._lock = Lock()
+        # The index is shared between the threads that post pages, access is serialized through the lock. Every change
+        # is committed right away (autocommit), so that the concurrent runs do not wait for each other to finish and the
+        # entries survive an interrupted run
+        self._connection = sqlite3.connect(
+            str(path), timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "url TEXT NOT NULL, space TEXT NOT NULL, title TEXT NOT NULL, page_id TEXT NOT NULL, version INTEGER, "
+            "PRIMARY KEY (url, space, title))"
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def get(self, space: str, title: str) -> Union[IndexEntry, None]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT page_id, version FROM pages WHERE url = ? AND space = ? AND title = ?",
+                (self.confluence_url, space, title),
+            ).fetchone()
+        if row is None:
+            return None
+        return IndexEntry(*row)
+
+    def set(
+        self,
+        space: str,
+        title: str,
+        page_id: Union[str, int],
+        version: Union[int, None] = None,
+    ) -> None:
+        """Records the page. If the version is not known - keeps the previously recorded version of the same page"""
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO pages (url, space, title, page_id, version) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (url, space, title) DO UPDATE SET "
+                "version = CASE WHEN page_id = excluded.page_id "
+                "THEN coalesce(excluded.version, version) ELSE excluded.version END, "
+                "page_id = excluded.page_id",
+                (self.confluence_url, space, title, str(page_id), version),
+            )
+
+    def remove(self, space: str, title: str) -> None:
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM pages WHERE url = ? AND space = ? AND title = ?",
+                (self.confluence_url, space, title),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
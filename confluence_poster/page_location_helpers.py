@@ -1,6 +1,6 @@
 from typing import Union
 
-from confluence_poster.main_helpers import StateConfig, get_page_url
+from confluence_poster.main_helpers import StateConfig, get_page_url_from_response
 from confluence_poster.poster_config import Page
 
 
@@ -9,16 +9,28 @@ def _find_parent(parent_name: str, space: str, state: StateConfig) -> Union[int,
 
     :return page id if parent is found, None otherwise
     """
+    if state.page_index is not None:
+        if (index_entry := state.page_index.get(space, parent_name)) is not None:
+            state.print_function(
+                f"Found page #{index_entry.page_id}, called '{parent_name}' in the page index"
+            )
+            return index_entry.page_id
+
     state.print_function(f"Looking for the parent page with title '{parent_name}'")
-    if parent_page := state.confluence_instance.get_page_by_title(
-        space=space, title=parent_name, expand=""
-    ):
-        # according to Atlassian REST API reference, '_links' is a legitimate way to access links
-        parent_link = get_page_url(parent_name, space, state.confluence_instance)
+    # The parent could have already been found with the posted pages, see page_lookup_helpers.resolve_pages
+    if (parent_page := state.resolved_pages.get((space, parent_name))) is None:
+        with state.profiler.span("parent_lookup"):
+            parent_page = state.confluence_instance.get_page_by_title(
+                space=space, title=parent_name, expand=""
+            )
+    if parent_page:
+        parent_link = get_page_url_from_response(parent_page, state.confluence_instance)
         _parent_id = parent_page["id"]
         state.print_function(
             f"Found page #{_parent_id}, called '{parent_name}'. URL is: {parent_link}"
         )
+        if state.page_index is not None:
+            state.page_index.set(space, parent_name, _parent_id)
         return _parent_id
     else:
         state.print_function(f"Parent page '{parent_name}' not found")
@@ -0,0 +1,92 @@
+from itertools import groupby
+from typing import Iterable, List, Dict, Tuple
+
+from atlassian.errors import ApiError
+from requests.exceptions import HTTPError
+
+from confluence_poster.main_helpers import StateConfig, PostedPage
+
+"""Procedures that resolve pages in bulk through CQL search instead of looking them up one by one"""
+
+# Amount of titles searched for in a single request. Keeps the URL reasonably short
+titles_per_request = 50
+
+
+def _cql_string(value: str) -> str:
+    """Quotes the value for a CQL query"""
+    escaped_value = value.replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped_value}"'
+
+
+def search_pages(
+    space: str, titles: List[str], state: StateConfig, expand: str = "version"
+) -> List[dict]:
+    """Searches for the pages with the given titles in the space.
+
+    :return list of pages as returned by the API. Title search in CQL is not exact, the results are filtered
+    """
+    cql = (
+        f"space = {_cql_string(space)} and type = page and "
+        f"title in ({', '.join(map(_cql_string, titles))})"
+    )
+    results = []
+    start = 0
+    while True:
+        response = state.confluence_instance.get(
+            "rest/api/content/search",
+            params={
+                "cql": cql,
+                "expand": expand,
+                "start": start,
+                "limit": len(titles),
+            },
+        )
+        results += response["results"]
+        # The server may return fewer results per request than asked for, the link to the next ones is the only sign
+        # that there are more
+        if not response["results"] or "next" not in response.get("_links", {}):
+            break
+        start += response["size"]
+
+    return [page for page in results if page["title"] in titles]
+
+
+def resolve_pages(
+    pages: Iterable[PostedPage], state: StateConfig, expand: str = "version"
+) -> Dict[Tuple[str, str], dict]:
+    """Looks up the pages and their parents, grouping the requests by space. The found pages are saved in
+    state.resolved_pages, so that the pages are not looked up one by one later.
+
+    Pages that were not found are not saved: the search index may lag behind, so such pages are looked up by the title
+    when they are posted.
+
+    :return mapping of (space, title) to the found pages
+    """
+    echo = state.print_function
+
+    titles = set()
+    for page in pages:
+        titles.add((page.page_space, page.page_title))
+        if page.parent_page_title is not None:
+            titles.add((page.page_space, page.parent_page_title))
+
+    resolved_pages = {}
+    for space, group in groupby(sorted(titles), key=lambda _: _[0]):
+        space_titles = [title for _, title in group]
+        echo(f"Looking for {len(space_titles)} pages in space {space}")
+        for batch_start in range(0, len(space_titles), titles_per_request):
+            batch = space_titles[batch_start : batch_start + titles_per_request]
+            try:
+                found_pages = search_pages(space, batch, state=state, expand=expand)
+            except (ApiError, HTTPError) as e:
+                echo(
+                    f"Could not search for the pages in space {space}, they will be looked up one by one. "
+                    f"Error: {e}"
+                )
+                break
+            for found_page in found_pages:
+                resolved_pages[(space, found_page["title"])] = found_page
+
+    echo(f"Found {len(resolved_pages)} pages")
+    state.resolved_pages.update(resolved_pages)
+    return resolved_pages
@@ -0,0 +1,23 @@
+from marshmallow import Schema, fields, ValidationError
+
+from confluence_poster.poster_config import AllowedFileFormat
+
+
+class AllowedFileFormatField(fields.Field):
+    def _deserialize(self, value, attr, data, **kwargs):
+        if not isinstance(value, AllowedFileFormat):
+            raise ValidationError(f"Invalid value for field: {value}")
+        return value.value
+
+
+class PageSchema(Schema):
+    page_title = fields.Str()
+    page_file = fields.Str()
+    page_space = fields.Str()
+    parent_page_title = fields.Str(missing=None)
+    _page_text = fields.Str()
+    page_file_format = AllowedFileFormatField(
+        default=AllowedFileFormat.none, missing=AllowedFileFormat.none
+    )
+    force_overwrite = fields.Boolean(default=False)
+    strip_front_matter = fields.Boolean(default=False)
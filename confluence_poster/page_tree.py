@@ -0,0 +1,149 @@
+import os
+import re
+from fnmatch import fnmatchcase
+from itertools import chain
+from pathlib import Path
+from typing import Iterator, Union
+
+from confluence_poster.poster_config import Page, AllowedFileFormat
+from confluence_poster.convert_utils import split_front_matter, guess_file_format
+
+"""Pages discovered in a directory tree instead of being listed in the config one by one"""
+
+# Files named like this (in any case, with any extension) hold the page of their directory
+index_file_stems = ("index", "readme")
+_heading = re.compile(
+    r"^(?:#{1,6}[ \t]+(?P<markdown>.+?)[ \t#]*|h[1-6]\.[ \t]+(?P<wiki>.+?)[ \t]*)$"
+)
+
+
+def read_page_title(path: Path) -> str:
+    """Returns the title of the page in the file: the title from its front matter, else its first heading, else
+    the name of the file"""
+    with open(path) as f:
+        # The file is read up to the end of the front matter block, then up to the first heading
+        head = f.readline()
+        if head.rstrip() == "---":
+            for line in f:
+                head += line
+                if line.rstrip() in {"---", "..."}:
+                    break
+        front_matter, text = split_front_matter(head)
+        if title := front_matter.get("title"):
+            return title
+        for line in chain(text.splitlines(), f):
+            if match := _heading.match(line.rstrip("\r\n")):
+                return match.group("markdown") or match.group("wiki")
+    return path.stem
+
+
+class PageTree:
+    """Maps the files in a directory to the pages, configured as [pages.tree]. The titles are read from the files,
+    the page of a directory is its index file, e.g. index.md or README.md, and it is the parent of the other pages in
+    the directory and below. The directories are scanned when the pages are iterated over.
+
+    :param root: the directory
+    :param pattern: shell-style pattern matched against the paths of the files relative to the root directory, "*"
+    matches "/" as well. If None - all files whose format can be guessed from the extension are pages
+    :param page_space: space of the pages. If not set - the default one is used
+    :param parent_page_title: parent of the top level pages
+    :param page_file_format: format of the page files, guessed from the extensions if not set
+    :param force_overwrite: see Page.force_overwrite
+    """
+
+    def __init__(
+        self,
+        root: Union[str, Path],
+        pattern: Union[str, None] = "*.md",
+        page_space: Union[str, None] = None,
+        parent_page_title: Union[str, None] = None,
+        page_file_format: AllowedFileFormat = AllowedFileFormat.none,
+        force_overwrite: bool = False,
+    ):
+        self.root = Path(root)
+        self.pattern = pattern
+        self.page_space = page_space
+        self.parent_page_title = parent_page_title
+        self.page_file_format = page_file_format
+        self.force_overwrite = force_overwrite
+
+    @classmethod
+    def from_config(cls, tree: dict) -> "PageTree":
+        """Creates the tree from the [pages.tree] section
+
+        :raises ValueError: if the section is malformed
+        """
+        if not isinstance(tree.get("root", None), str):
+            raise ValueError("tree.root should be a string")
+        for prop, value in tree.items():
+            if not isinstance(value, str) and prop != "force_overwrite":
+                raise ValueError(f"tree.{prop} property is not a string")
+        return cls(
+            root=tree["root"],
+            pattern=tree.get("pattern", "*.md"),
+            page_space=tree.get("page_space", None),
+            parent_page_title=tree.get("page_parent_title", None),
+            page_file_format=AllowedFileFormat(tree.get("page_file_format", "None")),
+            force_overwrite=tree.get("force_overwrite", False),
+        )
+
+    def _page(self, path: Path, parent_page_title: Union[str, None]) -> Page:
+        return Page(
+            page_title=read_page_title(path),
+            page_file=str(path),
+            page_space=self.page_space,
+            parent_page_title=parent_page_title,
+            page_file_format=self.page_file_format,
+            force_overwrite=self.force_overwrite,
+            strip_front_matter=True,
+        )
+
+    def _matches(self, relative_path: str) -> bool:
+        if self.pattern is not None:
+            return fnmatchcase(relative_path, self.pattern)
+        try:
+            guess_file_format(relative_path)
+        except ValueError:
+            return False
+        return True
+
+    def _scan(
+        self, directory: Path, relative_path: str, parent_page_title: Union[str, None]
+    ) -> Iterator[Page]:
+        with os.scandir(directory) as entries:
+            entries = sorted(
+                (_ for _ in entries if not _.name.startswith(".")),
+                key=lambda _: _.name,
+            )
+        files, directories = [], []
+        for entry in entries:
+            if entry.is_dir():
+                directories.append(entry)
+            elif entry.is_file() and self._matches(relative_path + entry.name):
+                files.append(entry)
+
+        # The index page goes first, the other pages of the directory are its children
+        index_entry = next(
+            (_ for _ in files if Path(_.name).stem.lower() in index_file_stems),
+            None,
+        )
+        if index_entry is not None:
+            index_page = self._page(Path(index_entry.path), parent_page_title)
+            yield index_page
+            parent_page_title = index_page.page_title
+        for entry in files:
+            if entry is not index_entry:
+                yield self._page(Path(entry.path), parent_page_title)
+        for entry in directories:
+            yield from self._scan(
+                Path(entry.path), f"{relative_path}{entry.name}/", parent_page_title
+            )
+
+    def __iter__(self) -> Iterator[Page]:
+        """Scans the directory, yielding the pages as their files are found. Parent pages come before their children
+
+        :raises ValueError: if the root is not a directory
+        """
+        if not self.root.is_dir():
+            raise ValueError(f"Page tree root {self.root} is not a directory")
+        return self._scan(self.root, "", self.parent_page_title)
@@ -0,0 +1,237 @@
+from functools import partial
+from typing import Union
+from atlassian.errors import ApiError
+from requests.exceptions import HTTPError
+
+from confluence_poster.main_helpers import (
+    StateConfig,
+    PostedPage,
+    get_last_updated_by,
+    update_page_version,
+    get_page_url_from_response,
+    prepare_page_text,
+)
+from confluence_poster.page_index import IndexEntry
+from confluence_poster.convert_utils import get_representation_for_format
+from confluence_poster.fingerprint_helpers import (
+    page_fingerprint,
+    fingerprint_expand,
+    fingerprint_matches,
+    get_stored_fingerprint,
+    store_fingerprint,
+)
+
+
+class UpdateResult:
+    def __init__(
+        self,
+        page_found: bool,
+        page_updated: bool = False,
+        comment: Union[str, None] = None,
+        page_unchanged: bool = False,
+    ):
+        self.page_found = page_found
+        self.page_updated = page_updated
+        self.comment = comment
+        self.page_unchanged = page_unchanged
+
+    def __bool__(self):
+        return self.page_found
+
+
+def _is_stale_index_error(error: Exception) -> bool:
+    """Checks whether the error means that the page from the index was updated by someone else or removed"""
+    if isinstance(error, ApiError):
+        error = error.reason
+    return isinstance(error, HTTPError) and error.response.status_code in {404, 409}
+
+
+def _update_indexed_page(
+    page: PostedPage, index_entry: IndexEntry, state: StateConfig, skip_unchanged: bool
+) -> Union[UpdateResult, None]:
+    """Updates the page using the ID and the version from the page index, skipping the lookup and the author check.
+    The author check is implied: the version in the index is the one the script posted.
+
+    :return UpdateResult or None if the page was changed by someone else or removed since it was indexed
+    """
+    echo = state.print_function
+    confluence = state.confluence_instance
+    span = partial(state.profiler.span, page=page.page_title)
+    page_id = index_entry.page_id
+    echo(f"Found page id #{page_id} in the page index")
+    page.page_id = page_id
+
+    representation = get_representation_for_format(page.page_file_format)
+    try:
+        if skip_unchanged:
+            fingerprint = page_fingerprint(page.page_text, representation)
+            with span("lookup"):
+                posted_page = confluence.get_page_by_id(
+                    page_id, expand=f"version,{fingerprint_expand}"
+                )
+            if posted_page["version"]["number"] != index_entry.version:
+                return None
+            if fingerprint_matches(posted_page, fingerprint):
+                echo(
+                    f"Page '{page.page_title}' did not change since it was last posted. Skipping update."
+                )
+                page.page_url = get_page_url_from_response(posted_page, confluence)
+                return UpdateResult(True, page_unchanged=True)
+
+        echo(f"Updating page #{page_id}")
+        with span("update"):
+            updated_page = update_page_version(
+                page_id=page_id,
+                title=page.page_title,
+                body=page.page_text,
+                representation=representation.value,
+                version=index_entry.version + 1,
+                confluence_instance=confluence,
+                minor_edit=state.minor_edit,
+                version_comment=page.version_comment,
+            )
+    except (ApiError, HTTPError) as e:
+        if _is_stale_index_error(e):
+            return None
+        raise e
+
+    if skip_unchanged:
+        with span("store_fingerprint"):
+            store_fingerprint(
+                page_id=page_id,
+                fingerprint=fingerprint,
+                page_version=updated_page["version"]["number"],
+                state=state,
+                stored_property=get_stored_fingerprint(posted_page),
+            )
+    state.page_index.set(
+        page.page_space, page.page_title, page_id, updated_page["version"]["number"]
+    )
+    page.page_url = get_page_url_from_response(updated_page, confluence)
+    return UpdateResult(True, True)
+
+
+def update_page(
+    page: PostedPage, state: StateConfig, skip_unchanged: bool = False
+) -> UpdateResult:
+    """Looks up the page, checks who last updated it and updates it. Does not prompt the user, so it is safe to
+    run for several pages at once. The text of the page is read and converted here, the caller releases it.
+
+    If skip_unchanged is set - the update is skipped if the page was not changed since it was last posted.
+
+    :return UpdateResult that contains info on whether the page was found and whether it was updated
+    """
+    echo = state.print_function
+    confluence = state.confluence_instance
+    span = partial(state.profiler.span, page=page.page_title)
+    prepare_page_text(page, state=state)
+
+    if state.page_index is not None:
+        index_entry = state.page_index.get(page.page_space, page.page_title)
+        if index_entry is not None and index_entry.version is not None:
+            if update_result := _update_indexed_page(
+                page=page,
+                index_entry=index_entry,
+                state=state,
+                skip_unchanged=skip_unchanged,
+            ):
+                return update_result
+            echo(
+                f"Page '{page.page_title}' was changed or removed since it was indexed."
+            )
+            state.page_index.remove(page.page_space, page.page_title)
+
+    representation = get_representation_for_format(page.page_file_format)
+    if skip_unchanged:
+        fingerprint = page_fingerprint(page.page_text, representation)
+        expand = f"version,{fingerprint_expand}"
+    else:
+        expand = "version"
+
+    echo(f"Looking for page '{page.page_title}'")
+    # The page is looked up with its version, so that both the author check and the update need no extra requests.
+    # It could have already been found with other pages, see page_lookup_helpers.resolve_pages
+    resolved_page = state.resolved_pages.get((page.page_space, page.page_title))
+    with span("lookup"):
+        posted_page = resolved_page or confluence.get_page_by_title(
+            space=page.page_space, title=page.page_title, expand=expand
+        )
+    if posted_page:
+        # Page exists
+        page_id = posted_page["id"]
+        echo(f"Found page id #{page_id}")
+        page.page_id = page_id
+
+        if skip_unchanged and fingerprint_matches(posted_page, fingerprint):
+            echo(
+                f"Page '{page.page_title}' did not change since it was last posted. Skipping update."
+            )
+            page.page_url = get_page_url_from_response(posted_page, confluence)
+            return UpdateResult(True, page_unchanged=True)
+
+        # If --force is supplied - we do not really care about who edited the page last
+        if not (state.force or page.force_overwrite):
+            with span("author_check"):
+                page_last_updated_by = get_last_updated_by(
+                    posted_page, confluence_instance=confluence
+                )
+            if page_last_updated_by != state.config.author:
+                echo(
+                    f"Flag 'force' is not set and last author of page '{page.page_title}'"
+                    f" is {page_last_updated_by}, not {state.config.author}. Skipping page"
+                )
+                return UpdateResult(
+                    True, comment=f"Last updated by {page_last_updated_by}."
+                )
+        else:
+            if state.force:
+                echo("Flag 'force' set globally.")
+            elif page.force_overwrite:
+                echo("Flag 'force overwrite' set on the page.")
+            echo("Author name check skipped.")
+
+        echo(f"Updating page #{page_id}")
+        try:
+            with span("update"):
+                updated_page = update_page_version(
+                    page_id=page_id,
+                    title=page.page_title,
+                    body=page.page_text,
+                    representation=representation.value,
+                    version=posted_page["version"]["number"] + 1,
+                    confluence_instance=confluence,
+                    minor_edit=state.minor_edit,
+                    version_comment=page.version_comment,
+                )
+        except HTTPError as e:
+            if e.response.status_code != 409:
+                raise e
+            if resolved_page is not None:
+                # The search results may be outdated, look the page up again
+                state.resolved_pages.pop((page.page_space, page.page_title), None)
+                return update_page(page, state=state, skip_unchanged=skip_unchanged)
+            echo(
+                f"Page '{page.page_title}' was updated by someone else while it was being posted. Skipping page"
+            )
+            return UpdateResult(True, comment="Updated by someone else during the run.")
+        if skip_unchanged:
+            with span("store_fingerprint"):
+                store_fingerprint(
+                    page_id=page_id,
+                    fingerprint=fingerprint,
+                    page_version=updated_page["version"]["number"],
+                    state=state,
+                    stored_property=get_stored_fingerprint(posted_page),
+                )
+        if state.page_index is not None:
+            state.page_index.set(
+                page.page_space,
+                page.page_title,
+                page_id,
+                updated_page["version"]["number"],
+            )
+        page.page_url = get_page_url_from_response(updated_page, confluence)
+        return UpdateResult(True, True)
+    else:
+        echo(f"Could not find page '{page.page_title}' in space '{page.page_space}'")
+        return UpdateResult(False)
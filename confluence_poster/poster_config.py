@@ -1,14 +1,42 @@
+import locale
+import mmap
+import os
 import toml
 from pathlib import Path
-from dataclasses import dataclass
-from typing import Union
-from operator import attrgetter
-from itertools import groupby
-from collections import UserDict
-from marshmallow import Schema, fields, ValidationError
+from dataclasses import dataclass, fields
+from typing import Union, Iterator, Iterable, List
+from collections import UserDict, Counter
+from collections.abc import MutableSequence
 from enum import Enum
 
 
+# Files of this size and larger are read through mmap, so that the text is decoded without an intermediate copy
+mmap_threshold = 16 * 1024 * 1024
+
+
+def read_page_file(path: Path, strip_front_matter: bool = False) -> str:
+    """Reads the text of the page like Path.read_text does, using mmap for huge files
+
+    :param strip_front_matter: drop the front matter from the start of the text
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < mmap_threshold or size == 0:
+            text = Path(path).read_text()
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+                text = str(mapped_file, locale.getpreferredencoding(False))
+            # Universal newlines, as in text mode
+            if "\r" in text:
+                text = text.replace("\r\n", "\n").replace("\r", "\n")
+    if strip_front_matter:
+        # convert_utils imports this module
+        from confluence_poster.convert_utils import split_front_matter
+
+        text = split_front_matter(text)[1]
+    return text
+
+
 class AllowedFileFormat(str, Enum):
     confluencewiki = "confluencewiki"
     markdown = "markdown"
@@ -23,6 +51,8 @@ class Page:
     page_space: Union[str, None]
     parent_page_title: Union[str, None] = None
     _page_text: str = ""
+    # Whether _page_text was read from page_file, so it can be released and read again. Not a dataclass field
+    _text_from_file = False
 
     def __eq__(self, other) -> bool:
         if not isinstance(other, Page):
@@ -35,34 +65,88 @@ class Page:
     def page_text(self) -> str:
         if self._page_text == "":
             if (_file := Path(self.page_file)).exists():
-                self._page_text = Path(self.page_file).read_text()
+                self._page_text = read_page_file(_file, self.strip_front_matter)
+                self._text_from_file = True
         return self._page_text
 
     @page_text.setter
     def page_text(self, value: str):
         self._page_text = value
+        self._text_from_file = False
+
+    @property
+    def text_is_set(self) -> bool:
+        """Whether the text was set directly instead of being read from the page file"""
+        return self._page_text != "" and not self._text_from_file
+
+    def set_text_from_file(self, value: str) -> None:
+        """Sets the text that was read from the page file elsewhere, e.g. read and converted in another process.
+        Such text can be released"""
+        self._page_text = value
+        self._text_from_file = True
+
+    def replace_text(self, value: str) -> None:
+        """Replaces the text with one derived from it, e.g. converted. Unlike the setter, keeps track of whether the
+        text came from the file"""
+        self._page_text = value
+
+    def release_text(self) -> None:
+        """Frees the text read from the page file, it is read again on next access. The text that was set directly,
+        e.g. read from stdin, is kept since it cannot be read again"""
+        if self._text_from_file:
+            self._page_text = ""
+            self._text_from_file = False
 
     page_file_format: AllowedFileFormat = AllowedFileFormat.none
     force_overwrite: Union[bool, None] = False
+    # Pages of a page tree keep their titles in the front matter, it is not posted
+    strip_front_matter: bool = False
+
+
+class PageList(MutableSequence):
+    """List of the pages that takes them from an iterator as they are accessed, e.g. while the page tree is scanned.
+    Taking the length, a negative index or a slice, or changing the list reads the rest of the pages"""
 
+    def __init__(self, pages: Iterable[Page]):
+        self.__pages: List[Page] = []
+        self.__rest: Union[Iterator[Page], None] = iter(pages)
 
-class AllowedFileFormatField(fields.Field):
-    def _deserialize(self, value, attr, data, **kwargs):
-        if not isinstance(value, AllowedFileFormat):
-            raise ValidationError(f"Invalid value for field: {value}")
-        return value.value
+    def __take(self, count: Union[int, None] = None):
+        """Takes the pages from the iterator until there are count of them, or all of them if count is None"""
+        while self.__rest is not None and (count is None or len(self.__pages) < count):
+            try:
+                self.__pages.append(next(self.__rest))
+            except StopIteration:
+                self.__rest = None
 
+    def __iter__(self) -> Iterator[Page]:
+        index = 0
+        while True:
+            self.__take(index + 1)
+            if index >= len(self.__pages):
+                return
+            yield self.__pages[index]
+            index += 1
 
-class PageSchema(Schema):
-    page_title = fields.Str()
-    page_file = fields.Str()
-    page_space = fields.Str()
-    parent_page_title = fields.Str(missing=None)
-    _page_text = fields.Str()
-    page_file_format = AllowedFileFormatField(
-        default=AllowedFileFormat.none, missing=AllowedFileFormat.none
-    )
-    force_overwrite = fields.Boolean(default=False)
+    def __getitem__(self, index):
+        self.__take(index + 1 if isinstance(index, int) and index >= 0 else None)
+        return self.__pages[index]
+
+    def __len__(self) -> int:
+        self.__take()
+        return len(self.__pages)
+
+    def __setitem__(self, index, value):
+        self.__take()
+        self.__pages[index] = value
+
+    def __delitem__(self, index):
+        self.__take()
+        del self.__pages[index]
+
+    def insert(self, index: int, value: Page):
+        self.__take()
+        self.__pages.insert(index, value)
 
 
 @dataclass
@@ -73,6 +157,18 @@ class Auth:
     is_cloud: bool = False
 
 
+@dataclass
+class Http:
+    pool_size: int = 10
+    keep_alive: bool = True
+    gzip_requests: bool = False
+    gzip_min_size: int = 64 * 1024
+    max_retries: int = 5
+    backoff_factor: float = 0.5
+    max_backoff: float = 60.0
+    requests_per_second: float = 0.0
+
+
 class PartialConfig(UserDict):
     """A class that allows reading file contents or data from a dictionary"""
 
@@ -109,23 +205,40 @@ class Config(PartialConfig):
         self.pages = _["pages"]
         self.auth = _["auth"]
         self.author = _.get("author", None)
+        self.http = _.get("http", {})
 
     @property
-    def pages(self):
+    def pages(self) -> PageList:
         return self.__pages
 
     @pages.setter
     def pages(self, pages: dict):
-        self.__pages = list()
-        default_space = None
+        page_list = list()
+        page_trees = list()
+        self.__default_space = None
         for item in pages:
             item_content = pages[item]
-            if isinstance(item_content, dict):
+            if item == "tree":
+                # [pages.tree] or [[pages.tree]]: pages found in the directories
+                trees = (
+                    item_content if isinstance(item_content, list) else [item_content]
+                )
+                if not all(isinstance(_, dict) for _ in trees):
+                    raise ValueError(
+                        "Pages section is malformed, refer to sample config.toml"
+                    )
+                from confluence_poster.page_tree import PageTree
+
+                page_trees.extend(PageTree.from_config(_) for _ in trees)
+            elif isinstance(item_content, dict):
                 if item == "default":
-                    default_space = item_content.get(
+                    self.__default_space = item_content.get(
                         "page_space", None
                     )  # None is OK here, checked later
-                    if not isinstance(default_space, str) or default_space is None:
+                    if (
+                        not isinstance(self.__default_space, str)
+                        or self.__default_space is None
+                    ):
                         raise ValueError("default.page_space should be a string")
                 else:  # this is a page definition
                     for prop in item_content:  # TODO: better validation
@@ -145,43 +258,62 @@ class Config(PartialConfig):
                         parent_page_title=item_content.get("page_parent_title", None),
                         force_overwrite=item_content.get("force_overwrite", False),
                     )
-                    self.__pages.append(page)
+                    page_list.append(page)
             else:
                 raise ValueError(
                     "Pages section is malformed, refer to sample config.toml"
                 )
 
-        # Validate pages
+        self.__validate_pages(page_list, has_trees=bool(page_trees))
+        # The trees are scanned as the pages are iterated over, so that the commands that do not post the pages do not
+        # wait for the scan, and the posting starts before the scan is over
+        self.__pages = PageList(
+            self.__tree_pages(page_list, page_trees) if page_trees else page_list
+        )
+
+    def __set_default_space(self, page: Page):
+        if page.page_space is None:
+            if self.__default_space is not None:
+                page.page_space = self.__default_space
+            else:
+                raise ValueError(
+                    f"Page '{page.page_title}' does not have page_space specified,"
+                    f" neither is default space"
+                )
+
+    def __validate_pages(self, pages: List[Page], has_trees: bool):
         # Page space may be none, in that case default space must be specified
         # Page name may be none, but the pages list may contain only one. In that case,
         # page title is expected in the main script
-        for page in self.__pages:
-            if page.page_space is None:
-                if default_space is not None:
-                    page.page_space = default_space
-                else:
-                    raise ValueError(
-                        f"Page '{page.page_title}' does not have page_space specified,"
-                        f" neither is default space"
-                    )
-            if page.page_title is None and len(self.__pages) > 1:
+        for page in pages:
+            self.__set_default_space(page)
+            if page.page_title is None and (len(pages) > 1 or has_trees):
                 raise ValueError(
                     "There are more than 1 page, and one of the names is not specified"
                 )
 
-            # Check that there are no pages with same space and name - they will overwrite each other
-            page_title_func = attrgetter("page_title")
-            page_space_func = attrgetter("page_space")
-            groups = groupby(sorted(self.__pages, key=page_title_func), page_title_func)
-            for page_title, g in groups:
-                _ = list(g)
-                groups_space = groupby(sorted(_, key=page_space_func), page_space_func)
-                for space_name, group in groups_space:
-                    _ = list(group)
-                    if len(_) > 1:
-                        raise ValueError(
-                            f"There are more than 1 page called '{page_title}' in space {space_name}"
-                        )
+        # Check that there are no pages with same space and name - they will overwrite each other
+        page_counts = Counter((page.page_space, page.page_title) for page in pages)
+        if duplicates := [
+            f"There are more than 1 page called '{page_title}' in space {space_name}"
+            for (space_name, page_title), count in page_counts.items()
+            if count > 1
+        ]:
+            raise ValueError("\n".join(duplicates))
+
+    def __tree_pages(self, pages: List[Page], page_trees: list) -> Iterator[Page]:
+        """Yields the pages listed in the config, then the pages of the trees, checking them as they are found"""
+        yield from pages
+        titles = {(page.page_space, page.page_title) for page in pages}
+        for tree in page_trees:
+            for page in tree:
+                self.__set_default_space(page)
+                if (page.page_space, page.page_title) in titles:
+                    raise ValueError(
+                        f"There are more than 1 page called '{page.page_title}' in space {page.page_space}"
+                    )
+                titles.add((page.page_space, page.page_title))
+                yield page
 
     @property
     def auth(self):
@@ -216,3 +348,36 @@ class Config(PartialConfig):
             )
 
         self.__author = author
+
+    @property
+    def http(self):
+        return self.__http
+
+    @http.setter
+    def http(self, http: dict):
+        if unknown_keys := set(http) - {_.name for _ in fields(Http)}:
+            raise KeyError(
+                f"Unknown keys in http section: {', '.join(sorted(unknown_keys))}"
+            )
+        http = dict(http)
+        for http_field in fields(Http):
+            if http_field.type is float and type(http.get(http_field.name)) is int:
+                http[http_field.name] = float(http[http_field.name])
+            if (
+                http_field.name in http
+                and type(http[http_field.name]) is not http_field.type
+            ):
+                raise ValueError(
+                    f"{http_field.name} in http section should be of type {http_field.type.__name__}"
+                )
+        self.__http = Http(**http)
+        if self.__http.pool_size < 1:
+            raise ValueError("pool_size in http section should be positive")
+        for http_field in [
+            "max_retries",
+            "backoff_factor",
+            "max_backoff",
+            "requests_per_second",
+        ]:
+            if getattr(self.__http, http_field) < 0:
+                raise ValueError(f"{http_field} in http section should not be negative")
@@ -0,0 +1,119 @@
+import json
+import os
+import threading
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, asdict
+from enum import Enum
+from math import ceil
+from time import perf_counter
+from typing import Union, List, Dict
+
+"""Lightweight timing of the phases of a run, enabled by --profile"""
+
+
+class ProfileFormat(str, Enum):
+    json = "json"
+    chrome = "chrome"
+
+
+@dataclass
+class Span:
+    name: str
+    page: Union[str, None]
+    # Seconds since the start of the profiling
+    start: float
+    duration: float
+    thread_id: int
+
+
+def percentile(values: List[float], percent: int) -> float:
+    """Nearest-rank percentile of the values"""
+    ordered = sorted(values)
+    return ordered[max(0, ceil(percent / 100 * len(ordered)) - 1)]
+
+
+class Profiler:
+    """Collects the spans from all threads. If it is not enabled, the spans cost next to nothing"""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.spans: List[Span] = []
+        self._origin = perf_counter()
+        self._lock = threading.Lock()
+
+    def span(self, name: str, page: Union[str, None] = None):
+        """Context manager that times the enclosed block
+
+        :param name: name of the phase, e.g. "lookup"
+        :param page: title of the page the phase is run for, if any
+        """
+        if not self.enabled:
+            return nullcontext()
+        return self._span(name, page)
+
+    @contextmanager
+    def _span(self, name: str, page: Union[str, None]):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            span = Span(
+                name=name,
+                page=page,
+                start=start - self._origin,
+                duration=perf_counter() - start,
+                thread_id=threading.get_ident(),
+            )
+            with self._lock:
+                self.spans.append(span)
+
+    def summary(self) -> str:
+        """Returns the breakdown by phase, aggregated and per page"""
+        output = "Profile:\n"
+        output += self._table(self.spans, indent="")
+        pages: Dict[str, List[Span]] = {}
+        for span in self.spans:
+            if span.page is not None:
+                pages.setdefault(span.page, []).append(span)
+        for page, spans in pages.items():
+            output += f"Page '{page}':\n"
+            output += self._table(spans, indent="\t")
+        return output
+
+    @staticmethod
+    def _table(spans: List[Span], indent: str) -> str:
+        phases: Dict[str, List[float]] = {}
+        for span in spans:
+            phases.setdefault(span.name, []).append(span.duration)
+        output = ""
+        for name, durations in phases.items():
+            output += (
+                f"{indent}{name:<20} count: {len(durations):>5} total: {sum(durations):9.3f}s "
+                f"p50: {percentile(durations, 50):7.3f}s p95: {percentile(durations, 95):7.3f}s\n"
+            )
+        return output
+
+    def dump(self, file, profile_format: ProfileFormat) -> None:
+        """Writes the spans to the file, either as JSON or as Chrome trace events to be viewed in a flame chart tool,
+        e.g. chrome://tracing or Perfetto"""
+        if profile_format is ProfileFormat.json:
+            data = [asdict(span) for span in self.spans]
+        else:
+            pid = os.getpid()
+            data = {
+                "traceEvents": [
+                    {
+                        "name": span.name,
+                        "cat": "confluence_poster",
+                        "ph": "X",
+                        "ts": round(span.start * 1e6),
+                        "dur": round(span.duration * 1e6),
+                        "pid": pid,
+                        "tid": span.thread_id,
+                        "args": {} if span.page is None else {"page": span.page},
+                    }
+                    for span in self.spans
+                ],
+                "displayTimeUnit": "ms",
+            }
+        json.dump(data, file, indent=2)
@@ -0,0 +1,95 @@
+import time
+from collections import deque
+from threading import Lock
+from typing import Union
+
+"""Bookkeeping of the requests to Confluence. Kept apart from http_helpers, so that it can be used without importing
+requests."""
+
+
+class RequestStats:
+    """Counts the retries and the time spent waiting for them or for the rate limiter. Shared between threads."""
+
+    def __init__(self):
+        self.retries = 0
+        self.throttled = 0
+        self.wait_time = 0.0
+        self._lock = Lock()
+
+    def record(self, retries: int = 0, throttled: int = 0, wait_time: float = 0.0):
+        with self._lock:
+            self.retries += retries
+            self.throttled += throttled
+            self.wait_time += wait_time
+
+    def __str__(self):
+        return (
+            f"Retried requests: {self.retries}, throttled by the server: {self.throttled} times, "
+            f"waited for {self.wait_time:.1f}s"
+        )
+
+
+class RateLimiter:
+    """Token bucket that adapts to throttling: the rate is halved each time the server throttles the requests and is
+    slowly increased back on successful responses.
+
+    If max_rate is not set - the requests are not limited until the server throttles them for the first time."""
+
+    # Window for estimating the request rate before the first throttling
+    window = 10.0
+    # Increase of the rate per successful request, in requests per second
+    rate_increase = 0.1
+
+    def __init__(self, max_rate: Union[float, None] = None, min_rate: float = 0.5):
+        self.max_rate = max_rate or None
+        self.min_rate = min_rate
+        self.rate = self.max_rate
+        self._tokens = 1.0
+        self._last_refill = time.monotonic()
+        self._recent_requests = deque()
+        self._lock = Lock()
+
+    def acquire(self) -> float:
+        """Takes a token, waiting for it if needed
+
+        :return time waited in seconds
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._recent_requests.append(now)
+            while self._recent_requests[0] < now - self.window:
+                self._recent_requests.popleft()
+            if self.rate is None:
+                return 0.0
+            self._tokens = min(
+                max(self.rate, 1.0),
+                self._tokens + (now - self._last_refill) * self.rate,
+            )
+            self._last_refill = now
+            # Tokens may go below zero: the following callers wait for their turn after this one
+            self._tokens -= 1
+            wait_time = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+        if wait_time:
+            time.sleep(wait_time)
+        return wait_time
+
+    def throttled(self):
+        with self._lock:
+            if self.rate is None:
+                # At least one second, so that a short burst of requests does not look like a high rate
+                elapsed = (
+                    time.monotonic() - self._recent_requests[0]
+                    if self._recent_requests
+                    else 0
+                )
+                current_rate = len(self._recent_requests) / max(1.0, elapsed)
+            else:
+                current_rate = self.rate
+            self.rate = max(self.min_rate, current_rate / 2)
+
+    def succeeded(self):
+        with self._lock:
+            if self.rate is not None:
+                self.rate += self.rate_increase
+                if self.max_rate is not None:
+                    self.rate = min(self.rate, self.max_rate)
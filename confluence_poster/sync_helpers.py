@@ -0,0 +1,158 @@
+import json
+import os
+import subprocess
+from hashlib import sha256
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import Iterable, List, Dict, Set, Union
+
+from confluence_poster.poster_config import Page
+
+"""Procedures that find the pages and the attachments changed in a git repository since they were last synced"""
+
+
+class GitError(Exception):
+    pass
+
+
+def git(*args: str, cwd: Path) -> str:
+    """Runs the git command in the directory
+
+    :raises GitError: if git is not installed or the command fails
+    """
+    try:
+        result = subprocess.run(
+            ["git", *args], cwd=cwd, capture_output=True, text=True, check=True
+        )
+    except FileNotFoundError:
+        raise GitError("git is not installed")
+    except subprocess.CalledProcessError as e:
+        raise GitError(e.stderr.strip() or f"git {' '.join(args)} failed")
+    return result.stdout
+
+
+def repository_root(path: Path) -> Path:
+    return Path(git("rev-parse", "--show-toplevel", cwd=path).strip()).resolve()
+
+
+def resolve_revision(revision: str, root: Path) -> str:
+    """Returns the commit hash of the revision"""
+    return git("rev-parse", "--verify", f"{revision}^{{commit}}", cwd=root).strip()
+
+
+def changed_files(root: Path, since: str, until: Union[str, None] = None) -> Set[Path]:
+    """Returns the files changed between the revisions. If `until` is not set - between the revision and the working
+    tree, including the files git does not track yet
+
+    :return absolute paths of the changed files, including the removed ones
+    """
+    revisions = [since] if until is None else [since, until]
+    output = git("diff", "--name-only", "--no-renames", "-z", *revisions, cwd=root)
+    if until is None:
+        output += git("ls-files", "--others", "--exclude-standard", "-z", cwd=root)
+    return {root / name for name in output.split("\0") if name}
+
+
+class SyncIndex:
+    """Maps the files to the pages that are posted from them and to the attachments
+
+    :param pages: configured pages
+    :param attachments: files attached to the first page
+    """
+
+    def __init__(self, pages: Iterable[Page], attachments: Iterable[Path] = ()):
+        self.pages = list(pages)
+        self._pages_by_file: Dict[Path, List[Page]] = {}
+        for page in self.pages:
+            self._pages_by_file.setdefault(Path(page.page_file).resolve(), []).append(
+                page
+            )
+        self._attachments = {Path(path).resolve(): Path(path) for path in attachments}
+
+    def changed_pages(self, changed: Set[Path]) -> List[Page]:
+        """Returns the pages posted from the changed files, in the config order"""
+        changed_ids = {
+            id(page)
+            for path in changed
+            for page in self._pages_by_file.get(path.resolve(), [])
+        }
+        return [page for page in self.pages if id(page) in changed_ids]
+
+    def synced_files(self, changed: Set[Path]) -> Set[Path]:
+        """Returns the changed files the pages are posted from or that are attached, including the removed ones"""
+        return {
+            path
+            for path in changed
+            if path.resolve() in self._pages_by_file
+            or path.resolve() in self._attachments
+        }
+
+    def changed_attachments(self, changed: Set[Path]) -> List[Path]:
+        """Returns the attachments that changed and still exist"""
+        changed = {path.resolve() for path in changed}
+        return [
+            path
+            for resolved_path, path in self._attachments.items()
+            if resolved_path in changed and path.is_file()
+        ]
+
+
+def sync_state_path() -> Path:
+    """Returns the file in $XDG_CACHE_HOME that keeps the last synced revisions, creating the directory if needed"""
+    import xdg.BaseDirectory
+
+    return (
+        Path(xdg.BaseDirectory.save_cache_path("confluence_poster")) / "sync_state.json"
+    )
+
+
+def sync_key(root: Path, confluence_url: str, pages: Iterable[Page]) -> str:
+    """Identifies the synced set of pages, so that several configs in the same repository are synced separately"""
+    titles = sorted(f"{page.page_space}\0{page.page_title}" for page in pages)
+    return sha256("\0".join([str(root), confluence_url, *titles]).encode()).hexdigest()
+
+
+@dataclass
+class LastSync:
+    """The revision synced by the previous run
+
+    :param revision: commit hash
+    :param uncommitted_files: files of the pages and attachments, relative to the repository root, that were posted
+    with the changes not committed to the revision. They are posted again by the next run, whatever was committed
+    """
+
+    revision: str
+    uncommitted_files: List[str] = field(default_factory=list)
+
+
+def read_last_synced(key: str, path: Union[Path, None] = None) -> Union[LastSync, None]:
+    path = path or sync_state_path()
+    try:
+        last_sync = json.loads(path.read_text()).get(key)
+    except (OSError, ValueError):
+        return None
+    if isinstance(last_sync, str):
+        # Recorded by the versions that kept only the revision
+        return LastSync(last_sync)
+    if not isinstance(last_sync, dict) or not isinstance(
+        last_sync.get("revision"), str
+    ):
+        return None
+    return LastSync(last_sync["revision"], list(last_sync.get("uncommitted_files", [])))
+
+
+def record_synced(
+    key: str, last_sync: LastSync, path: Union[Path, None] = None
+) -> None:
+    path = path or sync_state_path()
+    try:
+        state = json.loads(path.read_text())
+    except (OSError, ValueError):
+        state = {}
+    state[key] = {
+        "revision": last_sync.revision,
+        "uncommitted_files": sorted(last_sync.uncommitted_files),
+    }
+    temp_file = path.with_suffix(f".{os.getpid()}.tmp")
+    temp_file.write_text(json.dumps(state, indent=2))
+    os.replace(temp_file, path)
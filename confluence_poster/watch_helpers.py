@@ -0,0 +1,244 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from hashlib import sha256
+from pathlib import Path
+from threading import Event
+from typing import Iterable, Set, Dict, Union, Tuple, List
+
+from confluence_poster.main_helpers import StateConfig, PostedPage, prepare_page_text
+
+"""Procedures that watch the page files and repost the pages when the files change"""
+
+# inotify events that mean the file got new content: written in place, or replaced by a file moved over it as editors
+# that save atomically do
+_in_close_write = 0x00000008
+_in_moved_to = 0x00000080
+_in_create = 0x00000100
+_inotify_event = struct.Struct("iIII")
+
+
+class PollingWatcher:
+    """Detects the changes by comparing the modification time and the size of the files
+
+    :param paths: files to watch
+    :param interval: seconds between the checks
+    """
+
+    def __init__(self, paths: Iterable[Path], interval: float = 0.2):
+        self.interval = interval
+        self._states = {path: self._state(path) for path in paths}
+
+    @staticmethod
+    def _state(path: Path) -> Union[Tuple[int, int], None]:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def wait(self, timeout: Union[float, None] = None) -> Set[Path]:
+        """Waits for the files to change
+
+        :param timeout: seconds to wait for, forever if None
+        :return changed files, empty if there were no changes before the timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            changed = set()
+            for path, state in self._states.items():
+                if (new_state := self._state(path)) != state:
+                    self._states[path] = new_state
+                    changed.add(path)
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            time.sleep(
+                self.interval
+                if deadline is None
+                else max(0.0, min(self.interval, deadline - time.monotonic()))
+            )
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """Receives the changes from the Linux kernel. The directories of the files are watched, not the files: editors
+    often save a file by writing a new one and moving it over the old one
+
+    :raises OSError: if inotify is not available
+    """
+
+    def __init__(self, paths: Iterable[Path]):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._paths = {path.absolute() for path in paths}
+        self._directories: Dict[int, Path] = {}
+        for directory in {path.parent for path in self._paths}:
+            watch_descriptor = libc.inotify_add_watch(
+                self._fd,
+                os.fsencode(directory),
+                _in_close_write | _in_moved_to | _in_create,
+            )
+            if watch_descriptor < 0:
+                error = ctypes.get_errno()
+                self.close()
+                raise OSError(error, f"Could not watch {directory}")
+            self._directories[watch_descriptor] = directory
+
+    def wait(self, timeout: Union[float, None] = None) -> Set[Path]:
+        """Waits for the files to change
+
+        :param timeout: seconds to wait for, forever if None
+        :return changed files, empty if there were no changes before the timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = (
+                None if deadline is None else max(0.0, deadline - time.monotonic())
+            )
+            if not select.select([self._fd], [], [], remaining)[0]:
+                return set()
+            if changed := self._read_events():
+                return changed
+
+    def _read_events(self) -> Set[Path]:
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            watch_descriptor, _, _, name_length = _inotify_event.unpack_from(
+                data, offset
+            )
+            offset += _inotify_event.size
+            name = data[offset : offset + name_length].rstrip(b"\0")
+            offset += name_length
+            if (directory := self._directories.get(watch_descriptor)) is not None:
+                path = directory / os.fsdecode(name)
+                if path in self._paths:
+                    changed.add(path)
+        return changed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+def make_watcher(
+    paths: Iterable[Path], poll_interval: float = 0.2
+) -> Union[InotifyWatcher, PollingWatcher]:
+    """Returns the inotify watcher on Linux, the polling one elsewhere or if inotify is not available"""
+    paths = list(paths)
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(paths)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(paths, interval=poll_interval)
+
+
+def wait_for_changes(
+    watcher: Union[InotifyWatcher, PollingWatcher],
+    debounce: float,
+    timeout: Union[float, None] = None,
+) -> Set[Path]:
+    """Waits for the files to change, then collects the changes until there are none for `debounce` seconds, so that
+    a burst of writes is handled once"""
+    changed = watcher.wait(timeout)
+    while changed and (more_changes := watcher.wait(debounce)):
+        changed |= more_changes
+    return changed
+
+
+def repost_page(
+    page: PostedPage, state: StateConfig, create_in_root: bool = False
+) -> Union[str, None]:
+    """Posts the page, updating it or creating it if it does not exist
+
+    :return status of the page for the report: "updated", "created" or None if the page was not posted
+    """
+    from confluence_poster.page_update_helpers import update_page
+    from confluence_poster.page_creation_helpers import create_page
+
+    prepare_page_text(page, state=state)
+    try:
+        if update_result := update_page(page, state=state):
+            return "updated" if update_result.page_updated else None
+        if page_created := create_page(
+            page=page, state=state, create_in_root=create_in_root
+        ):
+            page.page_id = page_created.page_id
+            return "created"
+        return None
+    finally:
+        page.release_text()
+
+
+def watch_pages(
+    pages: List[PostedPage],
+    state: StateConfig,
+    debounce: float = 0.2,
+    poll_interval: float = 0.2,
+    create_in_root: bool = False,
+    stop: Union[Event, None] = None,
+) -> None:
+    """Reposts the pages whose files change, until interrupted or until `stop` is set.
+
+    The pages that did not change since they were last posted are skipped, e.g. if a file is saved without changes.
+    """
+    echo = state.print_function
+    always_echo = state.always_print_function
+    echo_err = state.print_stderr
+
+    pages_by_file: Dict[Path, List[PostedPage]] = {}
+    for page in pages:
+        pages_by_file.setdefault(Path(page.page_file).absolute(), []).append(page)
+    posted_hashes: Dict[int, str] = {}
+
+    watcher = make_watcher(pages_by_file, poll_interval=poll_interval)
+    always_echo(
+        f"Watching {len(pages_by_file)} files for changes. Press Ctrl+C to stop."
+    )
+    try:
+        while stop is None or not stop.is_set():
+            # The timeout lets the loop check the stop event
+            changed_files = wait_for_changes(
+                watcher, debounce=debounce, timeout=None if stop is None else 0.1
+            )
+            for path in sorted(changed_files):
+                for page in pages_by_file.get(path.absolute(), []):
+                    if not path.exists():
+                        continue
+                    text_hash = sha256(path.read_bytes()).hexdigest()
+                    if posted_hashes.get(id(page)) == text_hash:
+                        echo(f"Page '{page.page_title}' did not change.")
+                        continue
+                    start = time.monotonic()
+                    try:
+                        status = repost_page(
+                            page, state=state, create_in_root=create_in_root
+                        )
+                    except Exception as e:
+                        # The file may be saved again with a fix, keep watching
+                        echo_err(f"Could not post page '{page.page_title}': {e}")
+                        continue
+                    if status is not None:
+                        posted_hashes[id(page)] = text_hash
+                        always_echo(
+                            f"Page '{page.page_title}' {status} in {time.monotonic() - start:.2f}s"
+                        )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+    always_echo("Stopped watching")
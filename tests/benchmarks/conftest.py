@@ -0,0 +1,53 @@
+import json
+import os
+import pytest
+from typing import List
+
+from mock_confluence import MockConfluence
+
+# If set - the benchmark results are also saved to this file as JSON
+results_file_variable = "CONFLUENCE_POSTER_BENCHMARK_JSON"
+
+benchmark_results: List[dict] = []
+
+
+@pytest.fixture(scope="function")
+def mock_confluence() -> MockConfluence:
+    with MockConfluence(latency=0.001) as server:
+        yield server
+
+
+@pytest.fixture(scope="session")
+def record_benchmark():
+    """Collects the timings, they are printed at the end of the run"""
+
+    def _record(name: str, pages: int, seconds: float, requests: int):
+        benchmark_results.append(
+            {"name": name, "pages": pages, "seconds": seconds, "requests": requests}
+        )
+
+    return _record
+
+
+def pytest_collection_modifyitems(config, items):
+    """Benchmarks take minutes, they are run only when selected explicitly with -m benchmark"""
+    if "benchmark" in (config.getoption("markexpr") or ""):
+        return
+    skip_benchmark = pytest.mark.skip(reason="Benchmarks run only with -m benchmark")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip_benchmark)
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not benchmark_results:
+        return
+    terminalreporter.section("benchmarks")
+    for result in benchmark_results:
+        terminalreporter.write_line(
+            f"{result['name']:<40} {result['pages']:>5} pages {result['seconds']:>9.3f}s "
+            f"{result['requests']:>6} requests"
+        )
+    if results_file := os.environ.get(results_file_variable):
+        with open(results_file, "w") as f:
+            json.dump(benchmark_results, f, indent=2)
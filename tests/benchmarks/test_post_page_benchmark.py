@@ -0,0 +1,94 @@
+import pytest
+from time import perf_counter
+from typer.testing import CliRunner
+from pathlib import Path
+from faker import Faker
+
+from confluence_poster.main import app
+from mock_confluence import make_config
+
+pytestmark = pytest.mark.benchmark
+
+runner = CliRunner()
+fake = Faker()
+space = "BENCH"
+parent_title = "Benchmark root"
+username = "confluence_username"
+
+
+def make_markdown_page() -> str:
+    paragraphs = "\n\n".join(fake.paragraphs(nb=5))
+    items = "\n".join(f"* {_}" for _ in fake.words(nb=10))
+    rows = "\n".join(f"| {fake.word()} | {fake.pyint()} |" for _ in range(10))
+    return (
+        f"# {fake.sentence()}\n\n{paragraphs}\n\n## List\n\n{items}\n\n"
+        f"## Table\n\n| Name | Value |\n| --- | --- |\n{rows}\n\n"
+        f"```python\nprint({fake.pyint()})\n```\n"
+    )
+
+
+def make_files(tmp_path: Path, count: int = 3, size: int = 256 * 1024):
+    files = []
+    for number in range(count):
+        path = tmp_path / f"attachment_{number}.bin"
+        path.write_bytes(fake.binary(length=size))
+        files.append(str(path))
+    return files
+
+
+def run_post_page(config_file: Path, files, jobs: int = 1):
+    result = runner.invoke(
+        app,
+        [
+            "--config",
+            str(config_file),
+            "--force-create",
+            "--quiet",
+            "post-page",
+            "--jobs",
+            str(jobs),
+            "--upload-files",
+            *files,
+        ],
+        input="Y\n",
+    )
+    assert result.exit_code == 0, result.stdout
+    return result
+
+
+@pytest.mark.parametrize("jobs", [1, 8], ids=lambda jobs: f"{jobs} jobs")
+@pytest.mark.parametrize(
+    "page_count", [1, 100, 1000], ids=lambda page_count: f"{page_count} pages"
+)
+def test_post_page(tmp_path, mock_confluence, record_benchmark, page_count, jobs):
+    """Times creating the pages and then updating them, with the markdown conversion and the attachments"""
+    mock_confluence.add_page(space, parent_title, author=username)
+    config_file = make_config(
+        tmp_path,
+        mock_confluence,
+        page_count,
+        space=space,
+        parent_title=parent_title,
+        make_text=lambda _: make_markdown_page(),
+    )
+    files = make_files(tmp_path)
+
+    for phase in ["create", "update"]:
+        mock_confluence.requests.clear()
+        start = perf_counter()
+        run_post_page(config_file, files, jobs=jobs)
+        elapsed = perf_counter() - start
+        record_benchmark(
+            name=f"post-page {phase}, {jobs} jobs",
+            pages=page_count,
+            seconds=elapsed,
+            requests=sum(mock_confluence.requests.values()),
+        )
+
+    # The parent page and the posted ones
+    assert len(mock_confluence.pages) == page_count + 1
+    assert all(
+        page["version"]["number"] == 2
+        for page in mock_confluence.pages.values()
+        if page["title"] != parent_title
+    )
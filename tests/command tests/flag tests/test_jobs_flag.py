@@ -0,0 +1,57 @@
+import pytest
+from typer.testing import CliRunner
+from utils import (
+    rewrite_page_file,
+    run_with_config,
+    generate_run_cmd,
+    check_body_and_title,
+)
+from confluence_poster.main import app
+from confluence_poster.poster_config import Config
+from functools import partial
+
+pytestmark = pytest.mark.online
+
+runner = CliRunner()
+default_run_cmd = generate_run_cmd(
+    runner=runner, app=app, default_args=["--report", "post-page"]
+)
+run_with_config = partial(run_with_config, default_run_cmd=default_run_cmd)
+
+
+@pytest.mark.parametrize(
+    "jobs",
+    [1, 3],
+    ids=lambda jobs: f"Runs confluence_poster post-page --jobs {jobs}",
+)
+def test_post_pages_with_jobs(setup_page, jobs):
+    """Checks that the pages are updated and reported in the config order regardless of the amount of jobs"""
+    config_file, page_list = setup_page(3)
+    config = Config(config_file)
+    new_texts = [rewrite_page_file(page.page_file) for page in config.pages]
+
+    result = run_with_config(config_file=config_file, other_args=["--jobs", str(jobs)])
+    assert result.exit_code == 0
+    assert result.stdout.count("Updating page") == 3
+
+    report = result.stdout[result.stdout.index("Updated pages:\n") :]
+    positions = [
+        report.index(f"{page.page_space}::{page.page_title}") for page in config.pages
+    ]
+    assert positions == sorted(positions), "Pages should be reported in config order"
+
+    page_ids = page_list[::2]
+    for page_id, page, new_text in zip(page_ids, config.pages, new_texts):
+        check_body_and_title(page_id, body_text=new_text, title_text=page.page_title)
+
+
+def test_create_prompts_with_jobs(make_two_page_config):
+    """Checks that creation prompts are still asked one page at a time when several jobs run"""
+    config_file, config = make_two_page_config
+    result = run_with_config(
+        config_file=config_file,
+        other_args=["--jobs", "2"],
+        input="Y\nN\nY\n" * 2,
+    )
+    assert result.exit_code == 0
+    assert result.stdout.count("Creating page") == 2
@@ -0,0 +1,101 @@
+import pytest
+import toml
+from typer.testing import CliRunner
+
+from confluence_poster.main import app
+from mock_confluence import MockConfluence, make_config
+
+pytestmark = pytest.mark.offline
+
+runner = CliRunner()
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    """Server with the pages "Page 0" and "Page 1" posted with the page index, kept in a temporary cache"""
+    monkeypatch.setattr("xdg.BaseDirectory.xdg_cache_home", str(tmp_path / "cache"))
+    with MockConfluence() as _:
+        config_file = make_config(tmp_path, _)
+        result = _post_pages(config_file, "--create-in-space-root")
+        assert result.exit_code == 0, result.stdout
+        _.requests.clear()
+        yield _
+
+
+def _post_pages(config_file, *args):
+    return runner.invoke(
+        app,
+        [
+            "--config",
+            str(config_file),
+            "--page-index",
+            "--force-create",
+            "--report",
+            "post-page",
+            *args,
+        ],
+    )
+
+
+def test_page_index_hit(tmp_path, server):
+    result = _post_pages(tmp_path / "config.toml")
+    assert result.exit_code == 0, result.stdout
+    assert "in the page index" in result.stdout
+    assert server.requests[("GET", "search")] == 0
+    assert server.requests[("GET", "get_by_title")] == 0
+    assert server.requests[("GET", "get_by_id")] == 0
+    assert server.requests[("PUT", "update")] == 2
+    assert {page["version"]["number"] for page in server.pages.values()} == {2}
+
+
+def test_page_index_removed_page(tmp_path, server):
+    """The page removed since it was indexed is looked up and created again"""
+    removed_page_id = server.find_page("LOC", "Page 0")["id"]
+    del server.pages[removed_page_id]
+    result = _post_pages(tmp_path / "config.toml", "--create-in-space-root")
+    assert result.exit_code == 0, result.stdout
+    assert "was changed or removed since it was indexed" in result.stdout
+    assert server.requests[("GET", "get_by_title")] == 1
+    assert server.requests[("POST", "create")] == 1
+    assert server.find_page("LOC", "Page 0")["id"] != removed_page_id
+
+    server.requests.clear()
+    result = _post_pages(tmp_path / "config.toml")
+    assert result.exit_code == 0, result.stdout
+    assert server.requests[("GET", "get_by_title")] == 0, "Created page is indexed"
+
+
+def test_page_index_page_updated_by_someone_else(tmp_path, server):
+    """The page updated by someone else since it was indexed goes through the lookup and the author check"""
+    page = server.find_page("LOC", "Page 0")
+    page["version"]["number"] += 1
+    page["version"]["by"]["username"] = "someone_else"
+    result = _post_pages(tmp_path / "config.toml")
+    assert result.exit_code == 0, result.stdout
+    assert "was changed or removed since it was indexed" in result.stdout
+    assert server.requests[("GET", "get_by_title")] == 1
+    assert "LOC::Page 0 Reason: Last updated by someone_else." in result.stdout
+    assert server.requests[("PUT", "update")] == 2, "Page 0 update is rejected once"
+    assert page["version"]["number"] == 2
+
+
+def test_page_index_parent(tmp_path, server):
+    """The parent of the created page is found in the index"""
+    config = toml.loads((tmp_path / "config.toml").read_text())
+    (tmp_path / "child.md").write_text("# Child")
+    config["pages"] = {
+        "child": {
+            "page_title": "Child",
+            "page_file": str(tmp_path / "child.md"),
+            "page_space": "LOC",
+            "page_parent_title": "Page 0",
+        }
+    }
+    (tmp_path / "config.toml").write_text(toml.dumps(config))
+    result = _post_pages(tmp_path / "config.toml")
+    assert result.exit_code == 0, result.stdout
+    assert "called 'Page 0' in the page index" in result.stdout
+    assert server.requests[("GET", "get_by_title")] == 1, "Only the child is looked up"
+    assert server.find_page("LOC", "Child")["ancestors"] == [
+        {"id": server.find_page("LOC", "Page 0")["id"]}
+    ]
@@ -0,0 +1,75 @@
+import json
+import time
+import pytest
+from typer.testing import CliRunner
+
+from confluence_poster.main import app
+from mock_confluence import MockConfluence, make_config
+
+pytestmark = pytest.mark.offline
+
+runner = CliRunner()
+
+
+def _report_args(config_file, report_format):
+    return [
+        "--config",
+        str(config_file),
+        "--force-create",
+        "--report",
+        "--report-format",
+        report_format,
+        "post-page",
+        "--create-in-space-root",
+    ]
+
+
+def test_jsonl_report_skipped_page(tmp_path):
+    with MockConfluence() as server:
+        config_file = make_config(tmp_path, server)
+        server.add_page("LOC", "Page 0", author="someone_else")
+        result = runner.invoke(app, _report_args(config_file, "jsonl"))
+    assert result.exit_code == 0, result.stdout
+    lines = [
+        json.loads(line)
+        for line in result.stdout.splitlines()
+        if line.startswith('{"space"')
+    ]
+    assert {line["title"]: (line["status"], line["reason"]) for line in lines} == {
+        "Page 0": ("unprocessed", "Last updated by someone_else."),
+        "Page 1": ("created", None),
+    }
+
+
+def test_text_report_skipped_page(tmp_path):
+    with MockConfluence() as server:
+        config_file = make_config(tmp_path, server, page_count=1)
+        server.add_page("LOC", "Page 0", author="someone_else")
+        result = runner.invoke(app, _report_args(config_file, "text"))
+    assert result.exit_code == 0, result.stdout
+    assert (
+        "Unprocessed pages:LOC::Page 0 Reason: Last updated by someone_else."
+        in result.stdout
+    )
+
+
+def test_jsonl_report_order(tmp_path):
+    """The pages created at the same time are reported in the order of the config"""
+
+    def _delay_first_page(handler):
+        if handler._json()["title"] == "Page 0":
+            time.sleep(0.5)
+
+    with MockConfluence() as server:
+        config_file = make_config(tmp_path, server, page_count=3)
+        server.hooks["create"] = _delay_first_page
+        args = _report_args(config_file, "jsonl")
+        result = runner.invoke(app, [*args, "--jobs", "3"])
+    assert result.exit_code == 0, result.stdout
+    created_order = sorted(server.pages.values(), key=lambda _: int(_["id"]))
+    assert created_order[-1]["title"] == "Page 0", "Page 0 was created last"
+    assert [
+        json.loads(line)["title"]
+        for line in result.stdout.splitlines()
+        if line.startswith('{"space"')
+    ] == ["Page 0", "Page 1", "Page 2"]
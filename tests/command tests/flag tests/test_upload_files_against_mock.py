@@ -0,0 +1,96 @@
+import pytest
+from typer.testing import CliRunner
+
+from confluence_poster.main import app
+from mock_confluence import MockConfluence, make_config
+
+pytestmark = pytest.mark.offline
+
+runner = CliRunner()
+
+
+def test_upload_files_skips_unchanged(tmp_path):
+    files = [tmp_path / "first.bin", tmp_path / "second.bin"]
+    for number, path in enumerate(files):
+        path.write_bytes(bytes([number]) * 100_000)
+    with MockConfluence() as server:
+        config_file = make_config(tmp_path, server, page_count=1)
+        args = [
+            "--config",
+            str(config_file),
+            "--force-create",
+            "post-page",
+            "--create-in-space-root",
+            "--upload-files",
+            *map(str, files),
+        ]
+        result = runner.invoke(app, args)
+        assert result.exit_code == 0, result.stdout
+        (page_id,) = server.pages
+        assert {
+            _["title"]: _["extensions"]["fileSize"] for _ in server.attachments[page_id]
+        } == {"first.bin": 100_000, "second.bin": 100_000}
+
+        result = runner.invoke(app, args)
+        assert result.exit_code == 0, result.stdout
+        assert "File first.bin is already attached. Skipping." in result.stdout
+        assert server.requests[("POST", "create_attachment")] == 2
+        assert server.requests[("POST", "update_attachment")] == 0
+
+        files[0].write_bytes(b"changed")
+        result = runner.invoke(app, args)
+        assert result.exit_code == 0, result.stdout
+        assert server.requests[("POST", "update_attachment")] == 1
+        assert {
+            _["title"]: _["version"]["number"] for _ in server.attachments[page_id]
+        } == {"first.bin": 2, "second.bin": 1}
+
+
+def test_upload_files_once_per_run(tmp_path):
+    """The files are uploaded to the first page once, however many pages there are in the config"""
+    files = [tmp_path / "first.bin", tmp_path / "second.bin"]
+    for path in files:
+        path.write_bytes(b"content")
+    with MockConfluence() as server:
+        config_file = make_config(tmp_path, server, page_count=5)
+        result = runner.invoke(
+            app,
+            [
+                "--config",
+                str(config_file),
+                "--force-create",
+                "post-page",
+                "--create-in-space-root",
+                "--upload-files",
+                *map(str, files),
+            ],
+            input="y\n",
+        )
+        assert result.exit_code == 0, result.stdout
+        assert server.requests[("GET", "get_attachments")] == 1
+        assert server.requests[("POST", "create_attachment")] == 2
+        assert server.requests[("POST", "update_attachment")] == 0
+        assert len(server.attachments[server.find_page("LOC", "Page 0")["id"]]) == 2
+
+
+def test_upload_files_page_skipped(tmp_path):
+    """The files are not attached to the page the author check skipped"""
+    (attachment := tmp_path / "file.bin").write_bytes(b"content")
+    with MockConfluence() as server:
+        config_file = make_config(tmp_path, server, page_count=1)
+        server.add_page("LOC", "Page 0", author="someone_else")
+        result = runner.invoke(
+            app,
+            [
+                "--config",
+                str(config_file),
+                "post-page",
+                "--upload-files",
+                str(attachment),
+            ],
+        )
+        assert result.exit_code == 0, result.stdout
+        assert "Skipping page" in result.stdout
+        assert server.requests[("PUT", "update")] == 0
+        assert server.requests[("GET", "get_attachments")] == 0
+        assert server.requests[("POST", "create_attachment")] == 0
@@ -184,3 +184,43 @@ def test_dialog_home_directory_created(tmp_path, monkeypatch):
     result = default_run_cmd(input="\n".join(_input) + "\n", other_args=["--home-only"])
     assert result.exit_code == 0
     assert (new_home_config / "confluence_poster").exists()
+
+
+def test_import_pages(tmp_path):
+    """Pages are imported into the local config without prompts, the imported pages are not imported again"""
+    docs = tmp_path / "cwd" / "docs"
+    (docs / "guides").mkdir(parents=True)
+    (docs / "index.md").write_text("# Docs")
+    (docs / "guides" / "setup.md").write_text("# Setup")
+    (docs / "guides" / "image.png").write_bytes(b"\x89PNG")
+    config = Path(default_config_name)
+    config.write_text(
+        '[pages.default]\npage_space = "DOC"\n'
+        '[auth]\nconfluence_url = "https://confluence.local"\nusername = "user"\n'
+        'password = "password"\nis_cloud = false\n'
+    )
+
+    result: Result = default_run_cmd(
+        config=default_config_name, other_args=["--import", "docs"]
+    )
+    assert result.exit_code == 0, result.stdout
+    assert "Added 2 pages" in result.stdout
+    validate_config()
+
+    from confluence_poster.poster_config import Config
+
+    assert [
+        (_.page_title, _.page_file, _.parent_page_title, _.page_space)
+        for _ in Config(config).pages
+    ] == [
+        ("Docs", str(Path("docs") / "index.md"), None, "DOC"),
+        ("Setup", str(Path("docs") / "guides" / "setup.md"), "Docs", "DOC"),
+    ]
+
+    config_text = config.read_text()
+    result = default_run_cmd(
+        config=default_config_name, other_args=["--import", "docs"]
+    )
+    assert result.exit_code == 0, result.stdout
+    assert "Added 0 pages" in result.stdout
+    assert config.read_text() == config_text
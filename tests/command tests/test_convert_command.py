@@ -1,3 +1,4 @@
+import json
 import pytest
 from typer.testing import CliRunner
 from confluence_poster.main import app
@@ -51,7 +52,18 @@ def test_convert_online(make_one_page_config):
 
 
 def test_convert_multiple_pages(make_two_page_config):
+    """Several pages are printed as JSON lines"""
     config_file, config = make_two_page_config
+    for number, page in enumerate(config.pages):
+        Path(page.page_file).write_text(f"# Title {number}")
     result = run_with_config(config_file=config_file)
 
-    assert result.exit_code == 1
+    assert result.exit_code == 0
+    assert [json.loads(_) for _ in result.stdout.splitlines()] == [
+        {
+            "page_title": page.page_title,
+            "page_file": page.page_file,
+            "text": f"<h1>Title {number}</h1>",
+        }
+        for number, page in enumerate(config.pages)
+    ]
@@ -0,0 +1,109 @@
+import json
+import pytest
+from typer.testing import CliRunner
+
+from confluence_poster.main import app
+from confluence_poster.conversion_helpers import min_pages_for_process_pool
+from mock_confluence import MockConfluence, make_config
+
+pytestmark = pytest.mark.offline
+
+runner = CliRunner()
+# Keeps the messages convert-markdown prints to stderr out of the converted text
+convert_runner = CliRunner(mix_stderr=False)
+
+
+@pytest.mark.parametrize(
+    "conversion_cache",
+    [True, False],
+    ids=["Converted text is cached", "Conversion cache is disabled"],
+)
+def test_convert_markdown_cached(tmp_path, conversion_cache):
+    with MockConfluence() as server:
+        config_file = make_config(tmp_path, server, page_count=1)
+        args = ["--config", str(config_file)]
+        if not conversion_cache:
+            args.append("--no-conversion-cache")
+        for _ in range(2):
+            result = runner.invoke(
+                app, [*args, "convert-markdown", "--use-confluence-converter"]
+            )
+            assert result.exit_code == 0, result.stdout
+            assert "<h1>Page 0</h1>" in result.stdout
+    assert server.requests[("POST", "convert")] == (1 if conversion_cache else 2)
+
+
+@pytest.mark.parametrize(
+    "use_confluence_converter",
+    [False, True],
+    ids=["Markdown library", "Confluence converter"],
+)
+def test_convert_markdown_batch(tmp_path, use_confluence_converter):
+    page_count = min_pages_for_process_pool + 2
+    converter_args = ["--use-confluence-converter"] if use_confluence_converter else []
+    with MockConfluence() as server:
+        config_file = make_config(tmp_path, server, page_count=page_count)
+        result = convert_runner.invoke(
+            app, ["--config", str(config_file), "convert-markdown", *converter_args]
+        )
+        assert result.exit_code == 0, result.stdout
+        assert [json.loads(_)["text"] for _ in result.stdout.splitlines()] == [
+            f"<h1>Page {number}</h1>" for number in range(page_count)
+        ], "Pages are printed as JSON lines in the config order"
+
+        output_dir = tmp_path / "output"
+        result = convert_runner.invoke(
+            app,
+            [
+                "--config",
+                str(config_file),
+                "--no-conversion-cache",
+                "convert-markdown",
+                *converter_args,
+                "--output-dir",
+                str(output_dir),
+                str(tmp_path / "page_*.md"),
+            ],
+        )
+        assert result.exit_code == 0, result.stdout
+        assert result.stdout == ""
+        for number in range(page_count):
+            assert (
+                output_dir / f"page_{number}.html"
+            ).read_text() == f"<h1>Page {number}</h1>"
+    if use_confluence_converter:
+        assert server.requests[("POST", "convert")] == 2 * page_count
+
+
+def test_convert_markdown_no_files_match(tmp_path):
+    with MockConfluence() as server:
+        config_file = make_config(tmp_path, server)
+        result = runner.invoke(
+            app,
+            ["--config", str(config_file), "convert-markdown", str(tmp_path / "*.txt")],
+        )
+    assert result.exit_code == 1
+    assert "No files match" in result.stdout
+
+
+def test_convert_markdown_page_file_jsonl(tmp_path):
+    (page_file := tmp_path / "other.md").write_text("# Other page")
+    with MockConfluence() as server:
+        config_file = make_config(tmp_path, server, page_count=1)
+        result = convert_runner.invoke(
+            app,
+            [
+                "--config",
+                str(config_file),
+                "--page-file",
+                str(page_file),
+                "convert-markdown",
+                "--jsonl",
+            ],
+        )
+    assert result.exit_code == 0, result.stderr
+    assert json.loads(result.stdout) == {
+        "page_title": "Page 0",
+        "page_file": str(page_file),
+        "text": "<h1>Other page</h1>",
+    }
@@ -0,0 +1,264 @@
+import json
+import toml
+import pytest
+from typer.testing import CliRunner
+
+from confluence_poster.main import app
+from confluence_poster.conversion_helpers import min_pages_for_process_pool
+from mock_confluence import MockConfluence, make_config
+
+pytestmark = pytest.mark.offline
+
+runner = CliRunner()
+
+
+@pytest.mark.parametrize(
+    "throttle_every",
+    [None, 4],
+    ids=["Pages are posted", "Pages are posted despite throttling"],
+)
+def test_post_page_against_mock(tmp_path, throttle_every):
+    with MockConfluence(throttle_every=throttle_every) as server:
+        config_file = make_config(tmp_path, server)
+        args = ["--config", str(config_file), "--force-create", "--report"]
+        create_result = runner.invoke(
+            app, [*args, "post-page", "--create-in-space-root"]
+        )
+        assert create_result.exit_code == 0, create_result.stdout
+        assert server.requests[("POST", "create")] == 2
+
+        update_result = runner.invoke(app, [*args, "post-page"])
+        assert update_result.exit_code == 0, update_result.stdout
+        assert server.requests[("PUT", "update")] == 2
+        assert {page["version"]["number"] for page in server.pages.values()} == {2}
+        if throttle_every:
+            assert "Retried requests" in create_result.stdout + update_result.stdout
+
+
+def test_post_page_converted_in_process_pool(tmp_path):
+    page_count = min_pages_for_process_pool + 2
+    with MockConfluence() as server:
+        config_file = make_config(tmp_path, server, page_count=page_count)
+        result = runner.invoke(
+            app,
+            [
+                "--config",
+                str(config_file),
+                "--force-create",
+                "post-page",
+                "--create-in-space-root",
+            ],
+        )
+    assert result.exit_code == 0, result.stdout
+    assert {
+        server.find_page("LOC", f"Page {number}")["body"]["storage"]["value"]
+        for number in range(page_count)
+    } == {f"<h1>Page {number}</h1>" for number in range(page_count)}
+
+
+def test_post_page_created_pages_read_once(tmp_path, monkeypatch):
+    """The text of the pages that were not found is kept from the update pass until they are created"""
+    from confluence_poster import poster_config
+
+    read_files = []
+    read_page_file = poster_config.read_page_file
+    monkeypatch.setattr(
+        poster_config,
+        "read_page_file",
+        lambda path, *args: read_files.append(path.name) or read_page_file(path, *args),
+    )
+    with MockConfluence() as server:
+        config_file = make_config(tmp_path, server)
+        result = runner.invoke(
+            app,
+            [
+                "--config",
+                str(config_file),
+                "--force-create",
+                "post-page",
+                "--create-in-space-root",
+            ],
+        )
+    assert result.exit_code == 0, result.stdout
+    assert server.requests[("POST", "create")] == 2
+    assert sorted(read_files) == ["page_0.md", "page_1.md"]
+
+
+def test_profile_against_mock(tmp_path):
+    profile_file = tmp_path / "profile.json"
+    with MockConfluence() as server:
+        config_file = make_config(tmp_path, server)
+        result = runner.invoke(
+            app,
+            [
+                "--config",
+                str(config_file),
+                "--force-create",
+                "--profile",
+                "--profile-dump",
+                str(profile_file),
+                "post-page",
+                "--create-in-space-root",
+            ],
+        )
+    assert result.exit_code == 0, result.stdout
+    assert "Profile:\n" in result.stdout
+    assert "Page 'Page 0':" in result.stdout
+    events = json.loads(profile_file.read_text())["traceEvents"]
+    assert {"load_config", "convert", "resolve", "lookup", "create"} <= {
+        event["name"] for event in events
+    }
+
+
+def test_children_created_after_parents(tmp_path):
+    """The pages are created under the configured parents, whatever the order of the pages in the config"""
+    with MockConfluence() as server:
+        existing_page = server.add_page("LOC", "Existing page")
+        config_file = make_config(tmp_path, server, page_count=4)
+        config = toml.loads(config_file.read_text())
+        # Page 0 <- Page 1 <- Page 2, Page 3 is under the page that exists already
+        for number, parent in [
+            (0, "Page 1"),
+            (1, "Page 2"),
+            (2, "Existing page"),
+            (3, "Existing page"),
+        ]:
+            config["pages"][f"page{number}"]["page_parent_title"] = parent
+        config_file.write_text(toml.dumps(config))
+
+        result = runner.invoke(
+            app,
+            ["--config", str(config_file), "--force-create", "post-page", "-j", "4"],
+        )
+        assert result.exit_code == 0, result.stdout
+
+        def parent_id(title):
+            (ancestor,) = server.find_page("LOC", title)["ancestors"]
+            return ancestor["id"]
+
+        assert parent_id("Page 3") == existing_page["id"]
+        assert parent_id("Page 2") == existing_page["id"]
+        assert parent_id("Page 1") == server.find_page("LOC", "Page 2")["id"]
+        assert parent_id("Page 0") == server.find_page("LOC", "Page 1")["id"]
+        assert (
+            server.requests[("GET", "get_by_title")] == 4
+        ), "Only the posted pages are looked up, the parents are not"
+
+
+def test_page_tree_against_mock(tmp_path):
+    """The pages of a [pages.tree] are created under the index pages of their directories"""
+    for name, text in {
+        "index.md": "# Handbook",
+        "guides/index.md": "---\ntitle: Guides\n---\n# Guides heading",
+        "guides/setup.md": "# Setup",
+    }.items():
+        (path := tmp_path / "handbook" / name).parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+    with MockConfluence() as server:
+        server.add_page("LOC", "Docs")
+        config_file = make_config(tmp_path, server, page_count=0)
+        config = toml.loads(config_file.read_text())
+        config["pages"]["tree"] = {
+            "root": str(tmp_path / "handbook"),
+            "page_space": "LOC",
+            "page_parent_title": "Docs",
+        }
+        config_file.write_text(toml.dumps(config))
+
+        result = runner.invoke(
+            app, ["--config", str(config_file), "--force-create", "post-page"]
+        )
+        assert result.exit_code == 0, result.stdout
+
+        def parent_title(title):
+            (ancestor,) = server.find_page("LOC", title)["ancestors"]
+            return server.pages[ancestor["id"]]["title"]
+
+        assert parent_title("Handbook") == "Docs"
+        assert parent_title("Guides") == "Handbook"
+        assert parent_title("Setup") == "Guides"
+        assert (
+            server.find_page("LOC", "Guides")["body"]["storage"]["value"]
+            == "<h1>Guides heading</h1>"
+        ), "Front matter is not posted"
+
+
+def _post_pages(config_file, *args):
+    return runner.invoke(
+        app, ["--config", str(config_file), "--report", "post-page", *args]
+    )
+
+
+def test_update_looks_page_up_once(tmp_path):
+    """The ID, the version and the last author of the page come with a single request"""
+    with MockConfluence() as server:
+        config_file = make_config(tmp_path, server, page_count=1)
+        server.add_page("LOC", "Page 0")
+        result = _post_pages(config_file)
+    assert result.exit_code == 0, result.stdout
+    assert server.requests[("GET", "get_by_title")] == 1
+    assert server.requests[("GET", "get_by_id")] == 0
+    assert server.requests[("PUT", "update")] == 1
+    assert server.find_page("LOC", "Page 0")["version"]["number"] == 2
+
+
+def _bump_version_once(server, title):
+    """Updates the page as someone else would right before the first update request of the run"""
+    bumped = []
+
+    def _hook(_):
+        if not bumped:
+            bumped.append(True)
+            server.find_page("LOC", title)["version"]["number"] += 1
+
+    return _hook
+
+
+def test_update_version_conflict(tmp_path):
+    with MockConfluence() as server:
+        config_file = make_config(tmp_path, server, page_count=1)
+        server.add_page("LOC", "Page 0", "<p>Text</p>")
+        server.hooks["update"] = _bump_version_once(server, "Page 0")
+        result = _post_pages(config_file)
+    assert result.exit_code == 0, result.stdout
+    assert "was updated by someone else while it was being posted" in result.stdout
+    assert (
+        "LOC::Page 0 Reason: Updated by someone else during the run." in result.stdout
+    )
+    assert server.requests[("PUT", "update")] == 1
+    assert server.find_page("LOC", "Page 0")["body"]["storage"]["value"] == (
+        "<p>Text</p>"
+    )
+
+
+def test_update_version_conflict_after_search(tmp_path):
+    """Search results may be outdated, the page is looked up again after the conflict"""
+    with MockConfluence() as server:
+        config_file = make_config(tmp_path, server)
+        for number in range(2):
+            server.add_page("LOC", f"Page {number}")
+        server.hooks["update"] = _bump_version_once(server, "Page 0")
+        result = _post_pages(config_file)
+    assert result.exit_code == 0, result.stdout
+    assert server.requests[("GET", "search")] == 1
+    assert server.requests[("GET", "get_by_title")] == 1
+    assert server.requests[("PUT", "update")] == 3
+    assert server.find_page("LOC", "Page 0")["version"]["number"] == 3
+    assert server.find_page("LOC", "Page 0")["body"]["storage"]["value"] == (
+        "<h1>Page 0</h1>"
+    )
+
+
+def test_search_fails(tmp_path):
+    """If the pages cannot be searched for, they are looked up one by one"""
+    with MockConfluence() as server:
+        config_file = make_config(tmp_path, server)
+        for number in range(2):
+            server.add_page("LOC", f"Page {number}")
+        server.hooks["search"] = lambda _: (400, {"message": "Could not parse cql"})
+        result = _post_pages(config_file)
+    assert result.exit_code == 0, result.stdout
+    assert "they will be looked up one by one" in result.stdout
+    assert server.requests[("GET", "search")] == 1
+    assert server.requests[("GET", "get_by_title")] == 2
+    assert server.requests[("PUT", "update")] == 2
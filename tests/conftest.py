@@ -14,6 +14,14 @@ from confluence_poster.poster_config import Config
 from typing import Tuple, List
 
 
+@pytest.fixture(scope="session", autouse=True)
+def isolated_cache_home(tmp_path_factory):
+    """Keeps the caches the tool writes (config cache, page index) out of the cache of the user running the tests"""
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path_factory.mktemp("cache")))
+        yield
+
+
 @pytest.fixture(scope="session", autouse=True)
 def record_pages():
     """Cleans up created pages. The created_pages set is manipulated through inspect module when the runner command
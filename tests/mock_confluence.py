@@ -0,0 +1,440 @@
+import gzip
+import json
+import re
+import time
+from base64 import b64decode
+from collections import Counter
+from email import message_from_bytes
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from itertools import count
+from threading import Thread, Lock
+from typing import Union, Dict, List, Tuple, Callable
+from urllib.parse import urlsplit, parse_qs
+
+import toml
+from markdown import markdown
+
+"""Local stand-in for the Confluence REST API. Implements only the endpoints confluence_poster uses, keeping the pages
+in memory. Allows running the benchmarks and the tests that count the requests without a Confluence instance."""
+
+
+class MockConfluence:
+    """Runs the server in a background thread. Use as a context manager:
+
+    with MockConfluence(latency=0.01) as server:
+        config = {"auth": {"confluence_url": server.url, ...}, ...}
+
+    :param latency: seconds the server waits before answering every request
+    :param throttle_every: if set - every n-th request is answered with 429
+    :param retry_after: value of Retry-After header of the throttled responses, in seconds
+    :param search_limit: maximum amount of search results per request, as on the real server
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        throttle_every: Union[int, None] = None,
+        retry_after: Union[float, None] = 0,
+        search_limit: int = 1000,
+    ):
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.search_limit = search_limit
+        self.pages: Dict[str, dict] = {}
+        self.attachments: Dict[str, List[dict]] = {}
+        # Amount of requests by (method, endpoint name)
+        self.requests = Counter()
+        # Called by endpoint name with the request handler before the request is handled, e.g. to change a page between
+        # its lookup and update or to delay the response. Runs outside of the lock, as the latency does. If the hook
+        # returns the status and the data, they are sent instead of the response of the endpoint
+        self.hooks: Dict[
+            str, Callable[["_Handler"], Union[Tuple[int, dict], None]]
+        ] = {}
+        self._ids = count(1)
+        self._request_number = count(1)
+        # The storage is changed by one request at a time, latency is simulated outside of the lock
+        self.lock = Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.mock = self
+        self._thread = Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def add_page(
+        self,
+        space: str,
+        title: str,
+        body: str = "",
+        author: str = "confluence_username",
+        parent_id: Union[str, None] = None,
+    ) -> dict:
+        """Creates the page directly in the storage, e.g. to prepare a parent page"""
+        with self.lock:
+            return self._store_page(space, title, body, author, parent_id)
+
+    def _store_page(
+        self,
+        space: str,
+        title: str,
+        body: str,
+        author: str,
+        parent_id: Union[str, None],
+    ) -> dict:
+        page_id = str(next(self._ids))
+        page = {
+            "id": page_id,
+            "type": "page",
+            "status": "current",
+            "title": title,
+            "space": {"key": space},
+            "version": {"number": 1, "by": _user(author)},
+            "body": {"storage": {"value": body, "representation": "storage"}},
+            "ancestors": [] if parent_id is None else [{"id": parent_id}],
+            "properties": {},
+            "_links": {"webui": f"/pages/viewpage.action?pageId={page_id}"},
+        }
+        self.pages[page_id] = page
+        self.attachments[page_id] = []
+        return page
+
+    def find_page(self, space: str, title: str) -> Union[dict, None]:
+        return next(
+            (
+                page
+                for page in self.pages.values()
+                if page["space"]["key"] == space and page["title"] == title
+            ),
+            None,
+        )
+
+
+def make_config(
+    tmp_path: Path,
+    server: MockConfluence,
+    page_count: int = 2,
+    space: str = "LOC",
+    parent_title: Union[str, None] = None,
+    make_text: Callable[[int], str] = lambda number: f"# Page {number}",
+) -> Path:
+    """Writes the config of the pages "Page 0", "Page 1"... in the space, posted from the files "# Page N" to
+    the server
+
+    :param parent_title: parent of the pages, they are created in the root of the space if it is not set
+    :param make_text: returns the text of the page file by the page number
+    """
+    pages = {}
+    for number in range(page_count):
+        page_file = tmp_path / f"page_{number}.md"
+        page_file.write_text(make_text(number))
+        pages[f"page{number}"] = {
+            "page_title": f"Page {number}",
+            "page_file": str(page_file),
+            "page_space": space,
+        }
+        if parent_title is not None:
+            pages[f"page{number}"]["page_parent_title"] = parent_title
+    config_file = tmp_path / "config.toml"
+    config_file.write_text(
+        toml.dumps(
+            {
+                "pages": pages,
+                "auth": {
+                    "confluence_url": server.url,
+                    "username": "confluence_username",
+                    "password": "password",
+                    "is_cloud": False,
+                },
+                "http": {"backoff_factor": 0.0},
+            }
+        )
+    )
+    return config_file
+
+
+def _user(username: str) -> dict:
+    return {"type": "known", "username": username, "email": username}
+
+
+def _page_view(page: dict, expand: str) -> dict:
+    """Returns the page as the API does, with the properties only if they were expanded"""
+    view = {key: value for key, value in page.items() if key != "properties"}
+    if "metadata.properties" in expand:
+        view["metadata"] = {"properties": {}}
+        for key, page_property in page["properties"].items():
+            if f"metadata.properties.{key}" in expand:
+                view["metadata"]["properties"][key] = page_property
+    return view
+
+
+def _cql_strings(cql: str) -> List[str]:
+    return [
+        value.replace('\\"', '"').replace("\\\\", "\\")
+        for value in re.findall(r'"((?:[^"\\]|\\.)*)"', cql)
+    ]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep-alive, as the real server does
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, without this every response is delayed by the delayed ACK
+    disable_nagle_algorithm = True
+
+    routes = [
+        ("GET", r"/rest/api/content/search", "search"),
+        ("GET", r"/rest/api/content/?", "get_by_title"),
+        ("POST", r"/rest/api/content/?", "create"),
+        ("GET", r"/rest/api/content/(\d+)", "get_by_id"),
+        ("PUT", r"/rest/api/content/(\d+)", "update"),
+        ("POST", r"/rest/api/content/(\d+)/property", "create_property"),
+        ("PUT", r"/rest/api/content/(\d+)/property/([^/]+)", "update_property"),
+        ("GET", r"/rest/api/content/(\d+)/child/attachment", "get_attachments"),
+        ("POST", r"/rest/api/content/(\d+)/child/attachment", "create_attachment"),
+        (
+            "POST",
+            r"/rest/api/content/(\d+)/child/attachment/(\d+)/data",
+            "update_attachment",
+        ),
+        ("POST", r"/rest/tinymce/1/markdownxhtmlconverter", "convert"),
+    ]
+
+    @property
+    def mock(self) -> MockConfluence:
+        return self.server.mock
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def _dispatch(self, method: str):
+        url = urlsplit(self.path)
+        self.query = {key: value[0] for key, value in parse_qs(url.query).items()}
+        length = int(self.headers.get("Content-Length", 0))
+        self.body = self.rfile.read(length) if length else b""
+        if self.headers.get("Content-Encoding") == "gzip":
+            self.body = gzip.decompress(self.body)
+
+        if self.mock.latency:
+            time.sleep(self.mock.latency)
+        if (
+            self.mock.throttle_every
+            and next(self.mock._request_number) % self.mock.throttle_every == 0
+        ):
+            headers = {}
+            if self.mock.retry_after is not None:
+                headers["Retry-After"] = str(self.mock.retry_after)
+            return self._send(429, {"message": "Rate limit exceeded"}, headers)
+
+        for route_method, pattern, name in self.routes:
+            if route_method == method and (match := re.fullmatch(pattern, url.path)):
+                with self.mock.lock:
+                    self.mock.requests[(method, name)] += 1
+                if (hook := self.mock.hooks.get(name)) is None or (
+                    response := hook(self)
+                ) is None:
+                    with self.mock.lock:
+                        response = getattr(self, f"_{name}")(*match.groups())
+                return self._send(*response)
+        self._send(404, {"message": f"No mock for {method} {url.path}"})
+
+    def _send(self, status: int, data: Union[dict, str], headers: dict = None):
+        if isinstance(data, str):
+            payload = data.encode()
+            content_type = "text/plain"
+        else:
+            payload = json.dumps(data).encode()
+            content_type = "application/json"
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _json(self) -> dict:
+        return json.loads(self.body)
+
+    @property
+    def username(self) -> str:
+        authorization = self.headers.get("Authorization", "")
+        if authorization.startswith("Basic "):
+            return b64decode(authorization[6:]).decode().split(":")[0]
+        return "anonymous"
+
+    @staticmethod
+    def _not_found() -> Tuple[int, dict]:
+        return 404, {"message": "No content found"}
+
+    def _search(self):
+        cql = self.query.get("cql", "")
+        space, *titles = _cql_strings(cql)
+        start = int(self.query.get("start", 0))
+        limit = min(int(self.query.get("limit", 25)), self.mock.search_limit)
+        found = [
+            page
+            for page in self.mock.pages.values()
+            if page["space"]["key"] == space and page["title"] in titles
+        ]
+        results = [
+            _page_view(page, self.query.get("expand", ""))
+            for page in found[start : start + limit]
+        ]
+        links = {"next": "next"} if start + limit < len(found) else {}
+        return 200, {"results": results, "size": len(results), "_links": links}
+
+    def _get_by_title(self):
+        page = self.mock.find_page(self.query.get("spaceKey"), self.query.get("title"))
+        results = (
+            [] if page is None else [_page_view(page, self.query.get("expand", ""))]
+        )
+        return 200, {"results": results, "size": len(results)}
+
+    def _get_by_id(self, page_id: str):
+        if (page := self.mock.pages.get(page_id)) is None:
+            return self._not_found()
+        return 200, _page_view(page, self.query.get("expand", ""))
+
+    def _create(self):
+        data = self._json()
+        space, title = data["space"]["key"], data["title"]
+        if self.mock.find_page(space, title) is not None:
+            return 400, {"message": "A page with this title already exists"}
+        (representation,) = data["body"]
+        ancestors = data.get("ancestors") or [{}]
+        if (parent_id := ancestors[0].get("id")) is not None:
+            if str(parent_id) not in self.mock.pages:
+                return self._not_found()
+            parent_id = str(parent_id)
+        page = self.mock._store_page(
+            space,
+            title,
+            body=data["body"][representation]["value"],
+            author=self.username,
+            parent_id=parent_id,
+        )
+        return 200, _page_view(page, "")
+
+    def _update(self, page_id: str):
+        if (page := self.mock.pages.get(page_id)) is None:
+            return self._not_found()
+        data = self._json()
+        if data["version"]["number"] != page["version"]["number"] + 1:
+            return 409, {"message": "Version must be incremented"}
+        (representation,) = data["body"]
+        page["title"] = data["title"]
+        page["version"] = {
+            "number": data["version"]["number"],
+            "by": _user(self.username),
+            "message": data["version"].get("message", ""),
+        }
+        page["body"] = {
+            "storage": {
+                "value": data["body"][representation]["value"],
+                "representation": "storage",
+            }
+        }
+        return 200, _page_view(page, "")
+
+    def _create_property(self, page_id: str):
+        if (page := self.mock.pages.get(page_id)) is None:
+            return self._not_found()
+        data = self._json()
+        if data["key"] in page["properties"]:
+            return 409, {"message": "Property already exists"}
+        page["properties"][data["key"]] = {
+            "key": data["key"],
+            "value": data["value"],
+            "version": {"number": 1},
+        }
+        return 200, page["properties"][data["key"]]
+
+    def _update_property(self, page_id: str, key: str):
+        if (page := self.mock.pages.get(page_id)) is None or (
+            page_property := page["properties"].get(key)
+        ) is None:
+            return self._not_found()
+        data = self._json()
+        if data["version"]["number"] != page_property["version"]["number"] + 1:
+            return 409, {"message": "Version must be incremented"}
+        page_property.update(value=data["value"], version=data["version"])
+        return 200, page_property
+
+    def _get_attachments(self, page_id: str):
+        if page_id not in self.mock.pages:
+            return self._not_found()
+        attachments = self.mock.attachments[page_id]
+        if (filename := self.query.get("filename")) is not None:
+            attachments = [_ for _ in attachments if _["title"] == filename]
+        return 200, {"results": attachments, "size": len(attachments)}
+
+    def _read_upload(self) -> dict:
+        """Parses the multipart body of the attachment upload"""
+        message = message_from_bytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + self.body
+        )
+        upload = {}
+        for part in message.get_payload():
+            name = part.get_param("name", header="content-disposition")
+            if name == "file":
+                upload["title"] = part.get_filename()
+                upload["size"] = len(part.get_payload(decode=True))
+            else:
+                upload[name] = part.get_payload(decode=True).decode()
+        return upload
+
+    def _create_attachment(self, page_id: str):
+        if page_id not in self.mock.pages:
+            return self._not_found()
+        upload = self._read_upload()
+        attachment = {
+            "id": str(next(self.mock._ids)),
+            "type": "attachment",
+            "title": upload["title"],
+            "version": {"number": 1},
+            "extensions": {"fileSize": upload["size"]},
+            "metadata": {"comment": upload.get("comment", "")},
+        }
+        self.mock.attachments[page_id].append(attachment)
+        return 200, {"results": [attachment], "size": 1}
+
+    def _update_attachment(self, page_id: str, attachment_id: str):
+        attachment = next(
+            (
+                _
+                for _ in self.mock.attachments.get(page_id, [])
+                if _["id"] == attachment_id
+            ),
+            None,
+        )
+        if attachment is None:
+            return self._not_found()
+        upload = self._read_upload()
+        attachment["version"] = {"number": attachment["version"]["number"] + 1}
+        attachment["extensions"] = {"fileSize": upload["size"]}
+        attachment["metadata"] = {"comment": upload.get("comment", "")}
+        return 200, attachment
+
+    def _convert(self):
+        return 200, markdown(self._json()["wiki"])
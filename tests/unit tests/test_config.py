@@ -1,12 +1,20 @@
-from confluence_poster.poster_config import Config, Page, PartialConfig
+from confluence_poster.poster_config import Config, Page, PartialConfig, Http
 from dataclasses import fields
 from utils import mk_tmp_file
 import toml
 import pytest
+from collections import Counter
 
 pytestmark = pytest.mark.offline
 
 
+def _config_data(pages: dict) -> dict:
+    return {
+        "pages": pages,
+        "auth": {"confluence_url": "", "username": "user", "is_cloud": False},
+    }
+
+
 def test_repo_sample_config():
     """General wellness test. The default config from repo should always work."""
     _ = Config("config.toml")
@@ -182,6 +190,52 @@ def test_two_pages_same_name_same_space(tmp_path):
     assert "more than 1 page called" in e.value.args[0]
 
 
+def test_all_duplicate_pages_reported():
+    pages = {
+        f"page{number}": {"page_title": title, "page_file": "", "page_space": "LOC"}
+        for number, title in enumerate(["First", "First", "Second", "Second", "Third"])
+    }
+    with pytest.raises(ValueError) as e:
+        _ = Config(data=_config_data(pages))
+    assert e.value.args[0] == (
+        "There are more than 1 page called 'First' in space LOC\n"
+        "There are more than 1 page called 'Second' in space LOC"
+    )
+
+
+def test_pages_validation_scales_linearly(monkeypatch):
+    """Loads configs of growing size and checks that the titles are read the same amount of times per page, whatever
+    the amount of pages"""
+    title_reads = Counter()
+
+    class CountedPage(Page):
+        def __getattribute__(self, name):
+            if name == "page_title":
+                title_reads[self] += 1
+            return super(CountedPage, self).__getattribute__(name)
+
+        __hash__ = object.__hash__
+
+    monkeypatch.setattr("confluence_poster.poster_config.Page", CountedPage)
+
+    def title_reads_per_page(page_count: int) -> set:
+        pages = {
+            f"page{number}": {
+                "page_title": f"Page {number}",
+                "page_file": "",
+                "page_space": "LOC",
+            }
+            for number in range(page_count)
+        }
+        title_reads.clear()
+        Config(data=_config_data(pages))
+        assert len(title_reads) == page_count
+        return set(title_reads.values())
+
+    # Sorting the pages once per page, as the duplicate check used to, reads the titles more often with more pages
+    assert title_reads_per_page(10) == title_reads_per_page(1000)
+
+
 def test_two_pages_same_name_different_space(tmp_path):
     """Tests that the config does not alert if there are more than 1 page with the same name and space"""
     config_file = mk_tmp_file(tmp_path)
@@ -249,3 +303,44 @@ def test_broken_partial_config(file, data):
     """Checks that partial config complains about source for its data"""
     with pytest.raises(ValueError):
         _ = PartialConfig(file=file, data=data)
+
+
+def test_http_section_default(tmp_path):
+    """Checks that http section is optional"""
+    config_file = mk_tmp_file(tmp_path, key_to_pop="http")
+    _ = Config(config_file)
+    assert _.http == Http()
+
+
+@pytest.mark.parametrize(
+    "key,value,exception",
+    (
+        ("pool_size", "10", ValueError),
+        ("pool_size", 0, ValueError),
+        ("keep_alive", 1, ValueError),
+        ("max_retries", -1, ValueError),
+        ("backoff_factor", "1", ValueError),
+        ("unknown_key", 1, KeyError),
+    ),
+    ids=(
+        "pool_size is not an int",
+        "pool_size is not positive",
+        "keep_alive is not a bool",
+        "max_retries is negative",
+        "backoff_factor is not a number",
+        "http section contains unknown key",
+    ),
+)
+def test_http_section_bad_value(tmp_path, key, value, exception):
+    config_file = mk_tmp_file(
+        tmp_path, key_to_update=f"http.{key}", value_to_update=value
+    )
+    with pytest.raises(exception):
+        _ = Config(config_file)
+
+
+def test_http_section_float_accepts_int(tmp_path):
+    config_file = mk_tmp_file(
+        tmp_path, key_to_update="http.requests_per_second", value_to_update=5
+    )
+    assert Config(config_file).http.requests_per_second == 5.0
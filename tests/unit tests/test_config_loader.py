@@ -1,3 +1,4 @@
+import json
 import toml
 from utils import mk_tmp_file, repo_config_path
 from pathlib import Path
@@ -138,3 +139,53 @@ def test_multiple_xdg_config_dirs(tmp_path, setup_xdg_dirs, monkeypatch):
         tmp_path=tmp_path, key_to_update="auth.username", value_to_update="user1"
     )
     assert Config(config_file) == _
+
+
+@pytest.fixture(scope="function")
+def cache_home(tmp_path, monkeypatch):
+    cache_home = tmp_path / "cache_home"
+    monkeypatch.setenv("XDG_CACHE_HOME", str(cache_home))
+    return cache_home
+
+
+def test_config_cache(tmp_path, setup_xdg_dirs, monkeypatch, cache_home):
+    """Checks that the config is cached and rebuilt when one of its files changes or appears"""
+    my_xdg_config_dirs, my_xdg_config_home = setup_xdg_dirs
+    monkeypatch.setenv("XDG_CONFIG_HOME", my_xdg_config_home)
+    monkeypatch.setenv("XDG_CONFIG_DIRS", my_xdg_config_dirs)
+    config_file = Path(mk_tmp_file(tmp_path=tmp_path, key_to_pop="author"))
+
+    _ = load_config(local_config=config_file)
+    (cache_file,) = (cache_home / "confluence_poster" / "config_cache").iterdir()
+    cached_config = json.loads(cache_file.read_text())["config"]
+    assert "password" not in cached_config["auth"], "Password is not cached"
+
+    # Cached config is returned as a separate object, so that changes to it do not leak into the cache
+    cached = load_config(local_config=config_file)
+    assert cached == _ and cached is not _
+    assert cached.auth == _.auth, "Password is read from the config file"
+
+    # Config in XDG_CONFIG_HOME appears
+    home_config = Path(my_xdg_config_home) / "confluence_poster" / "config.toml"
+    home_config.write_text(toml.dumps({"author": "home_author"}))
+    assert load_config(local_config=config_file).author == "home_author"
+
+    # Local config changes
+    config = toml.load(config_file)
+    config["author"] = "local_author"
+    config_file.write_text(toml.dumps(config))
+    assert load_config(local_config=config_file).author == "local_author"
+
+
+def test_config_cache_disabled(tmp_path, cache_home):
+    config_file = mk_tmp_file(tmp_path=tmp_path)
+    load_config(local_config=config_file, use_cache=False)
+    assert not (cache_home / "confluence_poster" / "config_cache").exists()
+
+
+def test_config_cache_corrupted(tmp_path, cache_home):
+    config_file = mk_tmp_file(tmp_path=tmp_path)
+    expected = load_config(local_config=config_file)
+    (cache_file,) = (cache_home / "confluence_poster" / "config_cache").iterdir()
+    cache_file.write_text("not json")
+    assert load_config(local_config=config_file) == expected
@@ -1,9 +1,11 @@
 from confluence_poster.config_wizard import config_dialog, DialogParameter
 from pathlib import Path
 from typer.testing import CliRunner
-from tomlkit import parse
+from tomlkit import parse, dumps
 import pytest
 from itertools import product
+from functools import partial
+from collections import Counter
 from utils import setup_input
 
 # noinspection PyProtectedMember
@@ -240,3 +242,47 @@ def test_sensitive_parameter_file_mode(tmp_path, monkeypatch, capsys):
     captured = capsys.readouterr()
     assert "sensitive parameter was passed" in captured.out
     assert config_path.stat().st_mode == 33152
+
+
+def test_dialog_large_config(tmp_path, monkeypatch):
+    """The wizard edits a single document in place: the config is parsed and serialized the same amount of times,
+    whatever the amount of attributes"""
+    page_count, attribute_count = 1_000, 100
+    config = tmp_path / "config.toml"
+    config.write_text(
+        '[auth]\npassword = "secret"\n[pages]\n'
+        + "".join(
+            f'[pages.page{number}]\npage_title = "Page {number}"\npage_file = "page_{number}.md"\n'
+            for number in range(1, page_count + 1)
+        )
+    )
+    attributes = [f"pages.page{number}.page_space" for number in range(attribute_count)]
+    setup_input(monkeypatch, [*(["SPC"] * attribute_count), "Y"])
+    calls = Counter()
+    for function in [parse, dumps]:
+        monkeypatch.setattr(
+            f"confluence_poster.config_wizard.{function.__name__}",
+            lambda *args, _function=function: calls.update([_function.__name__])
+            or _function(*args),
+        )
+
+    assert config_dialog(
+        config,
+        attributes=attributes,
+        incremental=True,
+        config_print_function=partial(
+            print_config_with_hidden_attrs, hidden_attributes=["auth.password"]
+        ),
+    )
+    # Reparsing the config for every attribute took about half a second per attribute
+    assert calls == {
+        "parse": 1,
+        "dumps": 2,
+    }, "The config is parsed once, serialized to print and to save it"
+
+    saved_config = parse(config.read_text())
+    assert get_attribute_by_path("pages.page99.page_space", saved_config) == "SPC"
+    assert get_attribute_by_path("pages.page1000.page_title", saved_config) == (
+        "Page 1000"
+    )
+    assert get_attribute_by_path("auth.password", saved_config) == "secret"
@@ -101,12 +101,11 @@ def test_create_or_update_attribute(mode):
     elif where == "child":
         attribute_path = "parent.child." + attribute_path
 
-    updated_config = create_update_attr(
-        attribute=attribute_path, value=value, config=source_config
-    )
+    updated_config = parse(document)
     assert (
-        updated_config != source_config
-    ), "This function should not change the original content"
+        create_update_attr(attribute=attribute_path, value=value, config=updated_config)
+        is updated_config
+    ), "The config is updated in place"
     assert (
         get_attribute_by_path(attribute_path=attribute_path, config=updated_config)
         == value
@@ -247,3 +246,133 @@ def test_generate_next_page(tmp_path, pages_amount):
             f.write(f"[pages.page{page_no}]\npage_title = 'foz'\n")
 
     assert generate_next_page(config) == pages_amount + 1
+
+
+def test_import_pages(tmp_path):
+    import toml
+    from confluence_poster.config_wizard import import_pages
+
+    (page_file := tmp_path / "page.md").write_text("# Title from file")
+    config_text = (
+        '[pages.default]\npage_space = "DEF"\n'
+        '[pages.page1]\npage_title = "Existing"\npage_file = "existing.md"\n'
+        '[pages.page3]\npage_title = "Other"\npage_file = "other.md"\n'
+        '[auth]\nusername = "user"\n'
+    )
+    sections, added_count, skipped = import_pages(
+        parse(config_text),
+        [
+            {"page_file": str(page_file), "page_space": "SPC"},
+            {
+                "page_title": 'Page "1"',
+                "page_file": "page.wiki",
+                "page_parent_title": "",
+            },
+            {"page_title": "Existing", "page_file": "new.md"},
+            {"page_title": "New title", "page_file": "existing.md"},
+            {"page_title": "Duplicate", "page_file": "page.wiki"},
+            {"page_title": "Unknown format", "page_file": "page.docx"},
+            {
+                "page_title": "Bad format",
+                "page_file": "page.md",
+                "page_file_format": "x",
+            },
+            {"page_title": "No file"},
+        ],
+    )
+    assert added_count == 2
+    assert len(skipped) == 6
+
+    # The sections are appended after the other tables
+    for config in [parse(config_text + sections), toml.loads(config_text + sections)]:
+        assert dict(config["pages"]["page2"]) == {
+            "page_title": "Title from file",
+            "page_file": str(page_file),
+            "page_space": "SPC",
+            "page_file_format": "markdown",
+        }, "Free section numbers are used first"
+        assert dict(config["pages"]["page4"]) == {
+            "page_title": 'Page "1"',
+            "page_file": "page.wiki",
+            "page_file_format": "confluencewiki",
+        }
+        assert config["auth"]["username"] == "user"
+
+
+def test_import_pages_sources(tmp_path):
+    import csv
+    import json
+    from confluence_poster.config_wizard import read_imported_pages
+
+    pages = [
+        {"page_title": "First", "page_file": "first.md"},
+        {"page_title": "Second", "page_file": "second.md"},
+    ]
+    with open(csv_file := tmp_path / "pages.csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["page_title", "page_file"])
+        writer.writeheader()
+        writer.writerows(pages)
+    (jsonl_file := tmp_path / "pages.jsonl").write_text(
+        "\n".join(json.dumps(_) for _ in pages) + "\n\n"
+    )
+    assert list(read_imported_pages(csv_file)) == pages
+    assert list(read_imported_pages(jsonl_file)) == pages
+
+    (docs := tmp_path / "docs").mkdir()
+    (docs / "index.md").write_text("# Docs")
+    (docs / "page.wiki").write_text("h1. Wiki page")
+    (docs / "image.png").write_bytes(b"\x89PNG")
+    assert [
+        (_["page_title"], _["page_parent_title"]) for _ in read_imported_pages(docs)
+    ] == [
+        ("Docs", None),
+        ("Wiki page", "Docs"),
+    ], "Only the files with known formats are imported"
+
+    (jsonl_file := tmp_path / "bad.jsonl").write_text("[]\n")
+    with pytest.raises(ValueError):
+        list(read_imported_pages(jsonl_file))
+    with pytest.raises(ValueError):
+        read_imported_pages(tmp_path / "pages.txt")
+
+
+def test_import_many_pages(monkeypatch):
+    """Every imported page is checked against the index, not against all the pages of the config, and the sections
+    are not added to the document one by one: tomlkit scans the whole document for every added table"""
+    from collections import Counter
+    from tomlkit.container import Container
+    from confluence_poster.config_wizard import import_pages
+
+    calls = Counter()
+
+    def counted(name, method):
+        def _counted(self, *args):
+            calls[name] += 1
+            return method(self, *args)
+
+        return _counted
+
+    monkeypatch.setattr(Path, "resolve", counted("resolve", Path.resolve))
+    monkeypatch.setattr(Container, "append", counted("append", Container.append))
+
+    def calls_per_page(page_count: int) -> dict:
+        config = parse(
+            "".join(
+                f'[pages.page{_}]\npage_title = "Existing {_}"\npage_file = "existing_{_}.md"\n'
+                for _ in range(page_count)
+            )
+        )
+        calls.clear()
+        _, added_count, _ = import_pages(
+            config,
+            (
+                {"page_title": f"Page {_}", "page_file": f"page_{_}.md"}
+                for _ in range(page_count)
+            ),
+        )
+        assert added_count == page_count
+        return {name: count / page_count for name, count in calls.items()}
+
+    # The page file is resolved for the existing page, then to look the imported page up and to index it. No tables
+    # are appended to the document
+    assert calls_per_page(30) == calls_per_page(300) == {"resolve": 3}
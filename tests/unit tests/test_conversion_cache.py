@@ -0,0 +1,73 @@
+import pytest
+
+from confluence_poster.conversion_cache import ConversionCache, conversion_key
+from confluence_poster.convert_utils import markdown_converter_id
+
+pytestmark = pytest.mark.offline
+
+
+@pytest.fixture
+def cache(tmp_path):
+    with ConversionCache(tmp_path / "cache.sqlite3") as cache:
+        yield cache
+
+
+def test_conversion_key():
+    assert conversion_key("text", "converter") == conversion_key("text", "converter")
+    assert conversion_key("text", "converter") != conversion_key("text", "other")
+    assert conversion_key("text", "converter") != conversion_key("other", "converter")
+
+
+def test_markdown_converter_id():
+    assert "3.3.3" in markdown_converter_id()
+    assert "tables,fenced_code" in markdown_converter_id()
+
+
+def test_convert(cache):
+    conversions = []
+
+    def convert(text):
+        conversions.append(text)
+        return text.upper()
+
+    assert cache.convert("text", converter="upper", convert=convert) == "TEXT"
+    assert cache.convert("text", converter="upper", convert=convert) == "TEXT"
+    assert conversions == ["text"], "Cached conversion is reused"
+    assert cache.convert("text", converter="other", convert=convert) == "TEXT"
+    assert conversions == ["text", "text"], "Converters are cached separately"
+
+
+def test_cache_persists(tmp_path):
+    with ConversionCache(tmp_path / "cache.sqlite3") as cache:
+        cache.put("key", "value")
+    with ConversionCache(tmp_path / "cache.sqlite3") as cache:
+        assert cache.get("key") == "value"
+
+
+def test_least_recently_used_evicted(tmp_path):
+    with ConversionCache(tmp_path / "cache.sqlite3", max_size=10) as cache:
+        cache.put("first", "aaaa")
+        cache.put("second", "bbbb")
+        assert cache.get("first") == "aaaa"
+        cache.put("third", "cccc")
+        assert cache.get("second") is None
+        assert cache.get("first") == "aaaa"
+        assert cache.get("third") == "cccc"
+        cache.put("too big", "d" * 11)
+        assert cache.get("too big") is None
+        assert cache.get("third") == "cccc"
+
+
+def test_size_summed_only_to_evict(tmp_path, monkeypatch):
+    with ConversionCache(tmp_path / "cache.sqlite3", max_size=10) as cache:
+        sums = []
+        sum_size = cache._sum_size
+        monkeypatch.setattr(cache, "_sum_size", lambda: sums.append(1) or sum_size())
+        cache.put("first", "aaaa")
+        cache.put("first", "bbbb")
+        cache.put("second", "cccc")
+        assert len(sums) == 1, "The total is summed once, on first put"
+        cache.put("third", "dddd")
+        assert len(sums) == 2, "And before evicting"
+        assert cache.get("first") is None
+        assert cache._total_size == sum_size() == 8
@@ -0,0 +1,80 @@
+import pytest
+
+from confluence_poster import conversion_helpers
+from confluence_poster.conversion_cache import ConversionCache, conversion_key
+from confluence_poster.conversion_helpers import ConversionStage, markdown_pages
+from confluence_poster.convert_utils import markdown_converter_id
+from confluence_poster.poster_config import Page, AllowedFileFormat
+
+pytestmark = pytest.mark.offline
+
+
+def make_pages(tmp_path, page_count: int):
+    pages = []
+    for number in range(page_count):
+        page_file = tmp_path / f"page_{number}.md"
+        page_file.write_text(f"# Page {number}")
+        pages.append(
+            Page(
+                page_title=f"Page {number}",
+                page_file=str(page_file),
+                page_space="LOC",
+                page_file_format=AllowedFileFormat.markdown,
+            )
+        )
+    return pages
+
+
+def test_markdown_pages(tmp_path):
+    markdown_page, set_text_page, html_page, missing_file_page = make_pages(tmp_path, 4)
+    set_text_page.page_text = "# Text from stdin"
+    html_page.page_file_format = AllowedFileFormat.html
+    missing_file_page.page_file = str(tmp_path / "missing.md")
+    assert markdown_pages(
+        [markdown_page, set_text_page, html_page, missing_file_page]
+    ) == [markdown_page]
+
+
+def test_conversion_stage(tmp_path):
+    pages = make_pages(tmp_path, 6)
+    with ConversionStage(pages, max_workers=2, window=2) as stage:
+        assert len(stage._futures) == 2, "Only the window is submitted"
+        # Out of order: the last page is not submitted yet and is left to the caller
+        assert stage.take(pages[5]) is None
+        for number, page in enumerate(pages[:5]):
+            assert stage.take(page) == f"<h1>Page {number}</h1>"
+            assert len(stage._futures) <= 2
+        assert stage.take(pages[0]) is None, "The text is handed over only once"
+
+
+def test_conversion_stage_cache(tmp_path, monkeypatch):
+    pages = make_pages(tmp_path, 4)
+    cache_path = tmp_path / "cache.sqlite3"
+    with ConversionStage(pages, max_workers=2, cache_path=cache_path) as stage:
+        assert [stage.take(page) for page in pages] == [
+            f"<h1>Page {number}</h1>" for number in range(4)
+        ]
+    with ConversionCache(cache_path) as cache:
+        assert cache.get(conversion_key("# Page 3", markdown_converter_id())) == (
+            "<h1>Page 3</h1>"
+        ), "The workers fill the cache"
+
+    # Every worker opens the cache once, in the initializer
+    opened_caches = []
+
+    class CountedCache(ConversionCache):
+        def __init__(self, *args, **kwargs):
+            opened_caches.append(self)
+            super(CountedCache, self).__init__(*args, **kwargs)
+
+    monkeypatch.setattr(
+        "confluence_poster.conversion_cache.ConversionCache", CountedCache
+    )
+    monkeypatch.setattr(conversion_helpers, "_worker_cache", None)
+    conversion_helpers._init_worker(cache_path)
+    try:
+        for page in pages:
+            conversion_helpers._convert_file(page.page_file, False)
+        assert len(opened_caches) == 1
+    finally:
+        conversion_helpers._worker_cache.close()
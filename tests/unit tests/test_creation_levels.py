@@ -0,0 +1,46 @@
+import pytest
+
+from confluence_poster.page_creation_helpers import creation_levels
+from confluence_poster.poster_config import Page
+
+pytestmark = pytest.mark.offline
+
+
+def make_page(title, parent=None, space="LOC"):
+    return Page(
+        page_title=title, page_file="", page_space=space, parent_page_title=parent
+    )
+
+
+def titles(pages):
+    return [page.page_title for page in pages]
+
+
+def test_creation_levels():
+    pages = [
+        make_page("Grandchild", "Child"),
+        make_page("Child", "Parent"),
+        make_page("Other child", "Parent"),
+        make_page("Parent", "Existing page"),
+        make_page("Root page"),
+        make_page("Other space child", "Parent", space="OTHER"),
+    ]
+    levels, cyclic_pages = creation_levels(pages)
+    assert [titles(level) for level in levels] == [
+        ["Parent", "Root page", "Other space child"],
+        ["Child", "Other child"],
+        ["Grandchild"],
+    ]
+    assert cyclic_pages == []
+
+
+def test_creation_levels_cycle():
+    pages = [
+        make_page("First", "Second"),
+        make_page("Second", "First"),
+        make_page("Self", "Self"),
+        make_page("Child of cycle", "First"),
+    ]
+    levels, cyclic_pages = creation_levels(pages)
+    assert [titles(level) for level in levels] == [["Self"]]
+    assert titles(cyclic_pages) == ["First", "Second", "Child of cycle"]
@@ -0,0 +1,101 @@
+import logging
+from email import message_from_bytes
+
+import pytest
+from requests.exceptions import HTTPError
+
+from confluence_poster.file_upload_helpers import (
+    MultipartFileBody,
+    attachment_unchanged,
+    file_digest,
+    digest_prefix,
+    upload_file,
+)
+from confluence_poster.http_helpers import make_confluence
+from confluence_poster.main_helpers import StateConfig, PostedPage
+from confluence_poster.poster_config import Http
+from mock_confluence import MockConfluence
+
+pytestmark = pytest.mark.offline
+
+
+@pytest.fixture
+def uploaded_file(tmp_path):
+    path = tmp_path / "file.bin"
+    path.write_bytes(bytes(range(256)) * 1000)
+    return path
+
+
+def parse_body(body: MultipartFileBody, data: bytes) -> dict:
+    message = message_from_bytes(
+        f"Content-Type: {body.content_type}\r\n\r\n".encode() + data
+    )
+    return {
+        part.get_param("name", header="content-disposition"): (
+            part.get_filename(),
+            part.get_payload(decode=True),
+        )
+        for part in message.get_payload()
+    }
+
+
+def test_multipart_file_body(uploaded_file):
+    body = MultipartFileBody(
+        uploaded_file,
+        name="attachment name.bin",
+        content_type="application/binary",
+        fields={"comment": "Comment"},
+    )
+    data = b"".join(body)
+    assert len(data) == len(body)
+    assert parse_body(body, data) == {
+        "comment": (None, b"Comment"),
+        "file": ("attachment name.bin", uploaded_file.read_bytes()),
+    }
+
+    body.seek(0)
+    chunks = []
+    while chunk := body.read(1000):
+        chunks.append(chunk)
+    assert b"".join(chunks) == data, "Body is read again after it was rewound"
+    assert max(map(len, chunks)) == 1000
+
+
+def test_attachment_unchanged(uploaded_file):
+    size, digest = uploaded_file.stat().st_size, file_digest(uploaded_file)
+    attachment = {
+        "extensions": {"fileSize": size},
+        "metadata": {"comment": f"Uploaded file.bin. {digest_prefix}{digest}"},
+    }
+    assert attachment_unchanged(attachment, size, digest)
+    assert not attachment_unchanged(attachment, size + 1, digest)
+    assert not attachment_unchanged(attachment, size, "other digest")
+    assert not attachment_unchanged(
+        {"extensions": {"fileSize": size}, "metadata": {"comment": ""}}, size, digest
+    ), "Attachments uploaded by other means are replaced"
+
+
+def test_upload_file(uploaded_file, caplog):
+    caplog.set_level(logging.DEBUG, logger="atlassian")
+    with MockConfluence() as server:
+        page = PostedPage("Page", "page.md", "LOC")
+        page.page_id = server.add_page("LOC", "Page")["id"]
+        state = StateConfig(
+            confluence_factory=lambda: make_confluence(
+                url=server.url,
+                username="confluence_username",
+                password="password",
+                api_version="latest",
+                http_config=Http(backoff_factor=0.0),
+            )
+        )
+        assert upload_file(uploaded_file, page=page, attachment=None, state=state)
+        (attachment,) = server.attachments[page.page_id]
+        assert attachment["extensions"]["fileSize"] == uploaded_file.stat().st_size
+        assert "<MultipartFileBody>" in caplog.text, "Streamed body is not logged"
+
+        server.hooks["update_attachment"] = lambda _: (413, {"message": "Too large"})
+        uploaded_file.write_bytes(b"changed")
+        with pytest.raises(HTTPError) as e:
+            upload_file(uploaded_file, page=page, attachment=attachment, state=state)
+        assert e.value.response.status_code == 413
@@ -0,0 +1,54 @@
+import pytest
+
+from confluence_poster.convert_utils import Representation
+from confluence_poster.fingerprint_helpers import (
+    page_fingerprint,
+    fingerprint_matches,
+    get_stored_fingerprint,
+    fingerprint_property_key,
+)
+
+pytestmark = pytest.mark.offline
+
+
+def _page(version: int, stored_value: dict = None) -> dict:
+    """Generates the page as returned by the API with the fingerprint property expanded"""
+    page = {"version": {"number": version}, "metadata": {"properties": {}}}
+    if stored_value is not None:
+        page["metadata"]["properties"][fingerprint_property_key] = {
+            "key": fingerprint_property_key,
+            "value": stored_value,
+            "version": {"number": 1},
+        }
+    return page
+
+
+def test_fingerprint_depends_on_representation():
+    """Same text posted in different representations produces different pages"""
+    assert page_fingerprint("text", Representation.wiki) != page_fingerprint(
+        "text", Representation.editor
+    )
+    assert page_fingerprint("text", Representation.wiki) == page_fingerprint(
+        "text", Representation.wiki
+    )
+
+
+@pytest.mark.parametrize(
+    "stored_value,page_version,expected",
+    (
+        (None, 1, False),
+        ({"fingerprint": "abc", "page_version": 2}, 2, True),
+        ({"fingerprint": "abc", "page_version": 2}, 3, False),
+        ({"fingerprint": "def", "page_version": 2}, 2, False),
+    ),
+    ids=(
+        "Page without fingerprint is posted",
+        "Page with same fingerprint and version is skipped",
+        "Page edited after it was posted is posted",
+        "Page with changed text is posted",
+    ),
+)
+def test_fingerprint_matches(stored_value, page_version, expected):
+    page = _page(page_version, stored_value)
+    assert fingerprint_matches(page, "abc") is expected
+    assert (get_stored_fingerprint(page) is None) is (stored_value is None)
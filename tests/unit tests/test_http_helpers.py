@@ -0,0 +1,180 @@
+import gzip
+import pytest
+from io import BytesIO
+from requests import Request, Response
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError
+
+from confluence_poster import http_helpers
+from confluence_poster.http_helpers import make_session, get_retry_after
+from confluence_poster.rate_limit_helpers import RateLimiter, RequestStats
+from confluence_poster.poster_config import Http
+
+pytestmark = pytest.mark.offline
+
+
+def make_response(status_code: int, headers: dict = None) -> Response:
+    response = Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    response.raw = BytesIO(b"")
+    return response
+
+
+@pytest.fixture(scope="function")
+def sleeps(monkeypatch):
+    """Records the sleeps instead of sleeping"""
+    _sleeps = []
+    monkeypatch.setattr(http_helpers.time, "sleep", _sleeps.append)
+    return _sleeps
+
+
+@pytest.fixture(scope="function")
+def responses():
+    """Responses (or exceptions) returned by the adapter one by one. If empty - 200 is returned"""
+    return []
+
+
+@pytest.fixture(scope="function")
+def sent_requests(monkeypatch, responses):
+    """Captures the requests instead of sending them"""
+    _sent_requests = []
+
+    def _send(self, request, **kwargs):
+        _sent_requests.append(request)
+        if responses:
+            response = responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+        return make_response(200)
+
+    monkeypatch.setattr(HTTPAdapter, "send", _send)
+    return _sent_requests
+
+
+def send(session, method: str = "GET", data=None) -> Response:
+    return session.send(
+        session.prepare_request(
+            Request(method, "https://confluence.local/rest/api/content", data=data)
+        )
+    )
+
+
+def test_make_session_pool_size():
+    session = make_session(Http(pool_size=32))
+    adapter = session.get_adapter("https://confluence.local")
+    assert adapter._pool_maxsize == 32
+    assert session.headers["Connection"] == "keep-alive"
+
+
+def test_make_session_no_keep_alive():
+    session = make_session(Http(keep_alive=False))
+    assert session.headers["Connection"] == "close"
+
+
+@pytest.mark.parametrize(
+    "gzip_requests,body_size,compressed",
+    ((True, 100, True), (True, 10, False), (False, 100, False)),
+    ids=(
+        "Large body is compressed",
+        "Small body is not compressed",
+        "Compression is disabled",
+    ),
+)
+def test_gzip_requests(sent_requests, gzip_requests, body_size, compressed):
+    body = "a" * body_size
+    session = make_session(Http(gzip_requests=gzip_requests, gzip_min_size=50))
+    session.send(
+        session.prepare_request(
+            Request("PUT", "https://confluence.local/rest/api/content", data=body)
+        )
+    )
+    (request,) = sent_requests
+    if compressed:
+        assert request.headers["Content-Encoding"] == "gzip"
+        assert gzip.decompress(request.body).decode() == body
+        assert request.headers["Content-Length"] == str(len(request.body))
+    else:
+        assert "Content-Encoding" not in request.headers
+        assert request.body == body
+
+
+def test_retry_after_is_honoured(sent_requests, responses, sleeps):
+    responses += [make_response(429, {"Retry-After": "7"}), make_response(503)]
+    stats = RequestStats()
+    session = make_session(Http(backoff_factor=1.0), stats=stats)
+    assert send(session).status_code == 200
+    assert len(sent_requests) == 3
+    assert sleeps[0] == 7.0
+    assert 0 <= sleeps[1] <= 2.0, "Second attempt uses jittered exponential backoff"
+    assert stats.retries == 2
+    assert stats.throttled == 2
+    assert stats.wait_time >= 7.0
+
+
+def test_retries_are_limited(sent_requests, responses, sleeps):
+    responses += [make_response(429) for _ in range(5)]
+    session = make_session(Http(max_retries=2))
+    assert send(session).status_code == 429
+    assert len(sent_requests) == 3
+
+
+@pytest.mark.parametrize(
+    "method,retried",
+    (("GET", True), ("POST", False), ("PUT", False)),
+    ids=(
+        "Idempotent request is retried on connection error",
+        "Non-idempotent request is not retried on connection error",
+        "Versioned update is not retried on connection error",
+    ),
+)
+def test_connection_error_retry(
+    sent_requests, responses, sleeps, method: str, retried: bool
+):
+    responses.append(ConnectionError("Connection reset"))
+    session = make_session(Http())
+    if retried:
+        assert send(session, method=method, data="body").status_code == 200
+        assert len(sent_requests) == 2
+    else:
+        with pytest.raises(ConnectionError):
+            send(session, method=method, data="body")
+        assert len(sent_requests) == 1
+
+
+def test_streamed_body_is_not_retried(sent_requests, responses, sleeps):
+    responses.append(make_response(503))
+    session = make_session(Http())
+    assert send(session, method="PUT", data=iter([b"a", b"b"])).status_code == 503
+    assert len(sent_requests) == 1
+
+
+@pytest.mark.parametrize(
+    "header,expected",
+    (("120", 120.0), ("Wed, 21 Oct 2015 07:28:00 GMT", 0.0), ("soon", None)),
+    ids=("Seconds", "Date in the past", "Invalid value"),
+)
+def test_get_retry_after(header, expected):
+    assert get_retry_after(make_response(429, {"Retry-After": header})) == expected
+
+
+def test_rate_limiter_adapts(sleeps):
+    limiter = RateLimiter()
+    assert limiter.acquire() == 0.0, "Requests are not limited before throttling"
+    limiter.throttled()
+    assert limiter.rate == limiter.min_rate
+    limiter.acquire()
+    assert limiter.acquire() > 0, "Requests are limited after throttling"
+    for _ in range(10):
+        limiter.succeeded()
+    assert limiter.rate > limiter.min_rate
+
+
+def test_rate_limiter_max_rate():
+    limiter = RateLimiter(max_rate=2.0)
+    limiter.throttled()
+    assert limiter.rate == 1.0
+    for _ in range(100):
+        limiter.succeeded()
+    assert limiter.rate == 2.0
@@ -1,7 +1,8 @@
 import pytest
 from utils import setup_input
 
-from confluence_poster.main_helpers import StateConfig
+from confluence_poster.main_helpers import StateConfig, PostedPage, prepare_page_text
+from confluence_poster.poster_config import AllowedFileFormat
 
 pytestmark = pytest.mark.offline
 
@@ -63,3 +64,23 @@ def test_filter_mode():
     s = StateConfig()
     s.filter_mode = True
     assert s.quiet
+
+
+def test_prepare_page_text(tmp_path):
+    """Markdown is converted once, until the text is released"""
+    page_file = tmp_path / "page.md"
+    page_file.write_text("# Title")
+    page = PostedPage(
+        page_title="title",
+        page_file=str(page_file),
+        page_space="LOC",
+        page_file_format=AllowedFileFormat.markdown,
+    )
+    state = StateConfig()
+    assert prepare_page_text(page, state=state) == "<h1>Title</h1>"
+    assert prepare_page_text(page, state=state) == "<h1>Title</h1>"
+
+    page_file.write_text("# New title")
+    page.release_text()
+    assert not page.text_converted
+    assert prepare_page_text(page, state=state) == "<h1>New title</h1>"
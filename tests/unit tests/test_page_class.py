@@ -3,11 +3,13 @@ from marshmallow import ValidationError
 from dataclasses import asdict
 import pytest
 
+from confluence_poster import poster_config
 from confluence_poster.poster_config import (
     Page,
-    PageSchema,
     AllowedFileFormat,
+    read_page_file,
 )
+from confluence_poster.page_schema import PageSchema
 
 pytestmark = pytest.mark.offline
 
@@ -82,3 +84,36 @@ def test_page_text(tmp_path, file_exists):
 
     p.page_text = updated_content
     assert p.page_text == updated_content
+
+
+def test_release_text(tmp_path):
+    page_file: Path = tmp_path / "page.confluencewiki"
+    page_file.write_text("First version")
+    p = Page(page_title="title", page_file=str(page_file), page_space="LOC")
+    assert p.page_text == "First version"
+
+    p.replace_text("Converted first version")
+    page_file.write_text("Second version")
+    assert p.page_text == "Converted first version"
+    p.release_text()
+    assert p.page_text == "Second version", "Released text is read again"
+
+
+def test_release_text_set_directly(tmp_path):
+    """Text that was set directly, e.g. from stdin, cannot be read again and is kept"""
+    page_file: Path = tmp_path / "page.confluencewiki"
+    page_file.write_text("File content")
+    p = Page(page_title="title", page_file=str(page_file), page_space="LOC")
+    p.page_text = "Text from stdin"
+    p.release_text()
+    assert p.page_text == "Text from stdin"
+
+
+@pytest.mark.parametrize("use_mmap", [True, False], ids=["mmap", "read_text"])
+def test_read_page_file(tmp_path, monkeypatch, use_mmap):
+    if use_mmap:
+        monkeypatch.setattr(poster_config, "mmap_threshold", 0)
+    page_file: Path = tmp_path / "page.md"
+    page_file.write_bytes("# Заголовок\r\nline\rline\n".encode())
+    assert read_page_file(page_file) == page_file.read_text()
+    assert read_page_file(page_file) == "# Заголовок\nline\nline\n"
@@ -0,0 +1,71 @@
+import pytest
+
+from confluence_poster.page_index import PageIndex, IndexEntry
+
+pytestmark = pytest.mark.offline
+
+
+@pytest.fixture(scope="function")
+def page_index(tmp_path):
+    with PageIndex(
+        confluence_url="https://confluence.local", path=tmp_path / "index.sqlite3"
+    ) as _:
+        yield _
+
+
+def test_page_index_miss(page_index):
+    assert page_index.get("LOC", "Title") is None
+
+
+def test_page_index_set_get_remove(page_index):
+    page_index.set("LOC", "Title", 1, 2)
+    assert page_index.get("LOC", "Title") == IndexEntry("1", 2)
+    assert page_index.get("OTHER", "Title") is None
+
+    page_index.remove("LOC", "Title")
+    assert page_index.get("LOC", "Title") is None
+
+
+@pytest.mark.parametrize(
+    "page_id,version,expected",
+    (
+        (1, None, IndexEntry("1", 2)),
+        (1, 3, IndexEntry("1", 3)),
+        (5, None, IndexEntry("5", None)),
+    ),
+    ids=(
+        "Same page without version keeps the known version",
+        "Same page with version updates the version",
+        "Different page without version drops the known version",
+    ),
+)
+def test_page_index_update(page_index, page_id, version, expected):
+    page_index.set("LOC", "Title", 1, 2)
+    page_index.set("LOC", "Title", page_id, version)
+    assert page_index.get("LOC", "Title") == expected
+
+
+def test_page_index_persisted(tmp_path):
+    """Checks that the index survives between the runs and is separate for different instances"""
+    path = tmp_path / "index.sqlite3"
+    with PageIndex(confluence_url="https://confluence.local", path=path) as index:
+        index.set("LOC", "Title", 1, 2)
+
+    with PageIndex(confluence_url="https://confluence.local", path=path) as index:
+        assert index.get("LOC", "Title") == IndexEntry("1", 2)
+    with PageIndex(confluence_url="https://other.local", path=path) as index:
+        assert index.get("LOC", "Title") is None
+
+
+def test_page_index_shared_between_runs(tmp_path):
+    """Entries are visible to the other runs right away, neither run waits for the other one to finish"""
+    path = tmp_path / "index.sqlite3"
+    with PageIndex(confluence_url="https://confluence.local", path=path) as index:
+        index.set("LOC", "Title", 1, 2)
+        with PageIndex(
+            confluence_url="https://confluence.local", path=path
+        ) as other_index:
+            assert other_index.get("LOC", "Title") == IndexEntry("1", 2)
+            other_index.set("LOC", "Other title", 3, 1)
+        index.remove("LOC", "Title")
+        assert index.get("LOC", "Other title") == IndexEntry("3", 1)
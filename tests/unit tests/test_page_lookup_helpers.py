@@ -0,0 +1,80 @@
+import pytest
+from atlassian import Confluence
+
+from confluence_poster.main_helpers import StateConfig, PostedPage
+from confluence_poster.page_lookup_helpers import (
+    _cql_string,
+    search_pages,
+    resolve_pages,
+    titles_per_request,
+)
+from mock_confluence import MockConfluence
+
+pytestmark = pytest.mark.offline
+
+
+@pytest.mark.parametrize(
+    "title,expected",
+    (
+        ("Title", '"Title"'),
+        ('Page "quoted"', '"Page \\"quoted\\""'),
+        ("Back\\slash", '"Back\\\\slash"'),
+    ),
+    ids=(
+        "Plain title is quoted",
+        "Quotes in title are escaped",
+        "Backslashes in title are escaped",
+    ),
+)
+def test_cql_string(title, expected):
+    assert _cql_string(title) == expected
+
+
+@pytest.fixture
+def server():
+    with MockConfluence(search_limit=10) as _:
+        yield _
+
+
+@pytest.fixture
+def state(server):
+    return StateConfig(
+        confluence_factory=lambda: Confluence(
+            url=server.url, username="confluence_username", password="password"
+        )
+    )
+
+
+def test_search_pages_paginated(server, state):
+    titles = [f"Page {number}" for number in range(25)]
+    for title in titles:
+        server.add_page("LOC", title)
+    server.add_page("OTHER", "Page 0")
+
+    found_pages = search_pages("LOC", titles + ["Missing page"], state=state)
+    assert sorted(_["title"] for _ in found_pages) == sorted(titles)
+    assert {_["space"]["key"] for _ in found_pages} == {"LOC"}
+    assert server.requests[("GET", "search")] == 3, "10 results per request"
+
+
+def test_resolve_pages_batched(server, state):
+    page_count = titles_per_request * 2 + 5
+    server.add_page("LOC", "Parent")
+    pages = []
+    for number in range(page_count):
+        server.add_page("LOC", f"Page {number}")
+        pages.append(PostedPage(f"Page {number}", "page.md", "LOC", "Parent"))
+    server.search_limit = titles_per_request
+
+    resolved_pages = resolve_pages(pages, state=state)
+    assert len(resolved_pages) == page_count + 1, "Parent is resolved with the pages"
+    assert resolved_pages[("LOC", "Parent")]["version"]["number"] == 1
+    assert state.resolved_pages == resolved_pages
+    assert server.requests[("GET", "search")] == 3
+
+
+def test_resolve_pages_search_fails(server, state):
+    server.add_page("LOC", "Page")
+    server.hooks["search"] = lambda _: (400, {"message": "Could not parse cql"})
+    assert resolve_pages([PostedPage("Page", "page.md", "LOC")], state=state) == {}
+    assert state.resolved_pages == {}, "Pages are looked up one by one"
@@ -0,0 +1,162 @@
+import pytest
+
+from confluence_poster.convert_utils import split_front_matter
+from confluence_poster.conversion_helpers import _convert_file
+from confluence_poster.page_tree import PageTree, read_page_title
+from confluence_poster.poster_config import Config, Page
+
+pytestmark = pytest.mark.offline
+
+
+@pytest.mark.parametrize(
+    "text,front_matter,body",
+    [
+        (
+            "---\ntitle: 'Title'\ntags:\n  - a\n---\nText",
+            {"title": "Title", "tags": ""},
+            "Text",
+        ),
+        ("---\n---\nText", {}, "Text"),
+        ("---\n\nText\n\n---\n", {}, "---\n\nText\n\n---\n"),
+        ("# Title", {}, "# Title"),
+    ],
+    ids=["Front matter", "Empty front matter", "Not front matter", "No front matter"],
+)
+def test_split_front_matter(text, front_matter, body):
+    assert split_front_matter(text) == (front_matter, body)
+
+
+def test_front_matter_stripped_from_tree_pages(tmp_path):
+    (tmp_path / "page.md").write_text("---\ntitle: Title\n---\n# Text")
+    (tree_page,) = PageTree(tmp_path, page_space="LOC")
+    assert tree_page.page_text == "# Text"
+    assert _convert_file(tree_page.page_file, True) == "<h1>Text</h1>"
+
+    page = Page("Title", str(tmp_path / "page.md"), "LOC")
+    assert page.page_text.startswith("---"), "Other pages are posted as they are"
+    assert _convert_file(page.page_file, False).startswith("<hr />")
+
+
+@pytest.mark.parametrize(
+    "text,title",
+    [
+        ("---\ntitle: Front matter title\n---\n# Heading", "Front matter title"),
+        ("Text\n\n## Heading ##\n# Other heading", "Heading"),
+        ("h1. Wiki heading", "Wiki heading"),
+        ("Text", "file_name"),
+        (
+            "---\n" + "key: value\n" * 200 + "title: Long front matter\n---\n# Heading",
+            "Long front matter",
+        ),
+        ("---\nkey: value\n---\n" + "Text\n" * 200 + "# Late heading", "Late heading"),
+    ],
+    ids=[
+        "From front matter",
+        "From first heading",
+        "From wiki heading",
+        "From file",
+        "From long front matter",
+        "From late heading",
+    ],
+)
+def test_read_page_title(tmp_path, text, title):
+    (page_file := tmp_path / "file_name.md").write_text(text)
+    assert read_page_title(page_file) == title
+
+
+@pytest.fixture
+def handbook(tmp_path):
+    files = {
+        "index.md": "# Handbook",
+        "about.md": "# About",
+        "notes.txt": "Not a page",
+        ".hidden/page.md": "# Hidden",
+        "guides/setup.md": "# Setup",
+        "guides/README.md": "# Guides",
+        "guides/advanced/tuning.md": "---\ntitle: Tuning\n---\nText",
+        "misc/other.md": "# Other",
+    }
+    for name, text in files.items():
+        (path := tmp_path / "handbook" / name).parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+    return tmp_path / "handbook"
+
+
+def test_page_tree(handbook):
+    pages = list(PageTree(handbook, page_space="HB", parent_page_title="Docs"))
+    assert [(_.page_title, _.parent_page_title) for _ in pages] == [
+        ("Handbook", "Docs"),
+        ("About", "Handbook"),
+        ("Guides", "Handbook"),
+        ("Setup", "Guides"),
+        ("Tuning", "Guides"),
+        ("Other", "Handbook"),
+    ], "Parents come first, the directories without index files are skipped"
+    assert {_.page_space for _ in pages} == {"HB"}
+    assert pages[1].page_file == str(handbook / "about.md")
+
+    assert [_.page_title for _ in PageTree(handbook, pattern="guides/*.md")] == [
+        "Guides",
+        "Setup",
+        "Tuning",
+    ]
+
+    with pytest.raises(ValueError):
+        list(PageTree(handbook / "about.md"))
+
+
+def _config(tree, pages=None):
+    return Config(
+        data={
+            "pages": {"default": {"page_space": "DEF"}, **(pages or {}), "tree": tree},
+            "auth": {"confluence_url": "", "username": "user", "is_cloud": False},
+        }
+    )
+
+
+def test_config_tree(handbook):
+    config = _config(
+        {"root": str(handbook), "pattern": "guides/*"},
+        pages={"page1": {"page_title": "Page", "page_file": "page.md"}},
+    )
+    # The tree is scanned when the pages are needed, not when the config is read
+    (handbook / "guides" / "new.md").write_text("# New")
+    assert [(_.page_title, _.page_space) for _ in config.pages] == [
+        ("Page", "DEF"),
+        ("Guides", "DEF"),
+        ("New", "DEF"),
+        ("Setup", "DEF"),
+        ("Tuning", "DEF"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "tree",
+    [{"pattern": "*.md"}, {"root": 1}, "root"],
+    ids=["No root", "Root is not a string", "Tree is not a section"],
+)
+def test_config_tree_malformed(tree):
+    with pytest.raises(ValueError):
+        _ = _config(tree).pages
+
+
+def test_config_tree_duplicate_titles(handbook):
+    (handbook / "misc" / "copy.md").write_text("# About")
+    pages = _config({"root": str(handbook)}).pages
+    with pytest.raises(ValueError, match="more than 1 page called 'About'"):
+        list(pages)
+
+
+def test_config_tree_scanned_lazily(handbook, monkeypatch):
+    read_titles = []
+    monkeypatch.setattr(
+        "confluence_poster.page_tree.read_page_title",
+        lambda path: read_titles.append(path.name) or read_page_title(path),
+    )
+    config = _config({"root": str(handbook)})
+    assert read_titles == []
+    assert config.pages[0].page_title == "Handbook"
+    assert read_titles == ["index.md"], "Only the first page is read"
+    assert [_.page_title for _ in config.pages][:2] == ["Handbook", "About"]
+    assert len(config.pages) == 6
+    assert len(read_titles) == 6, "The pages are read once"
@@ -0,0 +1,65 @@
+import json
+import pytest
+from io import StringIO
+
+from confluence_poster.profiling_helpers import Profiler, ProfileFormat, percentile
+
+pytestmark = pytest.mark.offline
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = Profiler()
+    with profiler.span("lookup", page="Page"):
+        pass
+    assert profiler.spans == []
+
+
+def test_spans_are_recorded():
+    profiler = Profiler(enabled=True)
+    with profiler.span("load_config"):
+        pass
+    with pytest.raises(ValueError):
+        with profiler.span("update", page="Page"):
+            raise ValueError
+    assert [(_.name, _.page) for _ in profiler.spans] == [
+        ("load_config", None),
+        ("update", "Page"),
+    ], "Spans are recorded even if the block raised"
+    assert all(_.duration >= 0 for _ in profiler.spans)
+
+
+@pytest.mark.parametrize(
+    "values,percent,expected",
+    (([1.0], 95, 1.0), ([3.0, 1.0, 2.0], 50, 2.0), (list(range(1, 101)), 95, 95)),
+)
+def test_percentile(values, percent, expected):
+    assert percentile(values, percent) == expected
+
+
+def test_summary():
+    profiler = Profiler(enabled=True)
+    for page in ["First", "Second"]:
+        with profiler.span("update", page=page):
+            pass
+    summary = profiler.summary()
+    assert summary.startswith("Profile:\nupdate")
+    assert "count:     2" in summary
+    assert "Page 'First':\n\tupdate" in summary
+    assert "Page 'Second':\n\tupdate" in summary
+
+
+@pytest.mark.parametrize("profile_format", list(ProfileFormat))
+def test_dump(profile_format):
+    profiler = Profiler(enabled=True)
+    with profiler.span("update", page="Page"):
+        pass
+    output = StringIO()
+    profiler.dump(output, profile_format)
+    data = json.loads(output.getvalue())
+    if profile_format is ProfileFormat.json:
+        assert data[0]["name"] == "update"
+        assert data[0]["page"] == "Page"
+    else:
+        (event,) = data["traceEvents"]
+        assert event["ph"] == "X"
+        assert event["args"] == {"page": "Page"}
@@ -0,0 +1,78 @@
+import json
+import pytest
+
+from confluence_poster.main import Report
+from confluence_poster.main_helpers import PostedPage
+from confluence_poster.rate_limit_helpers import RequestStats
+
+pytestmark = pytest.mark.offline
+
+
+def _page(title: str, page_id: str = None) -> PostedPage:
+    return PostedPage(
+        page_title=title,
+        page_file="",
+        page_space="LOC",
+        page_id=page_id,
+        page_url=None if page_id is None else f"https://confluence.local/{page_id}",
+    )
+
+
+def test_report_text():
+    """Checks that the text report is built from the recorded pages"""
+    report = Report()
+    report.add_page(_page("Created", "1"), "created")
+    report.add_page(_page("Unprocessed"), "unprocessed", "Some reason")
+
+    assert str(report) == (
+        "Created pages:\nLOC::Created https://confluence.local/1\n"
+        "Updated pages:\nNone\n"
+        "Unprocessed pages:LOC::Unprocessed Reason: Some reason"
+    )
+
+
+def test_report_json_lines():
+    """Checks that every page is emitted as a JSON line as soon as it is added"""
+    lines = []
+    report = Report(json_lines_function=lines.append)
+
+    report.add_page(_page("Updated", "1"), "updated")
+    assert len(lines) == 1
+    report.add_page(_page("Unprocessed"), "unprocessed", "Some reason")
+
+    assert [json.loads(_) for _ in lines] == [
+        {
+            "space": "LOC",
+            "title": "Updated",
+            "status": "updated",
+            "page_id": "1",
+            "url": "https://confluence.local/1",
+            "reason": None,
+        },
+        {
+            "space": "LOC",
+            "title": "Unprocessed",
+            "status": "unprocessed",
+            "page_id": None,
+            "url": None,
+            "reason": "Some reason",
+        },
+    ]
+    assert report.updated_pages[0].page_title == "Updated"
+
+
+def test_report_request_stats():
+    """Checks that the retries are reported only if there were any"""
+    stats = RequestStats()
+    report = Report(request_stats=stats)
+    assert "Retried requests" not in str(report)
+
+    stats.record(retries=2, throttled=1, wait_time=3.5)
+    assert str(report).endswith(
+        "Retried requests: 2, throttled by the server: 1 times, waited for 3.5s\n"
+    )
+    assert json.loads(report.json_summary()) == {
+        "retries": 2,
+        "throttled": 1,
+        "wait_time": 3.5,
+    }
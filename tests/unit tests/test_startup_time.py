@@ -0,0 +1,59 @@
+import subprocess
+import sys
+import pytest
+
+pytestmark = pytest.mark.offline
+
+# Budget for the modules imported with confluence_poster.main. The tool runs from git and editor hooks, so the startup
+# should stay fast. Eager imports of atlassian, requests and the like bring several hundred modules
+imported_modules_budget = 100
+
+deferred_modules = ["atlassian", "requests", "markdown", "tomlkit", "marshmallow"]
+
+
+def run_python(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args], capture_output=True, text=True, check=True
+    )
+
+
+def test_heavy_modules_are_not_imported_on_startup():
+    result = run_python(
+        "-c",
+        "import sys, confluence_poster.main; "
+        f"print(' '.join(_ for _ in {deferred_modules!r} if _ in sys.modules))",
+    )
+    assert result.stdout.split() == []
+
+
+def test_validate_does_not_connect(tmp_path):
+    """Offline validation does not need the client for Confluence, it is not created"""
+    config_file = tmp_path / "config.toml"
+    config_file.write_text(
+        '[pages.page]\npage_title = "Page"\npage_file = "page.md"\npage_space = "LOC"\n'
+        '[auth]\nconfluence_url = "https://confluence.local"\nusername = "username"\n'
+        'password = "password"\nis_cloud = false\n'
+    )
+    result = run_python(
+        "-c",
+        "import sys\n"
+        "from confluence_poster.main import app\n"
+        "try:\n"
+        f"    app(['--config', {str(config_file)!r}, 'validate'])\n"
+        "except SystemExit as e:\n"
+        "    assert not e.code, e.code\n"
+        "print(' '.join(_ for _ in ['atlassian', 'requests'] if _ in sys.modules))",
+    )
+    assert "Validation successful" in result.stdout
+    assert result.stdout.splitlines()[-1].split() == []
+
+
+def test_imported_modules_budget():
+    """Counts the modules imported with the main module, the count does not depend on the load of the machine unlike
+    the import time"""
+    result = run_python(
+        "-c",
+        "import sys; modules = set(sys.modules); import confluence_poster.main; "
+        "print(len(set(sys.modules) - modules))",
+    )
+    assert int(result.stdout) < imported_modules_budget
@@ -0,0 +1,203 @@
+import subprocess
+
+import pytest
+from typer.testing import CliRunner
+
+from confluence_poster.main import app
+from confluence_poster.poster_config import Page
+from confluence_poster.sync_helpers import (
+    GitError,
+    SyncIndex,
+    changed_files,
+    repository_root,
+    resolve_revision,
+    read_last_synced,
+    record_synced,
+    LastSync,
+)
+from mock_confluence import MockConfluence, make_config
+
+pytestmark = pytest.mark.offline
+
+runner = CliRunner()
+
+
+def git(repository, *args):
+    return subprocess.run(
+        ["git", *args], cwd=repository, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+def commit_all(repository, message="Commit"):
+    git(repository, "add", "-A")
+    git(repository, "commit", "-q", "-m", message)
+    return git(repository, "rev-parse", "HEAD")
+
+
+@pytest.fixture
+def repository(tmp_path, monkeypatch):
+    git(tmp_path, "init", "-q")
+    git(tmp_path, "config", "user.email", "test@example.com")
+    git(tmp_path, "config", "user.name", "Test")
+    cache_home = tmp_path / "cache"
+    monkeypatch.setattr("xdg.BaseDirectory.xdg_cache_home", str(cache_home))
+    (tmp_path / ".gitignore").write_text("cache/\nconfig.toml\n")
+    return tmp_path
+
+
+def test_changed_files(repository):
+    (repository / "page.md").write_text("Text")
+    (repository / "other.md").write_text("Text")
+    first_commit = commit_all(repository)
+    assert repository_root(repository) == repository.resolve()
+    assert resolve_revision("HEAD", repository) == first_commit
+    assert changed_files(repository, first_commit) == set()
+
+    (repository / "page.md").write_text("Changed text")
+    second_commit = commit_all(repository)
+    (repository / "new.md").write_text("Text")
+    (repository / "other.md").unlink()
+    assert changed_files(repository, first_commit, second_commit) == {
+        repository / "page.md"
+    }
+    assert changed_files(repository, first_commit) == {
+        repository / "page.md",
+        repository / "new.md",
+        repository / "other.md",
+    }, "The working tree includes the untracked and removed files"
+
+    with pytest.raises(GitError):
+        resolve_revision("no-such-revision", repository)
+
+
+def test_sync_index(tmp_path):
+    pages = [
+        Page(
+            page_title=f"Page {_}",
+            page_file=str(tmp_path / f"page_{_ % 2}.md"),
+            page_space="LOC",
+        )
+        for _ in range(3)
+    ]
+    attachment = tmp_path / "file.txt"
+    attachment.write_text("Text")
+    index = SyncIndex(pages, attachments=[attachment, tmp_path / "removed.txt"])
+
+    assert index.changed_pages({tmp_path / "page_0.md"}) == [pages[0], pages[2]]
+    assert index.changed_pages({tmp_path / "other.md"}) == []
+    assert index.changed_attachments(
+        {attachment, tmp_path / "removed.txt", tmp_path / "page_1.md"}
+    ) == [attachment], "Removed files are not uploaded"
+
+
+def test_last_synced(tmp_path):
+    state_path = tmp_path / "sync_state.json"
+    assert read_last_synced("key", state_path) is None
+    record_synced("key", LastSync("revision", ["page.md"]), state_path)
+    record_synced("other key", LastSync("other revision"), state_path)
+    assert read_last_synced("key", state_path) == LastSync("revision", ["page.md"])
+    assert read_last_synced("other key", state_path) == LastSync("other revision")
+
+    state_path.write_text('{"key": "revision"}')
+    assert read_last_synced("key", state_path) == LastSync(
+        "revision"
+    ), "The revisions recorded by the older versions are read"
+
+    state_path.write_text("not json")
+    assert read_last_synced("key", state_path) is None
+
+
+def test_sync_against_mock(repository, monkeypatch):
+    monkeypatch.chdir(repository)
+    with MockConfluence() as server:
+        config_file = make_config(repository, server, page_count=3)
+        commit_all(repository)
+        args = ["--config", str(config_file), "--force-create", "sync"]
+
+        result = runner.invoke(app, [*args, "--create-in-space-root"])
+        assert result.exit_code == 0, result.stdout
+        assert server.requests[("POST", "create")] == 3, "First sync posts all pages"
+
+        result = runner.invoke(app, args)
+        assert result.exit_code == 0, result.stdout
+        assert "Nothing changed" in result.stdout
+        assert server.requests[("GET", "get_by_title")] == 3
+
+        (repository / "page_1.md").write_text("# Changed page")
+        result = runner.invoke(app, args)
+        assert result.exit_code == 0, result.stdout
+        assert server.requests[("PUT", "update")] == 1
+        assert (
+            server.find_page("LOC", "Page 1")["body"]["storage"]["value"]
+            == "<h1>Changed page</h1>"
+        )
+
+        first_commit = commit_all(repository)
+        (repository / "page_2.md").write_text("# Changed page")
+        commit_all(repository)
+        result = runner.invoke(app, [*args, "--since", first_commit, "--until", "HEAD"])
+        assert result.exit_code == 0, result.stdout
+        assert server.requests[("PUT", "update")] == 2
+
+        result = runner.invoke(app, [*args, "--since", "no-such-revision"])
+        assert result.exit_code == 1
+
+
+def test_sync_retries_skipped_pages(repository, monkeypatch):
+    monkeypatch.chdir(repository)
+    with MockConfluence() as server:
+        config_file = make_config(repository, server, page_count=2)
+        commit_all(repository)
+        args = ["--config", str(config_file), "--force-create", "sync"]
+        result = runner.invoke(app, [*args, "--create-in-space-root"])
+        assert result.exit_code == 0, result.stdout
+
+        for number in range(2):
+            (repository / f"page_{number}.md").write_text("# Changed page")
+        commit_all(repository)
+        server.find_page("LOC", "Page 0")["version"]["by"]["username"] = "someone_else"
+        result = runner.invoke(app, args)
+        assert result.exit_code == 0, result.stdout
+        assert "The revision is not recorded as synced" in result.stdout
+        assert server.requests[("PUT", "update")] == 1
+
+        result = runner.invoke(app, ["--force", *args])
+        assert result.exit_code == 0, result.stdout
+        assert (
+            "Posting 2 changed pages" in result.stdout
+        ), "Skipped page is posted again"
+        assert "Synced up to revision" in result.stdout
+        assert server.requests[("PUT", "update")] == 3
+
+        result = runner.invoke(app, args)
+        assert "Nothing changed" in result.stdout
+
+
+def test_sync_uncommitted_changes(repository, monkeypatch):
+    """The uncommitted changes posted from the working tree are posted again by the next run, even if they were
+    reverted instead of being committed"""
+    monkeypatch.chdir(repository)
+    with MockConfluence() as server:
+        config_file = make_config(repository, server, page_count=2)
+        commit_all(repository)
+        args = ["--config", str(config_file), "--force-create", "sync"]
+        result = runner.invoke(app, [*args, "--create-in-space-root"])
+        assert result.exit_code == 0, result.stdout
+
+        (repository / "page_1.md").write_text("# Uncommitted page")
+        result = runner.invoke(app, args)
+        assert result.exit_code == 0, result.stdout
+        assert "and the uncommitted changes of 1 files" in result.stdout
+        assert server.requests[("PUT", "update")] == 1
+
+        git(repository, "checkout", "--", "page_1.md")
+        result = runner.invoke(app, args)
+        assert result.exit_code == 0, result.stdout
+        assert "Posting 1 changed pages: Page 1" in result.stdout
+        assert (
+            server.find_page("LOC", "Page 1")["body"]["storage"]["value"]
+            == "<h1>Page 1</h1>"
+        )
+
+        result = runner.invoke(app, args)
+        assert "Nothing changed" in result.stdout
@@ -0,0 +1,51 @@
+import pytest
+from atlassian import Confluence
+from requests.exceptions import HTTPError
+
+from confluence_poster.main_helpers import update_page_version
+from mock_confluence import MockConfluence
+
+pytestmark = pytest.mark.offline
+
+
+@pytest.fixture
+def server():
+    with MockConfluence() as _:
+        yield _
+
+
+def _update(server, page_id, version):
+    return update_page_version(
+        page_id=page_id,
+        title="Page",
+        body="<p>New text</p>",
+        representation="storage",
+        version=version,
+        confluence_instance=Confluence(
+            url=server.url, username="confluence_username", password="password"
+        ),
+        version_comment="Comment",
+    )
+
+
+def test_update_page_version(server):
+    page_id = server.add_page("LOC", "Page", "<p>Text</p>")["id"]
+    updated_page = _update(server, page_id, 2)
+    assert updated_page["version"]["number"] == 2
+    assert server.pages[page_id]["body"]["storage"]["value"] == "<p>New text</p>"
+    assert server.pages[page_id]["version"]["message"] == "Comment"
+    assert server.requests[("GET", "get_by_id")] == 0, "Page is not fetched first"
+
+
+@pytest.mark.parametrize(
+    "version,status_code",
+    [(2, 409), (4, 409), (None, 404)],
+    ids=["Version is not incremented", "Version is skipped", "Page does not exist"],
+)
+def test_update_page_version_rejected(server, version, status_code):
+    page_id = server.add_page("LOC", "Page", "<p>Text</p>")["id"]
+    _update(server, page_id, 2)
+    with pytest.raises(HTTPError) as e:
+        _update(server, page_id if version else "999", version or 2)
+    assert e.value.response.status_code == status_code
+    assert server.pages[page_id]["version"]["number"] == 2
@@ -0,0 +1,131 @@
+import sys
+import time
+from dataclasses import astuple
+from threading import Thread, Event
+
+import pytest
+from atlassian import Confluence
+
+from confluence_poster.config_loader import load_config
+from confluence_poster.http_helpers import make_session
+from confluence_poster.main_helpers import StateConfig, PostedPage
+from confluence_poster.page_index import PageIndex
+from confluence_poster.poster_config import AllowedFileFormat
+from confluence_poster.watch_helpers import (
+    PollingWatcher,
+    InotifyWatcher,
+    wait_for_changes,
+    watch_pages,
+)
+from mock_confluence import MockConfluence, make_config
+
+pytestmark = pytest.mark.offline
+
+watchers = [PollingWatcher]
+if sys.platform.startswith("linux"):
+    watchers.append(InotifyWatcher)
+
+
+@pytest.fixture(params=watchers, ids=lambda _: _.__name__)
+def make_watcher(request):
+    watchers = []
+
+    def _make_watcher(paths):
+        watchers.append(watcher := request.param(paths))
+        return watcher
+
+    yield _make_watcher
+    for watcher in watchers:
+        watcher.close()
+
+
+def test_watcher(tmp_path, make_watcher):
+    watched_file, other_file = tmp_path / "watched.md", tmp_path / "other.md"
+    watched_file.write_text("Text")
+    watcher = make_watcher([watched_file])
+    assert watcher.wait(timeout=0.1) == set()
+
+    other_file.write_text("Text")
+    assert watcher.wait(timeout=0.1) == set(), "Other files are not watched"
+
+    watched_file.write_text("Changed text")
+    assert watcher.wait(timeout=1) == {watched_file}
+
+    # Editors that save atomically replace the file
+    other_file.write_text("Replaced text")
+    other_file.replace(watched_file)
+    assert watcher.wait(timeout=1) == {watched_file}
+
+
+def test_wait_for_changes_debounced(tmp_path, make_watcher):
+    watched_file = tmp_path / "watched.md"
+    watched_file.write_text("Text")
+    watcher = make_watcher([watched_file])
+
+    def write_burst():
+        for number in range(5):
+            watched_file.write_text(f"Text {number}")
+            time.sleep(0.05)
+
+    writer = Thread(target=write_burst)
+    writer.start()
+    assert wait_for_changes(watcher, debounce=0.3, timeout=1) == {watched_file}
+    writer.join()
+    assert (
+        wait_for_changes(watcher, debounce=0.3, timeout=0.1) == set()
+    ), "The burst is reported once"
+
+
+def test_watch_pages(tmp_path):
+    with MockConfluence() as server:
+        config = load_config(make_config(tmp_path, server), use_cache=False)
+        state = StateConfig(
+            config=config,
+            force_create=True,
+            quiet=True,
+            confluence_factory=lambda: Confluence(
+                url=server.url,
+                username="confluence_username",
+                password="password",
+                session=make_session(config.http),
+            ),
+            page_index=PageIndex(confluence_url=server.url, path=":memory:"),
+        )
+        pages = [PostedPage(*astuple(_)) for _ in config.pages]
+        for page in pages:
+            page.page_file_format = AllowedFileFormat.markdown
+        stop = Event()
+        watcher = Thread(
+            target=watch_pages,
+            kwargs=dict(
+                pages=pages, state=state, debounce=0.05, create_in_root=True, stop=stop
+            ),
+        )
+        watcher.start()
+
+        def wait_for(condition):
+            deadline = time.monotonic() + 5
+            while not condition() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert condition()
+
+        try:
+            time.sleep(0.2)
+            page_file = tmp_path / "page_0.md"
+            page_file.write_text("# Changed")
+            wait_for(lambda: server.find_page("LOC", "Page 0") is not None)
+            assert (
+                server.find_page("LOC", "Page 1") is None
+            ), "Only the changed page is posted"
+
+            page_file.write_text("# Changed again")
+            wait_for(
+                lambda: server.find_page("LOC", "Page 0")["body"]["storage"]["value"]
+                == "<h1>Changed again</h1>"
+            )
+            assert (
+                server.requests[("GET", "get_by_title")] == 1
+            ), "The updated page is not looked up again"
+        finally:
+            stop.set()
+            watcher.join()